@@ -7,6 +7,7 @@ Run this script to start the automatic backup scheduler
 import os
 import sys
 import time
+import threading
 import schedule
 from pathlib import Path
 
@@ -20,15 +21,22 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'etiqa.settings')
 import django  
 django.setup()
 
+from django.conf import settings
 from django.core.management import call_command
 from network_scanner.backup_service import backup_service
+from network_scanner.task_queue import task_queue
 
 
 def run_backups():
     """Run all scheduled backups"""
     try:
         print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Running scheduled backups...")
-        backup_service.run_scheduled_backups()
+        results = backup_service.run_scheduled_backups()
+        for result in results:
+            if result['status'] == 'completed':
+                print(f"  {result['config']}: completed in {result['duration']:.1f}s (backup {result['backup_id']})")
+            else:
+                print(f"  {result['config']}: {result['status']} - {result['error']}")
         print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Backup check completed")
     except Exception as e:
         print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Error running backups: {e}")
@@ -39,6 +47,15 @@ def main():
     print("Starting Etiqa Auto Backup Scheduler...")
     print("Press Ctrl+C to stop")
     
+    # Pushes and cleanup queued by each backup run on their own workers
+    task_workers = threading.Thread(
+        target=task_queue.run_workers,
+        kwargs={'workers': settings.BACKUP_SETTINGS.get('TASK_WORKERS', 2)},
+        name='backup-tasks',
+        daemon=True,
+    )
+    task_workers.start()
+    
     # Schedule backup checks setiap 5 minit
     schedule.every(5).minutes.do(run_backups)
     
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -78,6 +79,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Parallel backup workers write concurrently
+            'timeout': 20,
+        },
     }
 }
 
@@ -135,7 +140,42 @@ BACKUP_SETTINGS = {
     'COMPRESSION_LEVEL': 6,
     'INCLUDE_MEDIA': False,
     'INCLUDE_LOGS': True,
+    'LOG_CHAIN_LENGTH': 7,  # Backups per log chain: each archives only new log bytes, then one copies every log from the start
+    'MEDIA_CONTENT_HASH': False,  # Hash media whose metadata changed to skip touched-but-identical files
     'BACKUP_RETENTION_DAYS': 30,
+    'MAX_WORKERS': 4,  # Due configs run in parallel, one worker each
+    'WORKER_TYPE': 'thread',  # 'thread' or 'process'
+    'RUNNING_BACKUP_TIMEOUT': 12 * 3600,  # Seconds before a backup still marked running is assumed dead and stops blocking its config
+    'RESTORE_BATCH_SIZE': 2000,  # Network configs inserted per bulk_create during a restore
+    'ARCHIVE_SEGMENT_SIZE': 1024 ** 3,  # Old backups are appended to an archive file until it reaches this size
+    'CLEANUP_WORKERS': 4,  # Threads unlinking backup files during retention cleanup
+    'CHECKSUM_ALGORITHM': 'sha256',  # hashlib name for member and archive digests, e.g. 'blake2b'
+    'TASK_WORKERS': 2,  # Threads draining the post-backup task queue (pushes, cleanup)
+    'TASK_MAX_ATTEMPTS': 8,  # Tries before a queued task is marked failed
+    'TASK_RETRY_BASE': 30,  # Seconds before the first retry; doubles on each further failure
+    'TASK_RETRY_MAX': 3600,  # Longest wait between retries, in seconds
+    'TASK_LEASE_SECONDS': 3600,  # Running tasks renew their lease every third of this; one not renewed this long is handed to another worker
+    'TASK_HISTORY_DAYS': 7,  # Completed tasks are kept this long
+    'CONFIG_KEYFRAME_INTERVAL': 20,  # Network config versions per delta chain: one full text, then line deltas
+    'CONFIG_VOLATILE_PATTERNS': [],  # Extra regexes for config lines left out of content hashes, e.g. timestamps
+}
+
+# Search
+SEARCH_SETTINGS = {
+    'SUGGESTION_INDEX_MAX_AGE': 60,  # Seconds before a process rebuilds its suggestion index, picking up other processes' changes
+}
+
+# Device config collection (collect_configs, "Backup Now" on a device)
+COLLECTION_SETTINGS = {
+    'USERNAME': os.environ.get('DEVICE_SSH_USERNAME'),
+    'PASSWORD': os.environ.get('DEVICE_SSH_PASSWORD'),
+    'KEY_FILENAME': os.environ.get('DEVICE_SSH_KEY_FILENAME'),
+    'CONCURRENCY': 200,  # Devices collected at once
+    'TYPE_CONCURRENCY': {'firewall': 50, 'f5': 50, 'infoblox': 20},  # Per device type caps within CONCURRENCY
+    'CONNECT_TIMEOUT': 10,  # Seconds to open an SSH session
+    'READ_TIMEOUT': 60,  # Seconds for each command to finish
+    'BATCH_SIZE': 500,  # NetworkConfig rows per bulk insert
+    'COMMANDS': {},  # Per device type command overrides, e.g. {'infoblox': {'running': 'show config'}}
 }
 
 # Media files (for backup)
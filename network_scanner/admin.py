@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Device, BackupConfig, BackupHistory, NetworkConfig, SearchConfig
+from .forms import NetworkConfigForm
+from .models import Device, BackupConfig, BackupHistory, BackupTask, NetworkConfig, SearchConfig
 
 
 @admin.register(Device)
@@ -25,10 +26,19 @@ class BackupConfigAdmin(admin.ModelAdmin):
     search_fields = ("name",)
     fieldsets = (
         ("Basic Settings", {
-            "fields": ("name", "backup_type", "frequency", "enabled")
+            "fields": ("name", "backup_type", "frequency", "enabled", "full_backup_every")
         }),
         ("Backup Options", {
-            "fields": ("max_backups", "backup_path", "include_database", "include_media", "include_logs")
+            "fields": ("max_backups", "backup_path", "include_database", "database_format", "include_media", "include_logs", "deduplicate")
+        }),
+        ("Retention", {
+            "fields": ("retention_months", "archive_old_backups", "archive_path", "keep_hourly", "keep_daily", "keep_weekly", "keep_monthly")
+        }),
+        ("Auto Push", {
+            "fields": ("auto_push_enabled", "push_target", "push_options")
+        }),
+        ("Compression", {
+            "fields": ("compression", "compression_level", "section_compression")
         }),
         ("Timing", {
             "fields": ("last_backup_at", "next_backup_at"),
@@ -39,15 +49,23 @@ class BackupConfigAdmin(admin.ModelAdmin):
 
 @admin.register(BackupHistory)
 class BackupHistoryAdmin(admin.ModelAdmin):
-    list_display = ("id", "config", "status", "started_at", "completed_at", "file_size")
-    list_filter = ("status", "started_at", "config")
+    list_display = ("id", "config", "status", "backup_mode", "parent", "started_at", "completed_at", "file_size")
+    list_filter = ("status", "backup_mode", "started_at", "config")
     search_fields = ("config__name",)
     readonly_fields = ("started_at", "completed_at", "duration")
 
 
+@admin.register(BackupTask)
+class BackupTaskAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "config", "backup", "status", "attempts", "run_after", "completed_at")
+    list_filter = ("kind", "status", "config")
+    readonly_fields = ("created_at", "started_at", "completed_at", "worker", "last_error", "result")
+
+
 @admin.register(NetworkConfig)
 class NetworkConfigAdmin(admin.ModelAdmin):
-    list_display = ("device", "config_type", "version", "backup_timestamp", "is_active")
+    form = NetworkConfigForm
+    list_display = ("device", "config_type", "version", "backup_timestamp", "is_active", "delta_depth")
     list_filter = ("config_type", "is_active", "backup_timestamp")
     search_fields = ("device__ip_address", "device__hostname")
 
@@ -5,5 +5,8 @@ class NetworkScannerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'network_scanner'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
 
 
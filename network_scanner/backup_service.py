@@ -1,14 +1,43 @@
+import io
 import os
 import json
 import zipfile
 import shutil
+import sqlite3
+import tempfile
+import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 from django.conf import settings
 from django.utils import timezone
 from django.core.management import call_command
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import F, Max, Window
+from django.db.models.fields.json import KT
+from django.db.models.functions import RowNumber
 from .models import BackupConfig, BackupHistory, BackupArchive, NetworkConfig, Device
+from .compression import section_codec, open_zip_member
+from .media_index import scan_tree, file_record, metadata_matches, load_index, save_index
+from .log_collector import plan_segment, segment_name, parse_segments, LogReassembler
+from .fixture_loader import FixtureLoader
+from .config_search import config_search
+from .ip_keys import ip_key
+from .suggestion_index import suggestion_index
+from .config_versions import hash_config, resolve_record_deltas, volatile_line_pattern
+from .config_index import (
+    CONFIG_INDEX_MEMBER, CONFIG_MEMBER_PREFIX, FileSlice, config_member_name, data_offset,
+    member_location, read_member_at, record_matches, select_entries,
+)
+from .integrity import DEFAULT_ALGORITHM, HashingWriter, hash_file, hash_range
+from .chunk_store import ChunkStore, ChunkStoreWriter, ManifestArchive, MANIFEST_SUFFIX, is_manifest
+from .transports import get_transport
+from .task_queue import task_queue
+
+
+class BackupAlreadyRunning(RuntimeError):
+    """Another run of the same backup configuration holds it"""
 
 
 class BackupService:
@@ -17,58 +46,183 @@ class BackupService:
     def __init__(self):
         self.base_backup_dir = Path(settings.BASE_DIR) / 'backups'
         self.base_backup_dir.mkdir(exist_ok=True)
+        backup_settings = getattr(settings, 'BACKUP_SETTINGS', {})
+        self.chunk_store = ChunkStore(
+            backup_settings.get('CHUNK_STORE_PATH', self.base_backup_dir / 'store'),
+            level=backup_settings.get('COMPRESSION_LEVEL', 6)
+        )
+        self.checksum_algorithm = backup_settings.get('CHECKSUM_ALGORITHM', DEFAULT_ALGORITHM)
+        self.running_timeout = backup_settings.get('RUNNING_BACKUP_TIMEOUT', 12 * 3600)
+    
+    def _claim_config(self, config):
+        """Record a running backup of config, or raise BackupAlreadyRunning
+        
+        Every run inserts its 'running' BackupHistory first and then looks for
+        an older one, so of two runs racing for a config (in any thread or
+        process) the first insert wins. A run still marked running after
+        RUNNING_BACKUP_TIMEOUT is assumed to have died and is marked failed.
+        """
+        now = timezone.now()
+        config.backups.filter(
+            status='running', started_at__lt=now - timedelta(seconds=self.running_timeout)
+        ).update(status='failed', completed_at=now, error_message='Abandoned: still running after RUNNING_BACKUP_TIMEOUT')
+        
+        backup_history = BackupHistory.objects.create(config=config, status='running')
+        if config.backups.filter(status='running', id__lt=backup_history.id).exists():
+            backup_history.delete()
+            raise BackupAlreadyRunning(f"Backup for {config.name} is already running")
+        return backup_history
     
-    def run_scheduled_backups(self):
-        """Run all due backups"""
+    def run_scheduled_backups(self, max_workers=None):
+        """Run all due backups, independent configs in parallel"""
+        backup_settings = getattr(settings, 'BACKUP_SETTINGS', {})
+        if max_workers is None:
+            max_workers = backup_settings.get('MAX_WORKERS', 1)
+        worker_type = backup_settings.get('WORKER_TYPE', 'thread')
+        
         now = timezone.now()
-        due_configs = BackupConfig.objects.filter(
+        due_configs = list(BackupConfig.objects.filter(
             enabled=True,
             next_backup_at__lte=now
-        )
+        ))
         
-        for config in due_configs:
-            try:
-                self.run_backup(config)
-            except Exception as e:
-                print(f"Error running backup for {config.name}: {e}")
+        results = []
+        if not due_configs:
+            return results
+        
+        if max_workers <= 1:
+            for config in due_configs:
+                results.append(self._run_due_backup(config))
+            return results
+        
+        if worker_type == 'process':
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_backup_worker)
+            submit = lambda config: executor.submit(_run_backup_in_process, config.pk)
+        else:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backup')
+            submit = lambda config: executor.submit(self._run_due_backup, config, True)
+        
+        with executor:
+            futures = {submit(config): config for config in due_configs}
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # The worker itself died (e.g. a crashed process)
+                    print(f"Error running backup for {config.name}: {e}")
+                    results.append(self._backup_result(config, 'failed', error=str(e)))
+        
+        return results
+    
+    def _run_due_backup(self, config, close_connection=False):
+        """Run a due config and summarise the outcome"""
+        started = time.monotonic()
+        try:
+            backup_history = self._run_backup(config)
+            return self._backup_result(
+                config, 'completed', backup_id=backup_history.id,
+                duration=time.monotonic() - started
+            )
+        except BackupAlreadyRunning as e:
+            return self._backup_result(config, 'skipped', error=str(e))
+        except Exception as e:
+            print(f"Error running backup for {config.name}: {e}")
+            return self._backup_result(
+                config, 'failed', error=str(e), duration=time.monotonic() - started
+            )
+        finally:
+            if close_connection:
+                # Worker threads each open their own connection
+                connection.close()
+    
+    @staticmethod
+    def _backup_result(config, status, backup_id=None, error='', duration=None):
+        return {
+            'config': config.name,
+            'status': status,
+            'backup_id': backup_id,
+            'error': error,
+            'duration': duration,
+        }
     
     def run_backup(self, config):
-        """Run a specific backup configuration"""
-        backup_history = BackupHistory.objects.create(
-            config=config,
-            status='running'
-        )
+        """Run a specific backup configuration
+        
+        Raises BackupAlreadyRunning if the configuration is already being backed up.
+        """
+        return self._run_backup(config)
+    
+    def _run_backup(self, config):
+        backup_history = self._claim_config(config)
+        archive_path = None
         
         try:
-            # Create backup directory
+            parent = self._select_parent_backup(config)
+            backup_mode = config.backup_type if parent else 'full'
+            backup_history.backup_mode = backup_mode
+            backup_history.parent = parent
+            backup_history.save(update_fields=['backup_mode', 'parent'])
+            
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_dir = self.base_backup_dir / f"{config.name}_{timestamp}"
-            backup_dir.mkdir(exist_ok=True)
             
-            backup_data = {}
+            backup_data = {'mode': backup_mode}
+            # Where this backup stopped, so the next chained backup knows where to resume
+            chain_state = {}
+            parent_state = parent.backup_data.get('chain_state', {}) if parent else None
             
-            # Backup database
-            if config.include_database:
-                db_backup_path = self._backup_database(backup_dir, config)
-                backup_data['database'] = str(db_backup_path)
+            # Every section streams straight into its own archive member
+            with self._create_backup_archive(config, timestamp, backup_history.id) as zipf:
+                archive_path = Path(zipf.filename)
+                
+                # Backup database
+                if config.include_database:
+                    backup_data['database'] = self._backup_database(zipf, config)
+                
+                # Backup network configurations
+                if config.includes_network_configs:
+                    backup_data['network_configs'] = self._backup_network_configs(
+                        zipf, config, parent_state, chain_state
+                    )
+                    backup_data['config_index'] = self._member_location(zipf, CONFIG_INDEX_MEMBER)
+                
+                # Backup media files
+                if config.includes_media_files:
+                    backup_data['media'] = self._backup_media(zipf, config, parent, backup_history)
+                
+                # Backup logs
+                if config.include_logs:
+                    log_parent = self._select_log_parent(config)
+                    log_state = {}
+                    backup_data['logs'] = self._backup_logs(
+                        zipf, config, log_parent.backup_data['log_state'] if log_parent else None, log_state
+                    )
+                    backup_data['log_state'] = log_state
+                    backup_data['log_parent'] = log_parent.id if log_parent else None
+                    backup_data['log_chain_length'] = (
+                        log_parent.backup_data.get('log_chain_length', 0) + 1 if log_parent else 0
+                    )
+                
+                backup_data['manifest'] = self._write_backup_manifest(
+                    zipf, backup_history, parent, chain_state
+                )
             
-            # Backup network configurations
-            if config.backup_type in ['config', 'full']:
-                config_backup_path = self._backup_network_configs(backup_dir, config)
-                backup_data['network_configs'] = str(config_backup_path)
+            backup_data['chain_state'] = chain_state
             
-            # Backup media files
-            if config.include_media and config.backup_type in ['data', 'full']:
-                media_backup_path = self._backup_media(backup_dir, config)
-                backup_data['media'] = str(media_backup_path)
+            # Only publish the archive under its final name once it is complete, never over another
+            final_path = archive_path.with_suffix('')
+            if final_path.exists():
+                raise FileExistsError(f"Backup file {final_path} already exists")
+            archive_path = archive_path.replace(final_path)
             
-            # Backup logs
-            if config.include_logs:
-                logs_backup_path = self._backup_logs(backup_dir, config)
-                backup_data['logs'] = str(logs_backup_path)
+            backup_data['checksums'] = {
+                'algorithm': self.checksum_algorithm,
+                'archive': hash_file(archive_path, self.checksum_algorithm),
+                'members': zipf.member_checksums,
+            }
             
-            # Create final backup archive
-            archive_path = self._create_backup_archive(backup_dir, config, timestamp)
+            if config.deduplicate:
+                backup_data['storage'] = 'chunk_store'
             
             # Update backup history
             file_size = archive_path.stat().st_size if archive_path.exists() else 0
@@ -83,58 +237,268 @@ class BackupService:
             config.schedule_next_backup()
             config.save()
             
-            # Auto push if enabled
+            # Push and retention run on the task queue, so a slow remote never holds up the backup
             if config.auto_push_enabled:
-                self._auto_push_backup(archive_path, config)
-            
-            # Cleanup old backups
-            self._cleanup_old_backups(config)
+                if config.push_target:
+                    task_queue.enqueue('push', config, backup_history)
+                else:
+                    print(f"Auto push is enabled for {config.name} but no push target is set")
+            task_queue.enqueue('cleanup', config)
             
             return backup_history
             
         except Exception as e:
+            # The archive may already be closed, or even published under its final name
+            if archive_path and archive_path.exists():
+                if config.deduplicate:
+                    self.chunk_store.release_manifest(archive_path)
+                archive_path.unlink()
+            media_index_path = self._media_index_path(backup_history.id)
+            if media_index_path.exists():
+                media_index_path.unlink()
             backup_history.mark_failed(str(e))
             raise
     
-    def _backup_database(self, backup_dir, config):
-        """Backup database using Django's dumpdata command"""
-        db_backup_path = backup_dir / 'database.json'
+    def _select_parent_backup(self, config):
+        """Pick the backup an incremental or differential run builds on, or None for a full run"""
+        if config.backup_type not in BackupConfig.CHAINED_TYPES:
+            return None
+        
+        completed = config.backups.filter(status='completed').exclude(file_path='')
+        last_full = completed.filter(backup_mode='full').order_by('-completed_at').first()
+        if last_full is None or not Path(last_full.file_path).exists():
+            return None
+        
+        # Cap the chain: restores replay at most full_backup_every backups on top of the full one
+        since_full = completed.filter(completed_at__gt=last_full.completed_at)
+        if since_full.count() >= config.full_backup_every:
+            return None
+        
+        if config.backup_type == 'differential':
+            return last_full
+        return completed.order_by('-completed_at').first()
+    
+    def _write_backup_manifest(self, zipf, backup_history, parent, chain_state):
+        """Record how this backup chains onto its parent inside the archive itself"""
+        member_name = 'backup_manifest.json'
+        manifest = {
+            'backup_id': backup_history.id,
+            'config_name': backup_history.config.name,
+            'mode': backup_history.backup_mode,
+            'parent_id': parent.id if parent else None,
+            'parent_file': Path(parent.file_path).name if parent else None,
+            'parent_started_at': parent.started_at.isoformat() if parent else None,
+            'chain_state': chain_state,
+        }
+        
+        with self._open_member(zipf, backup_history.config, 'manifest', member_name) as member:
+            member.write(json.dumps(manifest, indent=2).encode('utf-8'))
+        
+        return member_name
+    
+    def _create_backup_archive(self, config, timestamp, backup_id):
+        """Open the backup archive that section producers write into
+        
+        The backup id keeps the names of runs started within the same second apart.
+        """
+        if config.deduplicate:
+            manifest_path = self.base_backup_dir / f"{config.name}_{timestamp}_{backup_id}{MANIFEST_SUFFIX}.partial"
+            archive = ChunkStoreWriter(self.chunk_store, manifest_path, metadata={
+                'config_name': config.name,
+                'created': timezone.now().isoformat(),
+            })
+        else:
+            archive_name = f"{config.name}_{timestamp}_{backup_id}.zip.partial"
+            archive_path = self.base_backup_dir / archive_name
+            archive = zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED)
+        
+        # Filled in by _open_member as each member is closed
+        archive.member_checksums = {}
+        return archive
+    
+    def _open_member(self, zipf, config, section, name, force_zip64=False):
+        """Open an archive member for writing with the codec configured for its section
+        
+        Everything written is digested on the way through, and the member's
+        checksum lands in zipf.member_checksums when it is closed.
+        """
+        if not isinstance(zipf, zipfile.ZipFile):
+            stream = zipf.open(name, 'w')
+        else:
+            codec, level = section_codec(config, section)
+            stream = open_zip_member(zipf, name, codec, level, force_zip64)
+        
+        def record(digest):
+            zipf.member_checksums[name] = digest
+        
+        return HashingWriter(stream, record, self.checksum_algorithm)
+    
+    def _open_backup(self, backup_file):
+        """Open a stored backup for reading, whether a zip or a chunk store manifest"""
+        if isinstance(backup_file, (str, os.PathLike)) and is_manifest(backup_file):
+            return ManifestArchive(self.chunk_store, backup_file)
+        return zipfile.ZipFile(backup_file, 'r')
+    
+    def export_backup_archive(self, backup_file, fileobj):
+        """Write a stored backup to fileobj as a standalone zip archive"""
+        if not is_manifest(backup_file):
+            with open(backup_file, 'rb') as src:
+                shutil.copyfileobj(src, fileobj, 1024 * 1024)
+            return
+        
+        with self._open_backup(backup_file) as source, zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for name in source.namelist():
+                with source.open(name) as src, zipf.open(name, 'w') as dest:
+                    shutil.copyfileobj(src, dest, 1024 * 1024)
+    
+    def _backup_database(self, zipf, config):
+        """Backup database using Django's dumpdata command or a SQLite snapshot"""
+        if config.database_format == 'sqlite':
+            if connection.vendor == 'sqlite':
+                return self._backup_sqlite_snapshot(zipf, config)
+            print(f"SQLite snapshot requested for {config.name} but the database is {connection.vendor}; using dumpdata")
+        
+        member_name = 'database.json'
+        
+        with self._open_member(zipf, config, 'database', member_name, force_zip64=True) as member:
+            with io.TextIOWrapper(member, encoding='utf-8') as f:
+                call_command('dumpdata', stdout=f, indent=2)
+        
+        return member_name
+    
+    def _backup_sqlite_snapshot(self, zipf, config):
+        """Take a consistent page-level snapshot with SQLite's online backup API"""
+        member_name = 'database.sqlite3'
         
-        with open(db_backup_path, 'w') as f:
-            call_command('dumpdata', stdout=f, indent=2)
+        # The backup API needs a database file as its target; it only lives until it is archived
+        fd, snapshot_path = tempfile.mkstemp(suffix='.sqlite3', dir=self.base_backup_dir)
+        os.close(fd)
+        
+        try:
+            source = sqlite3.connect(connection.settings_dict['NAME'])
+            target = sqlite3.connect(snapshot_path)
+            try:
+                # A single step copies every page under one read lock, so the copy is consistent
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            
+            with open(snapshot_path, 'rb') as src:
+                with self._open_member(zipf, config, 'database', member_name) as dest:
+                    shutil.copyfileobj(src, dest, 1024 * 1024)
+        finally:
+            os.unlink(snapshot_path)
         
-        return db_backup_path
+        return member_name
     
-    def _backup_network_configs(self, backup_dir, config):
-        """Backup network device configurations"""
-        configs_backup_path = backup_dir / 'network_configs.json'
+    def _backup_network_configs(self, zipf, config, parent_state=None, chain_state=None):
+        """Backup network device configurations, one member per device and config type"""
+        # Config rows are append-only, so the highest id marks what this backup covers
+        high_water = NetworkConfig.objects.aggregate(Max('id'))['id__max'] or 0
+        low_water = parent_state.get('network_configs_max_id', 0) if parent_state else 0
+        if chain_state is not None:
+            chain_state['network_configs_max_id'] = high_water
         
-        network_configs = []
-        for device in Device.objects.all():
-            device_configs = device.configs.filter(is_active=True)
-            for net_config in device_configs:
-                network_configs.append(net_config.to_dict())
+        # Rows are read in chunks and written one record per line, so memory
+        # stays flat however large the fleet is. Inactive versions are read to
+        # keep decoding but not exported.
+        network_configs = NetworkConfig.objects.filter(id__gt=low_water, id__lte=high_water).iter_texts(
+            'device__ip_address', 'device__hostname', 'backup_timestamp', 'version', 'is_active'
+        )
         
-        with open(configs_backup_path, 'w') as f:
-            json.dump(network_configs, f, indent=2, default=str)
+        # The index lets a selective restore seek straight to the members it needs
+        index = []
+        taken = set()
+        groups = itertools.groupby(network_configs, key=lambda item: (item[0]['device_id'], item[0]['config_type']))
+        for _, group in groups:
+            versions = _exported_versions(group)
+            first = next(versions, None)
+            if first is None:
+                continue
+            device_ip, config_type = first[0]['device__ip_address'], first[0]['config_type']
+            entry = {
+                'device_ip': device_ip,
+                'config_type': config_type,
+                'member': config_member_name(device_ip, config_type, taken),
+                'records': 0,
+            }
+            with self._open_member(zipf, config, 'network_configs', entry['member']) as member:
+                with io.TextIOWrapper(member, encoding='utf-8') as f:
+                    for row, text, as_delta in itertools.chain([first], versions):
+                        f.write(json.dumps(_config_record(row, text, as_delta), default=str))
+                        f.write('\n')
+                        entry['records'] += 1
+            entry.update(self._member_location(zipf, entry['member']) or {})
+            index.append(entry)
+        
+        with self._open_member(zipf, config, 'network_configs', CONFIG_INDEX_MEMBER) as member:
+            member.write(json.dumps({'members': index}).encode('utf-8'))
         
-        return configs_backup_path
+        return CONFIG_INDEX_MEMBER
     
-    def _backup_media(self, backup_dir, config):
-        """Backup media files"""
-        media_backup_path = backup_dir / 'media'
-        media_backup_path.mkdir(exist_ok=True)
+    def _member_location(self, zipf, name):
+        """Offset and size of a member just written, or None outside a plain zip"""
+        if not isinstance(zipf, zipfile.ZipFile):
+            return None
+        return member_location(zipf.getinfo(name))
+    
+    def _backup_media(self, zipf, config, parent=None, backup_history=None):
+        """Backup new and changed media files, tracked in a persistent file index"""
+        member_prefix = 'media/'
+        hash_contents = getattr(settings, 'BACKUP_SETTINGS', {}).get('MEDIA_CONTENT_HASH', False)
+        
+        # Chained backups diff against the tree as it was when their parent ran
+        previous = load_index(self._media_index_path(parent.id)) if parent else None
+        previous_files = previous['files'] if previous else {}
+        
+        media_dir = self._media_root()
+        files = {}
+        for rel_path, stat in scan_tree(media_dir):
+            record = previous_files.get(rel_path)
+            if previous is not None and record and metadata_matches(record, stat):
+                files[rel_path] = record
+                continue
+            
+            file_path = media_dir / rel_path
+            try:
+                sha256 = hash_file(file_path, 'sha256') if hash_contents else None
+                if previous is not None and record and sha256 and record.get('sha256') == sha256:
+                    # Touched, but the content is identical
+                    files[rel_path] = file_record(stat, sha256)
+                    continue
+                
+                with open(file_path, 'rb') as src:
+                    with self._open_member(zipf, config, 'media', member_prefix + rel_path) as dest:
+                        shutil.copyfileobj(src, dest, 1024 * 1024)
+            except FileNotFoundError:
+                # Removed between the scan and the copy
+                continue
+            files[rel_path] = file_record(stat, sha256)
+        
+        deleted = sorted(set(previous_files) - set(files))
+        if deleted:
+            with self._open_member(zipf, config, 'manifest', 'media_deleted.json') as member:
+                member.write(json.dumps(deleted).encode('utf-8'))
         
-        media_dir = Path(settings.MEDIA_ROOT) if hasattr(settings, 'MEDIA_ROOT') else Path(settings.BASE_DIR) / 'media'
-        if media_dir.exists():
-            shutil.copytree(media_dir, media_backup_path, dirs_exist_ok=True)
+        if backup_history is not None:
+            save_index(self._media_index_path(backup_history.id), {'root': str(media_dir), 'files': files})
         
-        return media_backup_path
+        return member_prefix
+    
+    def _media_root(self):
+        return Path(settings.MEDIA_ROOT) if hasattr(settings, 'MEDIA_ROOT') else Path(settings.BASE_DIR) / 'media'
+    
+    def _media_index_path(self, backup_id):
+        """Where the media file index as of a given backup is kept"""
+        return self.base_backup_dir / 'index' / f"media_{backup_id}.json.gz"
     
-    def _backup_logs(self, backup_dir, config):
-        """Backup log files"""
-        logs_backup_path = backup_dir / 'logs'
-        logs_backup_path.mkdir(exist_ok=True)
+    def _backup_logs(self, zipf, config, previous_state=None, log_state=None):
+        """Backup the log bytes written since the previous backup as compressed segments"""
+        member_prefix = 'logs/'
+        previous_state = previous_state or {}
+        if log_state is None:
+            log_state = {}
         
         # Look for common log locations
         log_dirs = [
@@ -144,139 +508,330 @@ class BackupService:
         ]
         
         for log_dir in log_dirs:
-            if log_dir.exists():
-                for log_file in log_dir.glob('*.log'):
-                    shutil.copy2(log_file, logs_backup_path)
+            if not log_dir.exists():
+                continue
+            for log_file in log_dir.glob('*.log'):
+                try:
+                    with open(log_file, 'rb') as src:
+                        stat = os.fstat(src.fileno())
+                        start = plan_segment(stat, previous_state.get(str(log_file)))
+                        # Stop at the size seen now; later writes belong to the next backup
+                        end = stat.st_size
+                        log_state[str(log_file)] = {'inode': stat.st_ino, 'offset': end}
+                        if end == start:
+                            continue
+                        
+                        src.seek(start)
+                        member_name = segment_name(log_file, stat.st_ino, start, end)
+                        with self._open_member(zipf, config, 'logs', member_name,
+                                               force_zip64=end - start > zipfile.ZIP64_LIMIT) as dest:
+                            _copy_range(src, dest, end - start)
+                except (PermissionError, FileNotFoundError):
+                    # Unreadable or rotated away mid-run
+                    continue
         
-        return logs_backup_path
+        return member_prefix
     
-    def _create_backup_archive(self, backup_dir, config, timestamp):
-        """Create final backup archive"""
-        archive_name = f"{config.name}_{timestamp}.zip"
-        archive_path = self.base_backup_dir / archive_name
+    def _select_log_parent(self, config):
+        """The backup whose log offsets this one resumes from, or None to copy logs from the start
         
-        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(backup_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    arcname = file_path.relative_to(backup_dir)
-                    zipf.write(file_path, arcname)
+        Log chains don't follow backup_type: every backup of a config, full ones
+        included, archives only the log bytes written since the config's latest
+        backup. Every LOG_CHAIN_LENGTH backups the chain starts over, which keeps
+        restores short and lets retention delete the backups before it.
+        """
+        previous = (
+            config.backups.filter(status='completed', backup_data__has_key='log_parent')
+            .exclude(file_path='').order_by('-completed_at').first()
+        )
+        if previous is None or not Path(previous.file_path).exists():
+            return None
+        chain_length = getattr(settings, 'BACKUP_SETTINGS', {}).get('LOG_CHAIN_LENGTH', 7)
+        if previous.backup_data.get('log_chain_length', 0) + 1 >= chain_length:
+            return None
+        return previous
+    
+    def _log_chain(self, backup_history):
+        """The backups holding a backup's log segments, the one that copied them from the start first"""
+        if 'log_parent' not in backup_history.backup_data:
+            # Backups from before log chains kept their log segments along the parent chain
+            chain = backup_history.get_chain()
+            if chain[0].backup_mode != 'full':
+                raise ValueError(f"Backup chain for backup {backup_history.id} is incomplete")
+            return chain
         
-        # Remove temporary directory
-        shutil.rmtree(backup_dir)
+        chain = [backup_history]
+        while chain[-1].backup_data.get('log_parent'):
+            log_parent = BackupHistory.objects.filter(id=chain[-1].backup_data['log_parent']).first()
+            if log_parent is None:
+                raise ValueError(f"Log chain for backup {backup_history.id} is incomplete")
+            chain.append(log_parent)
+        chain.reverse()
+        return chain
+    
+    def restore_logs(self, backup_history, target_dir=None):
+        """Reassemble the logs as of a backup from the segments of its log chain"""
+        chain = self._log_chain(backup_history)
+        for backup in chain:
+            if not backup.file_path or not Path(backup.file_path).exists():
+                raise ValueError(f"Backup file not found for backup {backup.id}")
         
-        return archive_path
+        if target_dir is None:
+            target_dir = self.base_backup_dir / 'restored_logs' / f"{backup_history.config.name}_{backup_history.id}"
+        reassembler = LogReassembler(target_dir)
+        
+        for backup in chain:
+            with self._open_backup(backup.file_path) as zipf:
+                for key, segments in parse_segments(zipf.namelist()).items():
+                    for inode, start, end, name in sorted(segments, key=lambda segment: segment[1]):
+                        with zipf.open(name) as stream:
+                            reassembler.add_segment(key, inode, start, stream)
+        
+        return Path(target_dir)
     
     def _cleanup_old_backups(self, config):
         """Clean up old backups based on retention policy"""
-        # Get all backup history records for this config
-        cutoff_date = timezone.now() - timezone.timedelta(days=config.retention_months * 30)
-        
-        # Find backups older than retention period
-        old_backups = BackupHistory.objects.filter(
-            config=config,
-            status='completed',
-            completed_at__lt=cutoff_date
-        ).order_by('completed_at')
-        
-        if old_backups.exists() and config.archive_old_backups:
-            # Archive old backups instead of deleting
-            self._archive_old_backups(config, old_backups)
+        return self.apply_retention(config, self.plan_retention(config))
+    
+    def plan_retention(self, config, cutoff_date=None):
+        """Work out which of a configuration's backups retention removes
+        
+        One windowed query ranks every completed backup newest first. Backups
+        older than the retention period are archived (or deleted when archiving
+        is off); newer ones ranked past max_backups are deleted. With GFS tiers
+        set, the tiers pick the survivors instead and every other backup goes the
+        same way, by age. Backups that a surviving incremental/differential still
+        builds on, or whose log segments a surviving backup continues, are kept.
+        """
+        if cutoff_date is None:
+            cutoff_date = timezone.now() - timezone.timedelta(days=config.retention_months * 30)
+        
+        rows = list(
+            BackupHistory.objects.filter(config=config, status='completed')
+            .annotate(position=Window(RowNumber(), order_by=F('completed_at').desc()))
+            .annotate(log_parent=KT('backup_data__log_parent'))
+            .values('id', 'parent_id', 'log_parent', 'completed_at', 'file_path', 'file_size', 'position')
+            .order_by('-completed_at')
+        )
+        
+        if config.uses_gfs_retention:
+            survivors = _gfs_survivors(rows, config.gfs_tiers)
+            victims = [row for row in rows if row['id'] not in survivors]
+            old = [row for row in victims if row['completed_at'] < cutoff_date]
+            excess = [row for row in victims if row['completed_at'] >= cutoff_date]
         else:
-            # Delete old backups if archiving is disabled
-            for backup in old_backups:
-                if backup.file_path and Path(backup.file_path).exists():
-                    Path(backup.file_path).unlink()
-                backup.delete()
-        
-        # Also clean up based on max_backups count for recent backups
-        recent_backups = BackupHistory.objects.filter(
-            config=config,
-            status='completed',
-            completed_at__gte=cutoff_date
-        ).order_by('-completed_at')
-        
-        if recent_backups.count() > config.max_backups:
-            for backup in recent_backups[config.max_backups:]:
-                if backup.file_path and Path(backup.file_path).exists():
-                    Path(backup.file_path).unlink()
-                backup.delete()
+            old = [row for row in rows if row['completed_at'] < cutoff_date]
+            excess = [
+                row for row in rows
+                if row['completed_at'] >= cutoff_date and row['position'] > config.max_backups
+            ]
+        
+        victim_ids = {row['id'] for row in old} | {row['id'] for row in excess}
+        # SQLite hands a JSON null back as the text 'null'
+        protected = _chain_protected_ids(
+            {
+                row['id']: (row['parent_id'], int(row['log_parent']) if row['log_parent'] not in (None, 'null') else None)
+                for row in rows
+            },
+            victim_ids,
+        )
+        
+        old.sort(key=lambda row: row['completed_at'])
+        return {
+            'cutoff_date': cutoff_date,
+            'old': [row for row in old if row['id'] not in protected],
+            'excess': [row for row in excess if row['id'] not in protected],
+            'protected': len(protected),
+        }
+    
+    def apply_retention(self, config, plan):
+        """Archive or delete the backups a retention plan selected"""
+        started = time.perf_counter()
+        stats = {'archived': 0, 'deleted': 0, 'bytes_reclaimed': 0}
+        
+        old_ids = [row['id'] for row in plan['old']]
+        if old_ids and config.archive_old_backups:
+            stats['archived'] = self._archive_old_backups(
+                config, BackupHistory.objects.filter(id__in=old_ids).order_by('completed_at')
+            )
+            doomed = plan['excess']
+        else:
+            doomed = plan['old'] + plan['excess']
+        
+        if doomed:
+            self._delete_history_rows([row['id'] for row in doomed])
+            stats['deleted'] = len(doomed)
+            stats['bytes_reclaimed'] = self._delete_backup_files(doomed)
+        
+        stats['elapsed'] = time.perf_counter() - started
+        if stats['archived'] or stats['deleted']:
+            print(
+                f"Retention for {config.name}: archived {stats['archived']}, deleted {stats['deleted']}, "
+                f"reclaimed {stats['bytes_reclaimed'] / (1024 * 1024):.1f} MB in {stats['elapsed']:.2f}s"
+            )
+        return stats
+    
+    def _delete_history_rows(self, backup_ids, batch_size=500):
+        """Delete backup history rows in bulk, a batch of ids per statement"""
+        with transaction.atomic():
+            for start in range(0, len(backup_ids), batch_size):
+                BackupHistory.objects.filter(id__in=backup_ids[start:start + batch_size]).delete()
+    
+    def _delete_backup_files(self, rows):
+        """Remove the payloads of deleted backups, returning the bytes reclaimed
+        
+        Chunk store manifests are released one at a time, since that updates
+        refcounts; plain files and media indexes are unlinked on a thread pool.
+        """
+        reclaimed = 0
+        paths = []
+        for row in rows:
+            paths.append(self._media_index_path(row['id']))
+            if not row['file_path']:
+                continue
+            if is_manifest(row['file_path']) and Path(row['file_path']).exists():
+                reclaimed += self.chunk_store.release_manifest(row['file_path'])
+            paths.append(Path(row['file_path']))
+        
+        workers = getattr(settings, 'BACKUP_SETTINGS', {}).get('CLEANUP_WORKERS', 4)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            reclaimed += sum(executor.map(_unlink_file, paths))
+        return reclaimed
     
     def _archive_old_backups(self, config, old_backups):
-        """Archive old backups into a single archive file"""
+        """Archive old backups into the configuration's current archive segment
+        
+        Backup zips are stored as they are, without a second compression pass, and
+        appended to the newest segment until it reaches ARCHIVE_SEGMENT_SIZE. Each
+        backup's offset and length within the segment are kept in
+        BackupArchive.index, so restoring one takes a single seek.
+        """
         if not old_backups.exists():
-            return
+            return 0
         
-        # Create archive directory
-        archive_dir = Path(config.archive_path)
-        archive_dir.mkdir(parents=True, exist_ok=True)
+        segment_size = getattr(settings, 'BACKUP_SETTINGS', {}).get('ARCHIVE_SEGMENT_SIZE', 1024 ** 3)
+        backups = [
+            backup for backup in old_backups
+            if backup.file_path and Path(backup.file_path).exists()
+        ]
         
-        # Create archive filename with date range
-        start_date = old_backups.first().completed_at.strftime('%Y%m%d')
-        end_date = old_backups.last().completed_at.strftime('%Y%m%d')
-        archive_name = f"{config.name}_archive_{start_date}_to_{end_date}.zip"
-        archive_path = archive_dir / archive_name
+        backup_archive = self._current_archive_segment(config, segment_size)
+        if backup_archive is not None:
+            archive_path = Path(backup_archive.archive_path)
+        else:
+            archive_dir = Path(config.archive_path)
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            archive_path = archive_dir / f"{config.name}_archive_{timezone.now().strftime('%Y%m%d_%H%M%S')}.zip"
         
-        # Create archive
-        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            total_size = 0
-            backup_count = 0
-            
-            for backup in old_backups:
-                if backup.file_path and Path(backup.file_path).exists():
-                    backup_file = Path(backup.file_path)
-                    # Add backup file to archive with timestamp in name
-                    timestamp = backup.completed_at.strftime('%Y%m%d_%H%M%S')
-                    archive_filename = f"{config.name}_{timestamp}.zip"
-                    zipf.write(backup_file, archive_filename)
-                    total_size += backup_file.stat().st_size
-                    backup_count += 1
-                    
-                    # Remove original backup file
-                    backup_file.unlink()
-            
-            # Add metadata file
-            metadata = {
-                'config_name': config.name,
-                'archive_created': timezone.now().isoformat(),
-                'backup_count': backup_count,
-                'date_range_start': old_backups.first().completed_at.isoformat(),
-                'date_range_end': old_backups.last().completed_at.isoformat(),
-                'total_size': total_size,
-                'backups': [
-                    {
-                        'id': backup.id,
-                        'completed_at': backup.completed_at.isoformat(),
-                        'file_size': backup.file_size,
-                        'status': backup.status
-                    }
-                    for backup in old_backups
-                ]
-            }
+        members = []
+        with zipfile.ZipFile(archive_path, 'a' if backup_archive else 'w', zipfile.ZIP_STORED) as zipf:
+            for backup in backups:
+                member_name = f"{config.name}_{backup.id}_{backup.completed_at.strftime('%Y%m%d_%H%M%S')}.zip"
+                if is_manifest(backup.file_path):
+                    # Archives stay self-contained: rebuild the zip from the chunk store
+                    with zipf.open(member_name, 'w', force_zip64=True) as dest:
+                        self.export_backup_archive(backup.file_path, dest)
+                else:
+                    zipf.write(backup.file_path, member_name)
+                members.append((backup, zipf.getinfo(member_name)))
             
-            zipf.writestr('archive_metadata.json', json.dumps(metadata, indent=2))
-        
-        # Create BackupArchive record
-        BackupArchive.objects.create(
-            config=config,
-            archive_name=archive_name,
-            archive_path=str(archive_path),
-            archive_size=archive_path.stat().st_size,
-            backup_count=backup_count,
-            date_range_start=old_backups.first().completed_at,
-            date_range_end=old_backups.last().completed_at
-        )
+            # The archive describes its own contents, one metadata member per pass
+            if backups:
+                metadata = {
+                    'config_name': config.name,
+                    'archived_at': timezone.now().isoformat(),
+                    'backups': [
+                        {
+                            'id': backup.id,
+                            'member': zinfo.filename,
+                            'completed_at': backup.completed_at.isoformat(),
+                            'backup_mode': backup.backup_mode,
+                            'file_size': zinfo.file_size,
+                            'config_index': backup.backup_data.get('config_index'),
+                        }
+                        for backup, zinfo in members
+                    ]
+                }
+                zipf.writestr(
+                    f"archive_metadata_{backups[0].id}-{backups[-1].id}.json", json.dumps(metadata, indent=2)
+                )
         
-        # Delete old backup history records
-        old_backups.delete()
+        index = dict(backup_archive.index) if backup_archive else {}
+        with open(archive_path, 'rb') as f:
+            for backup, zinfo in members:
+                offset = data_offset(f, zinfo.header_offset)
+                index[str(backup.id)] = {
+                    'member': zinfo.filename,
+                    'offset': offset,
+                    'length': zinfo.compress_size,
+                    'algorithm': self.checksum_algorithm,
+                    'digest': hash_range(f, offset, zinfo.compress_size, self.checksum_algorithm),
+                    'completed_at': backup.completed_at.isoformat(),
+                    'backup_mode': backup.backup_mode,
+                    'config_index': backup.backup_data.get('config_index'),
+                }
+        
+        date_range_start = old_backups.first().completed_at
+        date_range_end = old_backups.last().completed_at
+        if backup_archive is None:
+            backup_archive = BackupArchive(
+                config=config,
+                archive_name=archive_path.name,
+                archive_path=str(archive_path),
+                backup_count=0,
+                date_range_start=date_range_start,
+                date_range_end=date_range_end,
+            )
+        backup_archive.index = index
+        backup_archive.backup_count += len(members)
+        backup_archive.archive_size = archive_path.stat().st_size
+        backup_archive.date_range_start = min(backup_archive.date_range_start, date_range_start)
+        backup_archive.date_range_end = max(backup_archive.date_range_end, date_range_end)
+        backup_archive.save()
+        
+        # Originals go only once the archive and its index are in place
+        rows = list(old_backups.values('id', 'file_path'))
+        self._delete_history_rows([row['id'] for row in rows])
+        self._delete_backup_files(rows)
+        
+        print(f"Archived {len(members)} backups for {config.name} to {archive_path.name}")
+        return len(members)
+    
+    def _current_archive_segment(self, config, segment_size):
+        """The configuration's newest archive segment if it can take more backups"""
+        backup_archive = BackupArchive.objects.filter(config=config).order_by('-created_at', '-id').first()
+        if backup_archive is None or not backup_archive.index:
+            return None
         
-        print(f"Archived {backup_count} backups for {config.name} to {archive_name}")
+        archive_path = Path(backup_archive.archive_path)
+        if archive_path.parent != Path(config.archive_path) or not archive_path.exists():
+            return None
+        if archive_path.stat().st_size >= segment_size:
+            return None
+        return backup_archive
     
     def restore_from_archive(self, backup_archive, target_backup_id=None):
-        """Restore a specific backup from an archive"""
+        """Restore a specific backup from an archive, or all of them oldest first"""
         if not Path(backup_archive.archive_path).exists():
             raise ValueError("Archive file not found")
         
+        if not backup_archive.index:
+            return self._restore_from_legacy_archive(backup_archive, target_backup_id)
+        
+        if target_backup_id:
+            if str(target_backup_id) not in backup_archive.index:
+                raise ValueError(f"Backup ID {target_backup_id} not found in archive")
+            entries = [backup_archive.index[str(target_backup_id)]]
+        else:
+            entries = sorted(backup_archive.index.values(), key=lambda entry: entry['completed_at'])
+        
+        with open(backup_archive.archive_path, 'rb') as f:
+            for entry in entries:
+                # Stored members are plain byte ranges: one seek reaches the backup
+                self.restore_backup_file(FileSlice(f, entry['offset'], entry['length']))
+    
+    def _restore_from_legacy_archive(self, backup_archive, target_backup_id=None):
+        """Restore from an archive written before archives kept an index"""
         with zipfile.ZipFile(backup_archive.archive_path, 'r') as zipf:
             # Read metadata
             metadata_str = zipf.read('archive_metadata.json').decode('utf-8')
@@ -293,126 +848,414 @@ class BackupService:
                 if not target_backup:
                     raise ValueError(f"Backup ID {target_backup_id} not found in archive")
                 
-                # Extract specific backup
-                timestamp = target_backup['completed_at'][:19].replace(':', '').replace('-', '').replace('T', '_')
-                archive_filename = f"{backup_archive.config.name}_{timestamp}.zip"
+                archive_filename = self._archived_backup_name(backup_archive.config, target_backup)
                 
-                if archive_filename in zipf.namelist():
-                    # Extract to temporary location
-                    temp_dir = self.base_backup_dir / f"restore_archive_{backup_archive.id}"
-                    temp_dir.mkdir(exist_ok=True)
-                    
-                    zipf.extract(archive_filename, temp_dir)
-                    backup_file = temp_dir / archive_filename
-                    
-                    # Restore from the extracted backup
-                    self.restore_backup_file(backup_file)
-                    
-                    # Cleanup
-                    shutil.rmtree(temp_dir)
-                else:
+                if archive_filename not in zipf.namelist():
                     raise ValueError(f"Backup file {archive_filename} not found in archive")
+                
+                # Read the nested backup in place rather than extracting it
+                with zipf.open(archive_filename) as backup_file:
+                    self.restore_backup_file(backup_file)
             else:
                 # Restore all backups from archive
-                temp_dir = self.base_backup_dir / f"restore_archive_{backup_archive.id}"
-                temp_dir.mkdir(exist_ok=True)
-                
-                try:
-                    # Extract all backup files
-                    for filename in zipf.namelist():
-                        if filename.endswith('.zip') and filename != 'archive_metadata.json':
-                            zipf.extract(filename, temp_dir)
-                    
-                    # Restore each backup
-                    for backup_file in temp_dir.glob('*.zip'):
-                        self.restore_backup_file(backup_file)
-                
-                finally:
-                    # Cleanup
-                    shutil.rmtree(temp_dir)
+                for filename in zipf.namelist():
+                    if filename.endswith('.zip'):
+                        with zipf.open(filename) as backup_file:
+                            self.restore_backup_file(backup_file)
+    
+    def _archived_backup_name(self, config, backup_info):
+        """Name a backup was stored under in a legacy archive, from its metadata entry"""
+        timestamp = backup_info['completed_at'][:19].replace(':', '').replace('-', '').replace('T', '_')
+        return f"{config.name}_{timestamp}.zip"
     
-    def restore_backup_file(self, backup_file):
-        """Restore from a backup file"""
-        temp_dir = self.base_backup_dir / f"restore_{backup_file.stem}"
+    def restore_selected(self, source, device_ips=None, config_type=None, backup_id=None, skip_identical=False):
+        """Restore the network configs of some devices and/or one config type
         
-        try:
-            # Extract backup
-            with zipfile.ZipFile(backup_file, 'r') as zipf:
-                zipf.extractall(temp_dir)
+        source is a BackupHistory (its chain is replayed) or a BackupArchive, in
+        which case backup_id picks the archived backup (default: the newest).
+        Only the index and the matching members are read from the archive.
+        """
+        if not device_ips and not config_type:
+            raise ValueError("Select device IPs, a config type, or both")
+        device_ips = set(device_ips or [])
+        
+        if isinstance(source, BackupArchive):
+            records = self._iter_archived_selected_records(source, backup_id, device_ips, config_type)
+        else:
+            chain = source.get_chain()
+            for backup in chain:
+                if not backup.file_path or not Path(backup.file_path).exists():
+                    raise ValueError(f"Backup file not found for backup {backup.id}")
+            records = itertools.chain.from_iterable(
+                self._iter_stored_selected_records(backup, device_ips, config_type) for backup in chain
+            )
+        
+        return self._restore_network_configs(records, skip_identical=skip_identical)
+    
+    def _iter_stored_selected_records(self, backup, device_ips, config_type):
+        if is_manifest(backup.file_path):
+            with self._open_backup(backup.file_path) as archive:
+                if CONFIG_INDEX_MEMBER not in archive.namelist():
+                    yield from self._iter_filtered_records(archive, device_ips, config_type)
+                    return
+                index = json.loads(archive.read(CONFIG_INDEX_MEMBER))
+                for entry in select_entries(index, device_ips, config_type):
+                    yield from _ndjson_records(archive.read(entry['member']))
+            return
+        
+        with open(backup.file_path, 'rb') as f:
+            yield from self._iter_selected_records(f, backup.backup_data.get('config_index'), device_ips, config_type)
+    
+    def _iter_archived_selected_records(self, backup_archive, backup_id, device_ips, config_type):
+        if not Path(backup_archive.archive_path).exists():
+            raise ValueError("Archive file not found")
+        
+        if backup_archive.index:
+            if backup_id is not None and str(backup_id) not in backup_archive.index:
+                raise ValueError(f"Backup ID {backup_id} not found in archive")
+            entry = (
+                backup_archive.index[str(backup_id)] if backup_id is not None
+                else max(backup_archive.index.values(), key=lambda entry: entry['completed_at'])
+            )
+            with open(backup_archive.archive_path, 'rb') as f:
+                inner = FileSlice(f, entry['offset'], entry['length'])
+                yield from self._iter_selected_records(inner, entry.get('config_index'), device_ips, config_type)
+            return
+        
+        with open(backup_archive.archive_path, 'rb') as f, zipfile.ZipFile(f) as outer:
+            metadata = json.loads(outer.read('archive_metadata.json'))
+            backups = [
+                backup_info for backup_info in metadata['backups']
+                if backup_id is None or backup_info['id'] == backup_id
+            ]
+            if not backups:
+                raise ValueError(f"Backup ID {backup_id} not found in archive")
+            backup_info = max(backups, key=lambda backup_info: backup_info['completed_at'])
+            
+            zinfo = outer.getinfo(self._archived_backup_name(backup_archive.config, backup_info))
+            if zinfo.compress_type == zipfile.ZIP_STORED:
+                # A stored inner zip is a plain byte range of the archive
+                inner = FileSlice(f, data_offset(f, zinfo.header_offset), zinfo.file_size)
+                yield from self._iter_selected_records(inner, backup_info.get('config_index'), device_ips, config_type)
+            else:
+                with outer.open(zinfo) as inner:
+                    yield from self._iter_selected_records(inner, None, device_ips, config_type)
+    
+    def _iter_selected_records(self, f, index_location, device_ips, config_type):
+        """Yield matching config records from a seekable backup zip
+        
+        With the index's location known, only the index and matching members are
+        read; otherwise the central directory is read to find them. Backups from
+        before the index existed are scanned and filtered.
+        """
+        if index_location:
+            index = json.loads(read_member_at(f, index_location))
+        else:
+            with zipfile.ZipFile(f) as zipf:
+                if CONFIG_INDEX_MEMBER not in zipf.namelist():
+                    yield from self._iter_filtered_records(zipf, device_ips, config_type)
+                    return
+                index = json.loads(zipf.read(CONFIG_INDEX_MEMBER))
+        
+        for entry in select_entries(index, device_ips, config_type):
+            if entry.get('offset') is not None:
+                data = read_member_at(f, entry)
+            else:
+                with zipfile.ZipFile(f) as zipf:
+                    data = zipf.read(entry['member'])
+            yield from _ndjson_records(data)
+    
+    def _iter_filtered_records(self, zipf, device_ips, config_type):
+        names = [name for name in zipf.namelist() if name in ('network_configs.ndjson', 'network_configs.json')]
+        for record in self._iter_members_config_records(zipf, names):
+            if record_matches(record, device_ips, config_type):
+                yield record
+    
+    def restore_backup_file(self, backup_file, restore_database=True, skip_identical=False, progress=None):
+        """Restore from a backup file, streaming each member out of the archive"""
+        with self._open_backup(backup_file) as zipf:
+            names = zipf.namelist()
             
             # Restore database
-            db_file = temp_dir / 'database.json'
-            if db_file.exists():
-                call_command('loaddata', str(db_file))
+            if restore_database:
+                self._restore_database(zipf, progress)
             
-            # Restore network configs
-            configs_file = temp_dir / 'network_configs.json'
-            if configs_file.exists():
-                self._restore_network_configs(configs_file)
+            # Restore network configs: per-device members, or the single NDJSON/JSON
+            # member older backups have
+            configs_members = [
+                name for name in names
+                if name.startswith(CONFIG_MEMBER_PREFIX)
+                or name in ('network_configs.ndjson', 'network_configs.json')
+            ]
+            if configs_members:
+                self._restore_network_configs(
+                    self._iter_members_config_records(zipf, configs_members),
+                    skip_identical=skip_identical,
+                )
             
-            # Restore media files
-            media_dir = temp_dir / 'media'
-            if media_dir.exists():
-                target_media = Path(settings.MEDIA_ROOT) if hasattr(settings, 'MEDIA_ROOT') else Path(settings.BASE_DIR) / 'media'
-                shutil.copytree(media_dir, target_media, dirs_exist_ok=True)
+            # Restore media files straight to their final location
+            media_root = self._media_root()
+            for name in names:
+                if name.startswith('media/') and not name.endswith('/'):
+                    self._restore_media_member(zipf, name, media_root)
             
-        finally:
-            # Cleanup
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
+            # Replay deletions recorded by an incremental or differential backup
+            if 'media_deleted.json' in names:
+                for rel_path in json.loads(zipf.read('media_deleted.json')):
+                    target = self._media_target(media_root, rel_path)
+                    if target is not None:
+                        target.unlink(missing_ok=True)
     
-    def restore_backup(self, backup_history):
-        """Restore from a backup"""
-        if not backup_history.file_path or not Path(backup_history.file_path).exists():
-            raise ValueError("Backup file not found")
+    def restore_backup(self, backup_history, skip_identical=False, progress=None):
+        """Restore from a backup, replaying its full/incremental chain"""
+        chain = backup_history.get_chain()
+        if chain[0].backup_mode != 'full':
+            raise ValueError(f"Backup chain for backup {backup_history.id} is incomplete")
+        
+        for backup in chain:
+            if not backup.file_path or not Path(backup.file_path).exists():
+                raise ValueError(f"Backup file not found for backup {backup.id}")
         
-        archive_path = Path(backup_history.file_path)
-        temp_dir = self.base_backup_dir / f"restore_{backup_history.id}"
+        # Each database dump is complete, so only the newest one is loaded. It goes
+        # first because a SQLite snapshot replaces every table.
+        with self._open_backup(chain[-1].file_path) as zipf:
+            self._restore_database(zipf, progress)
         
+        for backup in chain:
+            self.restore_backup_file(
+                Path(backup.file_path), restore_database=False, skip_identical=skip_identical
+            )
+        
+        # The media index makes the restored tree exactly what it was at that backup
+        media_index = load_index(self._media_index_path(backup_history.id))
+        if media_index is not None:
+            media_root = self._media_root()
+            for rel_path, _ in list(scan_tree(media_root)):
+                if rel_path not in media_index['files']:
+                    (media_root / rel_path).unlink()
+    
+    def _restore_database(self, zipf, progress=None):
+        """Restore whichever database export a backup archive contains
+        
+        progress, if given, is called as progress(objects_loaded, model_label)
+        while a JSON dump loads.
+        """
+        names = zipf.namelist()
+        if 'database.sqlite3' not in names and 'database.json' not in names:
+            return
+        
+        # Outcomes of backups finished by now, for rows the dump caught while they ran
+        finished = {
+            row.pop('id'): row for row in BackupHistory.objects.exclude(status__in=('pending', 'running')).values(
+                'id', 'status', 'completed_at', 'file_path', 'file_size', 'error_message', 'backup_data'
+            )
+        }
+        
+        if 'database.sqlite3' in names:
+            self._restore_sqlite_snapshot(zipf, 'database.sqlite3')
+        else:
+            with zipf.open('database.json') as stream:
+                self._load_json_fixture(stream, progress)
+        
+        self._settle_restored_backups(finished)
+        
+        # Chunk refcounts were rolled back with everything else; the manifests on disk are current
+        if self.chunk_store.root.exists():
+            kept, deleted = self.chunk_store.rebuild_refcounts(
+                path for path in self.base_backup_dir.glob(f'*{MANIFEST_SUFFIX}*') if is_manifest(path)
+            )
+            print(f"Recounted references to {kept} stored chunks ({deleted} unreferenced chunks deleted)")
+    
+    def _settle_restored_backups(self, finished):
+        """Resolve backups a restored dump still shows as running
+        
+        A dump is taken while its own backup runs, so restoring it brings that
+        row back as 'running', which would hold the config's claim until
+        RUNNING_BACKUP_TIMEOUT. Rows that finished before the restore get their
+        outcome back; the rest are marked failed.
+        """
+        now = timezone.now()
+        for backup_id in BackupHistory.objects.filter(status='running').values_list('id', flat=True):
+            outcome = finished.get(backup_id)
+            if outcome is not None:
+                BackupHistory.objects.filter(id=backup_id).update(**outcome)
+            else:
+                BackupHistory.objects.filter(id=backup_id).update(
+                    status='failed', completed_at=now, error_message='Interrupted by a database restore'
+                )
+    
+    def _load_json_fixture(self, stream, progress=None):
+        """Bulk load a dumpdata fixture streamed from an archive member"""
+        batch_size = getattr(settings, 'BACKUP_SETTINGS', {}).get('RESTORE_BATCH_SIZE', 2000)
+        started = time.perf_counter()
+        loaded = FixtureLoader(batch_size=batch_size, progress=progress).load(stream)
+        print(f"Loaded {loaded} database objects in {time.perf_counter() - started:.1f}s")
+        # Dumps from before ip_key existed load without it
+        Device.objects.sync_ip_keys()
+        # The loader sends no signals, so the search index is rebuilt in one go
+        indexed = config_search.rebuild()
+        print(f"Indexed {indexed} network configs for search")
+    
+    def _restore_sqlite_snapshot(self, zipf, member_name):
+        """Copy a SQLite snapshot over the live database, page by page"""
+        if connection.vendor != 'sqlite':
+            raise ValueError("SQLite snapshots can only be restored into a SQLite database")
+        
+        # The backup API needs a database file as its source; stream the member out to one
+        fd, snapshot_path = tempfile.mkstemp(suffix='.sqlite3', dir=self.base_backup_dir)
         try:
-            # Extract backup
-            with zipfile.ZipFile(archive_path, 'r') as zipf:
-                zipf.extractall(temp_dir)
+            with os.fdopen(fd, 'wb') as dest, zipf.open(member_name) as src:
+                shutil.copyfileobj(src, dest, 1024 * 1024)
             
-            # Restore database
-            db_file = temp_dir / 'database.json'
-            if db_file.exists():
-                call_command('loaddata', str(db_file))
+            # Django's own connection must not hold the database open across the copy
+            connection.close()
             
-            # Restore network configs
-            configs_file = temp_dir / 'network_configs.json'
-            if configs_file.exists():
-                self._restore_network_configs(configs_file)
+            source = sqlite3.connect(snapshot_path)
+            target = sqlite3.connect(connection.settings_dict['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+        finally:
+            os.unlink(snapshot_path)
+    
+    def _media_target(self, media_root, rel_path):
+        """Resolve a media path from a backup, refusing anything outside MEDIA_ROOT"""
+        target = (media_root / rel_path).resolve()
+        if media_root.resolve() not in target.parents:
+            return None
+        return target
+    
+    def _restore_media_member(self, zipf, name, media_root):
+        target = self._media_target(media_root, name[len('media/'):])
+        if target is None:
+            return
+        
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with zipf.open(name) as src, open(target, 'wb') as dest:
+            shutil.copyfileobj(src, dest, 1024 * 1024)
+    
+    def _iter_members_config_records(self, zipf, member_names):
+        for member_name in member_names:
+            with zipf.open(member_name) as stream:
+                yield from self._iter_network_config_records(stream, member_name)
+    
+    def _iter_network_config_records(self, stream, member_name):
+        """Yield config records from an NDJSON export or a legacy JSON list"""
+        text = io.TextIOWrapper(stream, encoding='utf-8')
+        if member_name.endswith('.ndjson'):
+            yield from resolve_record_deltas(json.loads(line) for line in text if line.strip())
+        else:
+            yield from json.load(text)
+    
+    def _restore_network_configs(self, records, skip_identical=False, batch_size=None):
+        """Restore network configurations from backup records in bulk
+        
+        Records are taken a batch at a time: the batch's device IPs are resolved
+        with one query, missing devices are created with one bulk insert and the
+        configs with another, all inside a single transaction. A config whose
+        content hash matches the newest stored version of its device and type is
+        never stored again; with skip_identical, neither is one matching any
+        stored version.
+        """
+        if batch_size is None:
+            batch_size = getattr(settings, 'BACKUP_SETTINGS', {}).get('RESTORE_BATCH_SIZE', 2000)
+        
+        started = time.perf_counter()
+        stats = {'created': 0, 'skipped': 0, 'unchanged': 0, 'devices_created': 0}
+        devices = {}
+        existing = set()
+        # Newest version of each device and config type, for delta encoding
+        latest = {}
+        
+        with transaction.atomic():
+            batch = []
+            for record in records:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    self._restore_config_batch(batch, devices, existing, latest, skip_identical, stats)
+                    batch = []
+            if batch:
+                self._restore_config_batch(batch, devices, existing, latest, skip_identical, stats)
+        
+        elapsed = time.perf_counter() - started
+        stats['elapsed'] = elapsed
+        stats['rows_per_sec'] = stats['created'] / elapsed if elapsed > 0 else 0
+        print(
+            f"Restored {stats['created']} network configs ({stats['skipped']} identical skipped, "
+            f"{stats['unchanged']} unchanged from the previous version, "
+            f"{stats['devices_created']} devices created) at {stats['rows_per_sec']:.0f} rows/sec"
+        )
+        return stats
+    
+    def _restore_config_batch(self, batch, devices, existing, latest, skip_identical, stats):
+        """Insert one batch of config records, extending the device map as needed"""
+        new_ips = {record['device_ip'] for record in batch} - devices.keys()
+        if new_ips:
+            # Matched on ip_key, so any notation of the same address finds the device
+            ips_by_key = {}
+            for ip_address in new_ips:
+                ips_by_key.setdefault(ip_key(ip_address), []).append(ip_address)
+            ips_by_key.pop('', None)
+            for device_id, key in (
+                Device.objects.filter(ip_key__in=ips_by_key).order_by('id').values_list('id', 'ip_key')
+            ):
+                for ip_address in ips_by_key[key]:
+                    devices.setdefault(ip_address, device_id)
             
-            # Restore media
-            media_dir = temp_dir / 'media'
-            if media_dir.exists():
-                target_media = Path(settings.MEDIA_ROOT) if hasattr(settings, 'MEDIA_ROOT') else Path(settings.BASE_DIR) / 'media'
-                shutil.copytree(media_dir, target_media, dirs_exist_ok=True)
+            missing = {}
+            for record in batch:
+                if record['device_ip'] not in devices:
+                    missing.setdefault(record['device_ip'], Device(
+                        ip_address=record['device_ip'],
+                        hostname=record.get('device_hostname', ''),
+                    ))
+            if missing:
+                Device.objects.bulk_create(missing.values(), batch_size=len(missing))
+                if any(device.pk is None for device in missing.values()):
+                    # Backends that can't return inserted ids need a lookup
+                    for device_id, ip_address in (
+                        Device.objects.filter(ip_key__in={device.ip_key for device in missing.values()})
+                        .values_list('id', 'ip_address')
+                    ):
+                        missing[ip_address].pk = device_id
+                for ip_address, device in missing.items():
+                    devices[ip_address] = device.pk
+                stats['devices_created'] += len(missing)
+                suggestion_index.invalidate()
             
-        finally:
-            # Cleanup
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
-    
-    def _restore_network_configs(self, configs_file):
-        """Restore network configurations from backup"""
-        with open(configs_file, 'r') as f:
-            configs_data = json.load(f)
-        
-        for config_data in configs_data:
-            device, created = Device.objects.get_or_create(
-                ip_address=config_data['device_ip'],
-                defaults={'hostname': config_data.get('device_hostname', '')}
-            )
+            if skip_identical:
+                new_ids = [devices[ip_address] for ip_address in new_ips]
+                existing.update(
+                    NetworkConfig.objects.filter(device_id__in=new_ids)
+                    .values_list('device_id', 'config_type', 'content_hash')
+                )
+        
+        configs = []
+        volatile = volatile_line_pattern()
+        for record in batch:
+            device_id = devices[record['device_ip']]
+            if skip_identical:
+                key = (device_id, record['config_type'], hash_config(record['config_data'], volatile))
+                if key in existing:
+                    stats['skipped'] += 1
+                    continue
+                existing.add(key)
             
-            NetworkConfig.objects.create(
-                device=device,
-                config_type=config_data['config_type'],
-                config_data=config_data['config_data'],
-                version=config_data.get('version', '1.0'),
-                is_active=config_data.get('is_active', True)
-            )
+            configs.append(NetworkConfig(
+                device_id=device_id,
+                config_type=record['config_type'],
+                config_data=record['config_data'],
+                version=record.get('version', '1.0'),
+                is_active=record.get('is_active', True),
+            ))
+        
+        created = NetworkConfig.objects.bulk_create_versions(
+            configs, batch_size=len(configs) or None, latest=latest, skip_unchanged=True
+        )
+        stats['created'] += len(created)
+        stats['unchanged'] += len(configs) - len(created)
     
     def get_backup_status(self):
         """Get current backup status for all configurations"""
@@ -432,33 +1275,168 @@ class BackupService:
         
         return status
     
-    def _auto_push_backup(self, archive_path, config):
-        """Auto push backup to remote location if enabled"""
-        try:
-            # This is a placeholder implementation
-            # In a real implementation, you would push to:
-            # - Cloud storage (AWS S3, Google Cloud Storage, etc.)
-            # - FTP/SFTP server
-            # - Network share
-            # - Git repository
-            # - etc.
-            
-            print(f"Auto pushing backup {archive_path} for config {config.name}")
-            
-            # Example implementation for demonstration:
-            # You could add configuration fields for:
-            # - Remote server details
-            # - Authentication credentials
-            # - Push destination path
-            # - Push method (FTP, SCP, cloud API, etc.)
-            
-            # For now, just log that auto push would happen
-            print(f"Backup {archive_path} would be pushed to remote location for {config.name}")
-            
-        except Exception as e:
-            print(f"Error auto pushing backup for {config.name}: {e}")
-            # Don't raise the exception to avoid breaking the backup process
+    def push_backup(self, backup_history):
+        """Send a completed backup to its config's push target
+        
+        Chunk stores are exported to a standalone zip first. The export and the
+        transport's resume state are kept until the push succeeds, so a failed
+        push picks up from the chunks already sent.
+        """
+        config = backup_history.config
+        if not config.push_target:
+            raise ValueError(f"No push target configured for {config.name}")
+        
+        transport = get_transport(config.push_target, config.push_options, self.base_backup_dir / 'push_state')
+        backup_file = Path(backup_history.file_path)
+        
+        if is_manifest(backup_file):
+            remote_name = backup_file.name[:-len(MANIFEST_SUFFIX)] + '.zip'
+            upload_path = self.base_backup_dir / 'push_state' / 'exports' / remote_name
+            if not upload_path.exists():
+                upload_path.parent.mkdir(parents=True, exist_ok=True)
+                partial_path = upload_path.with_name(upload_path.name + '.partial')
+                with open(partial_path, 'wb') as f:
+                    self.export_backup_archive(backup_file, f)
+                partial_path.replace(upload_path)
+        else:
+            remote_name = backup_file.name
+            upload_path = backup_file
+        
+        result = transport.push(upload_path, remote_name)
+        if upload_path != backup_file:
+            upload_path.unlink()
+        
+        result['pushed_at'] = timezone.now().isoformat()
+        backup_history.backup_data['push'] = result
+        BackupHistory.objects.filter(id=backup_history.id).update(backup_data=backup_history.backup_data)
+        
+        rate = result['bytes'] / (1024 * 1024) / result['seconds'] if result['seconds'] else 0
+        print(f"Pushed backup {backup_history.id} to {result['target']} "
+              f"({result['bytes'] / (1024 * 1024):.1f} MB, {rate:.1f} MB/s, {result['resumed_bytes']} bytes resumed)")
+        return result
 
 
 # Global backup service instance
 backup_service = BackupService()
+
+
+# Period each GFS tier keeps one backup of, from a local completion time
+_GFS_PERIODS = {
+    'hourly': lambda moment: (moment.date(), moment.hour),
+    'daily': lambda moment: moment.date(),
+    'weekly': lambda moment: moment.isocalendar()[:2],
+    'monthly': lambda moment: (moment.year, moment.month),
+}
+
+
+def _gfs_survivors(rows, tiers):
+    """Ids a grandfather-father-son policy keeps, in one pass over rows ordered newest first
+    
+    Each tier keeps the newest backup of each of its last N periods that have a
+    backup; a backup is kept if any tier keeps it.
+    """
+    survivors = set()
+    periods = {tier: set() for tier, keep in tiers.items() if keep}
+    for row in rows:
+        moment = timezone.localtime(row['completed_at'])
+        for tier, seen in periods.items():
+            period = _GFS_PERIODS[tier](moment)
+            if period in seen or len(seen) >= tiers[tier]:
+                continue
+            seen.add(period)
+            survivors.add(row['id'])
+    return survivors
+
+
+def _chain_protected_ids(predecessors, victim_ids):
+    """Ids among victim_ids that a surviving chained backup still depends on
+    
+    predecessors maps every completed backup id of a configuration to the ids
+    it builds on: its parent and its log parent, either of which may be None.
+    """
+    protected = set()
+    pending = [
+        predecessor
+        for backup_id, backup_predecessors in predecessors.items() if backup_id not in victim_ids
+        for predecessor in backup_predecessors
+    ]
+    while pending:
+        backup_id = pending.pop()
+        if backup_id and backup_id not in protected:
+            protected.add(backup_id)
+            pending.extend(predecessors.get(backup_id, ()))
+    
+    return protected & victim_ids
+
+
+def _unlink_file(path):
+    """Delete a file if it exists, returning its size"""
+    try:
+        size = os.stat(path).st_size
+        os.unlink(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+def _ndjson_records(data):
+    lines = data.decode('utf-8').splitlines()
+    yield from resolve_record_deltas(json.loads(line) for line in lines if line.strip())
+
+
+def _exported_versions(versions):
+    """Active versions of one device and config type, as (row, text, as_delta)
+    
+    A version is exported as its stored delta when the version it builds on
+    was exported just before it, so a restore can rebuild it; otherwise as
+    full text.
+    """
+    previous_exported = False
+    for row, text in versions:
+        if not row['is_active']:
+            previous_exported = False
+            continue
+        yield row, text, previous_exported and row['delta_depth'] > 0
+        previous_exported = True
+
+
+def _config_record(row, text, as_delta):
+    record = {
+        'device_ip': row['device__ip_address'],
+        'device_hostname': row['device__hostname'],
+        'config_type': row['config_type'],
+        'backup_timestamp': row['backup_timestamp'].isoformat(),
+        'version': row['version'],
+        'is_active': row['is_active'],
+    }
+    if as_delta:
+        record['config_delta'] = row['stored_data']
+    else:
+        record['config_data'] = text
+    return record
+
+
+def _copy_range(src, dest, length, buffer_size=1024 * 1024):
+    """Copy exactly length bytes (or until EOF) from src to dest"""
+    while length > 0:
+        data = src.read(min(buffer_size, length))
+        if not data:
+            break
+        dest.write(data)
+        length -= len(data)
+
+
+def _init_backup_worker():
+    """Prepare a backup worker process with its own Django setup"""
+    import django
+    from django.db import connections
+    
+    django.setup()
+    # Never share a connection inherited from the parent process
+    connections.close_all()
+
+
+def _run_backup_in_process(config_id):
+    """Process pool entry point"""
+    config = BackupConfig.objects.get(pk=config_id)
+    return backup_service._run_due_backup(config, close_connection=True)
@@ -0,0 +1,399 @@
+import io
+import os
+import json
+import zlib
+import hashlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from django.db import transaction
+from django.db.models import F
+from .models import StoredChunk
+
+
+# Content-defined chunking on line boundaries: a chunk ends after a line whose
+# CRC matches the boundary mask, so an edit only disturbs the chunks around it.
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+BOUNDARY_MASK = 0x3FF
+
+# Chunks held in memory before their refcounts and files are committed
+FLUSH_EVERY = 64
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+_thread_lock = threading.Lock()
+
+
+def is_manifest(path):
+    """Whether a backup file path points at a chunk store manifest"""
+    return str(path).endswith(MANIFEST_SUFFIX) or str(path).endswith(MANIFEST_SUFFIX + '.partial')
+
+
+class _Chunker:
+    """Incremental content-defined chunker"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scan_from = 0
+
+    def feed(self, data):
+        self._buffer += data
+        buffer = self._buffer
+        start = 0
+        pos = self._scan_from
+
+        while True:
+            newline = buffer.find(b'\n', pos)
+            if newline == -1:
+                break
+            end = newline + 1
+            size = end - start
+            if size >= MAX_CHUNK_SIZE:
+                yield bytes(buffer[start:start + MAX_CHUNK_SIZE])
+                start += MAX_CHUNK_SIZE
+                pos = max(start, pos)
+                continue
+            if size >= MIN_CHUNK_SIZE and zlib.crc32(buffer[pos:end]) & BOUNDARY_MASK == BOUNDARY_MASK:
+                yield bytes(buffer[start:end])
+                start = end
+            pos = end
+
+        # Data without newlines (binary payloads) falls back to fixed-size chunks
+        while len(buffer) - start >= MAX_CHUNK_SIZE and buffer.find(b'\n', start, start + MAX_CHUNK_SIZE) == -1:
+            yield bytes(buffer[start:start + MAX_CHUNK_SIZE])
+            start += MAX_CHUNK_SIZE
+            pos = max(start, pos)
+
+        del buffer[:start]
+        self._scan_from = pos - start
+
+    def finish(self):
+        if self._buffer:
+            yield bytes(self._buffer)
+        self._buffer = bytearray()
+        self._scan_from = 0
+
+
+class ChunkStore:
+    """Content-addressed, reference-counted store for backup payloads"""
+
+    def __init__(self, root, level=6):
+        self.root = Path(root)
+        self.level = level
+
+    def chunk_path(self, digest):
+        return self.root / digest[:2] / digest
+
+    @contextmanager
+    def _locked(self):
+        """Serialise refcount changes with file creation and removal"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with _thread_lock:
+            with open(self.root / '.lock', 'a+b') as lock_file:
+                _lock_file(lock_file)
+                try:
+                    yield
+                finally:
+                    _unlock_file(lock_file)
+
+    def add(self, chunks):
+        """Reference the given (digest, data) chunks, writing any the store lacks"""
+        counts = Counter(digest for digest, _ in chunks)
+        payloads = dict(chunks)
+
+        with self._locked(), transaction.atomic():
+            existing = set(
+                StoredChunk.objects.filter(digest__in=counts).values_list('digest', flat=True)
+            )
+            for digest in existing:
+                StoredChunk.objects.filter(digest=digest).update(refcount=F('refcount') + counts[digest])
+
+            new_chunks = []
+            for digest, count in counts.items():
+                if digest in existing:
+                    continue
+                stored_size = self._write_chunk(digest, payloads[digest])
+                new_chunks.append(StoredChunk(
+                    digest=digest,
+                    size=len(payloads[digest]),
+                    stored_size=stored_size,
+                    refcount=count,
+                ))
+            StoredChunk.objects.bulk_create(new_chunks)
+
+    def release(self, digests):
+        """Drop one reference per listed digest and delete unreferenced chunks"""
+        counts = Counter(digests)
+        if not counts:
+            return 0
+
+        reclaimed = 0
+        with self._locked(), transaction.atomic():
+            for digest, count in counts.items():
+                StoredChunk.objects.filter(digest=digest).update(refcount=F('refcount') - count)
+
+            orphans = StoredChunk.objects.filter(digest__in=counts, refcount__lte=0)
+            for digest, stored_size in orphans.values_list('digest', 'stored_size'):
+                path = self.chunk_path(digest)
+                if path.exists():
+                    path.unlink()
+                reclaimed += stored_size
+            orphans.delete()
+
+        return reclaimed
+
+    def rebuild_refcounts(self, manifest_paths):
+        """Recount every chunk's references from the given manifests
+
+        Refcounts live in the database, so restoring an older dump leaves
+        chunks shared with newer manifests undercounted, and a later release
+        would delete files those manifests still need. Chunks no manifest
+        references are deleted. Returns (chunks kept, chunks deleted).
+        """
+        counts = Counter()
+        for manifest_path in manifest_paths:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            counts.update(digest for member in manifest['members'] for digest in member['chunks'])
+
+        with self._locked(), transaction.atomic():
+            sizes = dict(StoredChunk.objects.values_list('digest', 'size'))
+            StoredChunk.objects.all().delete()
+
+            chunks = []
+            orphans = 0
+            for path in self.root.glob('??/*'):
+                digest = path.name
+                if len(digest) != 64:
+                    # Leftover .tmp files of interrupted writes
+                    continue
+                if digest not in counts:
+                    path.unlink()
+                    orphans += 1
+                    continue
+                size = sizes.get(digest)
+                if size is None:
+                    size = len(self.read_chunk(digest))
+                chunks.append(StoredChunk(
+                    digest=digest,
+                    size=size,
+                    stored_size=path.stat().st_size,
+                    refcount=counts[digest],
+                ))
+            StoredChunk.objects.bulk_create(chunks, batch_size=1000)
+
+        return len(chunks), orphans
+
+    def read_chunk(self, digest):
+        with open(self.chunk_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} is corrupt")
+        return data
+
+    def _write_chunk(self, digest, data):
+        path = self.chunk_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        compressed = zlib.compress(data, self.level)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        return len(compressed)
+
+    def release_manifest(self, manifest_path):
+        """Release every chunk a manifest references"""
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        return self.release(
+            digest for member in manifest['members'] for digest in member['chunks']
+        )
+
+
+class ChunkStoreWriter:
+    """Archive writer that stores members as chunks and finishes with a manifest"""
+
+    def __init__(self, store, manifest_path, metadata=None):
+        self.store = store
+        self.filename = str(manifest_path)
+        self.metadata = metadata or {}
+        self.members = []
+        self._referenced = []
+
+    def open(self, name, mode='w', force_zip64=False):
+        if mode != 'w':
+            raise ValueError("ChunkStoreWriter only supports writing")
+        return _ChunkMemberStream(self, name)
+
+    def write(self, filename, arcname):
+        with open(filename, 'rb') as src, self.open(arcname, 'w') as dest:
+            while True:
+                data = src.read(1024 * 1024)
+                if not data:
+                    break
+                dest.write(data)
+
+    def namelist(self):
+        return [member['name'] for member in self.members]
+
+    def _commit(self, chunks):
+        self.store.add(chunks)
+        self._referenced.extend(digest for digest, _ in chunks)
+
+    def close(self):
+        manifest = dict(self.metadata, version=1, members=self.members)
+        with open(self.filename, 'w') as f:
+            json.dump(manifest, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.close()
+            except BaseException:
+                self._abort()
+                raise
+        else:
+            self._abort()
+        return False
+
+    def _abort(self):
+        # Give back every reference this aborted backup took
+        self.store.release(self._referenced)
+        if Path(self.filename).exists():
+            Path(self.filename).unlink()
+
+
+class _ChunkMemberStream(io.RawIOBase):
+    """Writable member stream that chunks, hashes and stores as it goes"""
+
+    def __init__(self, writer, name):
+        self._writer = writer
+        self._name = name
+        self._chunker = _Chunker()
+        self._pending = []
+        self._digests = []
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._size += len(data)
+        for chunk in self._chunker.feed(data):
+            self._add_chunk(chunk)
+        return len(data)
+
+    def _add_chunk(self, chunk):
+        digest = hashlib.sha256(chunk).hexdigest()
+        self._digests.append(digest)
+        self._pending.append((digest, chunk))
+        if len(self._pending) >= FLUSH_EVERY:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if self._pending:
+            self._writer._commit(self._pending)
+            self._pending = []
+
+    def close(self):
+        if not self.closed:
+            for chunk in self._chunker.finish():
+                self._add_chunk(chunk)
+            self._flush_pending()
+            self._writer.members.append({
+                'name': self._name,
+                'size': self._size,
+                'chunks': self._digests,
+            })
+        super().close()
+
+
+class ManifestArchive:
+    """Read-only, ZipFile-like view over a backup stored in the chunk store"""
+
+    def __init__(self, store, manifest_path):
+        self.store = store
+        self.filename = str(manifest_path)
+        with open(manifest_path, 'r') as f:
+            self.manifest = json.load(f)
+        self._members = {member['name']: member for member in self.manifest['members']}
+
+    def namelist(self):
+        return list(self._members)
+
+    def member_size(self, name):
+        return self._members[name]['size']
+
+    def open(self, name, mode='r'):
+        if mode != 'r':
+            raise ValueError("ManifestArchive is read-only")
+        if name not in self._members:
+            raise KeyError(f"There is no item named {name!r} in the archive")
+        return io.BufferedReader(_ChunkMemberReader(self.store, self._members[name]['chunks']))
+
+    def read(self, name):
+        with self.open(name) as f:
+            return f.read()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class _ChunkMemberReader(io.RawIOBase):
+    """Readable stream that reassembles a member from its chunks"""
+
+    def __init__(self, store, digests):
+        self._store = store
+        self._digests = iter(digests)
+        self._current = b''
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._offset >= len(self._current):
+            digest = next(self._digests, None)
+            if digest is None:
+                return 0
+            self._current = self._store.read_chunk(digest)
+            self._offset = 0
+
+        size = min(len(buffer), len(self._current) - self._offset)
+        buffer[:size] = self._current[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+
+def _lock_file(lock_file):
+    """Take an exclusive cross-process lock on an open file"""
+    if os.name == 'nt':
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(lock_file):
+    if os.name == 'nt':
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,136 @@
+import bz2
+import lzma
+import zlib
+import zipfile
+from django.conf import settings
+
+
+# Archive sections that can each get their own codec
+SECTIONS = ('database', 'network_configs', 'media', 'logs', 'manifest')
+
+
+class Codec:
+    """A zip compression method with the level range it accepts"""
+
+    def __init__(self, name, compress_type, levels=None, default_level=None):
+        self.name = name
+        self.compress_type = compress_type
+        self.levels = levels
+        self.default_level = default_level
+
+    def clamp_level(self, level):
+        if not self.levels:
+            return None
+        if level is None:
+            return self.default_level
+        return max(self.levels[0], min(self.levels[-1], level))
+
+    def compress(self, data, level=None):
+        """Compress raw bytes the way the zip member would, for benchmarking"""
+        level = self.clamp_level(level)
+        if self.compress_type == zipfile.ZIP_STORED:
+            return data
+        if self.compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            return compressor.compress(data) + compressor.flush()
+        if self.compress_type == zipfile.ZIP_BZIP2:
+            return bz2.compress(data, level)
+        if self.compress_type == zipfile.ZIP_LZMA:
+            return lzma.compress(data)
+        return _zstd_compress(data, level)
+
+    def decompress(self, data):
+        if self.compress_type == zipfile.ZIP_STORED:
+            return data
+        if self.compress_type == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(data, -15)
+        if self.compress_type == zipfile.ZIP_BZIP2:
+            return bz2.decompress(data)
+        if self.compress_type == zipfile.ZIP_LZMA:
+            return lzma.decompress(data)
+        return _zstd_decompress(data)
+
+
+CODECS = {
+    'store': Codec('store', zipfile.ZIP_STORED),
+    'deflate': Codec('deflate', zipfile.ZIP_DEFLATED, levels=range(1, 10), default_level=6),
+    'bzip2': Codec('bzip2', zipfile.ZIP_BZIP2, levels=range(1, 10), default_level=9),
+    'lzma': Codec('lzma', zipfile.ZIP_LZMA),
+}
+
+# Zstandard zip members need a zipfile that understands them (Python 3.14+)
+if hasattr(zipfile, 'ZIP_ZSTANDARD'):
+    CODECS['zstd'] = Codec('zstd', zipfile.ZIP_ZSTANDARD, levels=range(1, 23), default_level=3)
+
+CODEC_CHOICES = [
+    ('store', 'Store (no compression)'),
+    ('deflate', 'Deflate'),
+    ('bzip2', 'BZip2'),
+    ('lzma', 'LZMA'),
+    ('zstd', 'Zstandard (if supported)'),
+]
+
+
+def parse_codec_spec(spec, default_level=None):
+    """Turn 'deflate:9' or 'lzma' into a (Codec, level) pair"""
+    name, _, level = str(spec).partition(':')
+    name = name.strip().lower()
+    if name not in CODECS:
+        # zstd on an interpreter without zip support falls back to deflate
+        if name == 'zstd':
+            name = 'deflate'
+        else:
+            raise ValueError(f"Unknown compression codec: {spec}")
+    codec = CODECS[name]
+    return codec, codec.clamp_level(int(level) if level else default_level)
+
+
+def default_compression_level():
+    return getattr(settings, 'BACKUP_SETTINGS', {}).get('COMPRESSION_LEVEL')
+
+
+def section_codec(config, section):
+    """Resolve the (Codec, level) a backup config uses for one archive section"""
+    level = config.compression_level if config.compression_level is not None else default_compression_level()
+    overrides = config.section_compression or {}
+
+    if section in overrides:
+        return parse_codec_spec(overrides[section], level)
+    return parse_codec_spec(config.compression or 'deflate', level)
+
+
+def section_for_member(name):
+    """Which archive section a member name belongs to"""
+    if name.startswith('media/'):
+        return 'media'
+    if name.startswith('logs/'):
+        return 'logs'
+    if name.startswith('network_configs'):
+        return 'network_configs'
+    if name.startswith('database'):
+        return 'database'
+    return 'manifest'
+
+
+def open_zip_member(zipf, name, codec, level, force_zip64=False):
+    """Open a member of zipf for writing with the given codec
+
+    Members opened by name take the archive's compression and compresslevel,
+    so those are pointed at the codec while the member is opened.
+    """
+    compression, compresslevel = zipf.compression, zipf.compresslevel
+    zipf.compression, zipf.compresslevel = codec.compress_type, level
+    try:
+        return zipf.open(name, 'w', force_zip64=force_zip64)
+    finally:
+        zipf.compression, zipf.compresslevel = compression, compresslevel
+
+
+def _zstd_compress(data, level):
+    from compression import zstd
+    return zstd.compress(data, level)
+
+
+def _zstd_decompress(data):
+    from compression import zstd
+    return zstd.decompress(data)
@@ -0,0 +1,275 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Device, NetworkConfig
+
+
+class CollectionError(Exception):
+    """A device could not be reached or one of its commands failed"""
+
+
+class DeviceUnreachable(CollectionError):
+    """Connecting to a device failed or timed out"""
+
+
+class DeviceDriver:
+    """How to pull configs from one device type: a command per config type"""
+
+    device_type = None
+    commands = {}
+
+    def __init__(self, commands=None):
+        self.commands = dict(self.commands, **(commands or {}))
+
+    def clean(self, output):
+        """Normalise command output before it is stored"""
+        return output.replace('\r\n', '\n').strip('\n') + '\n'
+
+    async def fetch(self, session, config_type, timeout):
+        try:
+            command = self.commands[config_type]
+        except KeyError:
+            raise CollectionError(f"{self.device_type} devices have no '{config_type}' config")
+        exit_status, output = await asyncio.wait_for(session.run(command), timeout)
+        if exit_status not in (0, None):
+            raise CollectionError(f"'{command}' exited with status {exit_status}")
+        return self.clean(output)
+
+
+class CheckpointDriver(DeviceDriver):
+    device_type = 'firewall'
+    commands = {'running': 'show configuration'}
+
+
+class F5Driver(DeviceDriver):
+    device_type = 'f5'
+    commands = {'running': 'tmsh -q show running-config'}
+
+
+class InfobloxDriver(DeviceDriver):
+    device_type = 'infoblox'
+    commands = {'running': 'show config'}
+
+
+class CiscoStyleDriver(DeviceDriver):
+    commands = {
+        'running': 'show running-config',
+        'startup': 'show startup-config',
+    }
+
+
+class SwitchDriver(CiscoStyleDriver):
+    device_type = 'switch'
+
+
+class RouterDriver(CiscoStyleDriver):
+    device_type = 'router'
+
+
+DRIVERS = {
+    driver.device_type: driver
+    for driver in (CheckpointDriver, F5Driver, InfobloxDriver, SwitchDriver, RouterDriver)
+}
+
+
+class SSHSession:
+    """One asyncssh connection, running each command on its own exec channel"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def run(self, command):
+        result = await self._conn.run(command, check=False)
+        return result.exit_status, result.stdout
+
+    async def close(self):
+        self._conn.close()
+        await self._conn.wait_closed()
+
+
+class SSHConnector:
+    """Opens SSH sessions to devices with the credentials in COLLECTION_SETTINGS"""
+
+    def __init__(self, options=None):
+        self.options = options if options is not None else getattr(settings, 'COLLECTION_SETTINGS', {})
+
+    async def connect(self, device):
+        try:
+            import asyncssh
+        except ImportError:
+            raise CollectionError("Collecting configs over SSH needs the asyncssh package (pip install asyncssh)")
+
+        kwargs = {
+            'port': self.options.get('PORT', 22),
+            'username': self.options.get('USERNAME'),
+            'password': self.options.get('PASSWORD'),
+        }
+        if self.options.get('KEY_FILENAME'):
+            kwargs['client_keys'] = [self.options['KEY_FILENAME']]
+        if 'KNOWN_HOSTS' in self.options:
+            # None turns host key checking off
+            kwargs['known_hosts'] = self.options['KNOWN_HOSTS']
+        return SSHSession(await asyncssh.connect(device['ip_address'], **kwargs))
+
+
+class ConfigCollector:
+    """Pulls configs from many devices at once on an asyncio event loop
+
+    Every device waits for a slot of its type, then a global slot, so one slow
+    device type can't starve the rest. Connecting and each command have their
+    own timeouts. Collected configs are written in batches on a single
+    database thread while collection continues.
+    """
+
+    def __init__(self, connector=None, concurrency=None, type_concurrency=None,
+                 connect_timeout=None, read_timeout=None, batch_size=None):
+        options = getattr(settings, 'COLLECTION_SETTINGS', {})
+        self.connector = connector or SSHConnector(options)
+        self.concurrency = concurrency or options.get('CONCURRENCY', 200)
+        self.type_concurrency = dict(options.get('TYPE_CONCURRENCY', {}), **(type_concurrency or {}))
+        self.connect_timeout = connect_timeout or options.get('CONNECT_TIMEOUT', 10)
+        self.read_timeout = read_timeout or options.get('READ_TIMEOUT', 60)
+        self.batch_size = batch_size or options.get('BATCH_SIZE', 500)
+        command_overrides = options.get('COMMANDS', {})
+        self.drivers = {
+            device_type: driver(command_overrides.get(device_type))
+            for device_type, driver in DRIVERS.items()
+        }
+
+    def collect(self, devices=None, config_types=('running',)):
+        """Collect configs from devices (a queryset or list of Device), returning run stats"""
+        if devices is None:
+            devices = Device.objects.all()
+        if isinstance(devices, (list, tuple)):
+            rows = [
+                {'id': d.id, 'ip_address': d.ip_address, 'hostname': d.hostname, 'device_type': d.device_type}
+                for d in devices
+            ]
+        else:
+            rows = list(devices.values('id', 'ip_address', 'hostname', 'device_type'))
+
+        started = time.perf_counter()
+        stats = asyncio.run(self._collect(rows, list(config_types)))
+        stats['elapsed'] = time.perf_counter() - started
+
+        print(
+            f"Collected {stats['configs']} new configs ({stats['unchanged']} unchanged) "
+            f"from {stats['succeeded']}/{stats['devices']} devices "
+            f"in {stats['elapsed']:.1f}s ({stats['failed']} failed, {stats['skipped']} without a driver)"
+        )
+        return stats
+
+    async def _collect(self, rows, config_types):
+        stats = {
+            'devices': len(rows), 'succeeded': 0, 'failed': 0, 'skipped': 0,
+            'configs': 0, 'unchanged': 0, 'errors': {},
+        }
+        global_slots = asyncio.Semaphore(self.concurrency)
+        type_slots = {
+            device_type: asyncio.Semaphore(self.type_concurrency.get(device_type, self.concurrency))
+            for device_type in self.drivers
+        }
+        results = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        # The ORM is synchronous, so every write goes through one dedicated thread
+        db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='collect-db')
+
+        async def collect_device(device):
+            driver = self.drivers.get(device['device_type'])
+            if driver is None:
+                stats['skipped'] += 1
+                return
+            async with type_slots[device['device_type']], global_slots:
+                try:
+                    configs = await self._collect_device(device, driver, config_types)
+                except Exception as e:
+                    await results.put((device, None, e))
+                else:
+                    await results.put((device, configs, None))
+
+        async def write_results():
+            batch = []
+            while True:
+                item = await results.get()
+                if item is not None:
+                    batch.append(item)
+                if batch and (item is None or len(batch) >= self.batch_size):
+                    await loop.run_in_executor(db_executor, self._save_batch, batch, stats)
+                    batch = []
+                if item is None:
+                    return
+
+        writer = asyncio.create_task(write_results())
+        try:
+            await asyncio.gather(*(collect_device(device) for device in rows))
+        finally:
+            await results.put(None)
+            await writer
+            await loop.run_in_executor(db_executor, _close_connection)
+            db_executor.shutdown()
+        return stats
+
+    async def _collect_device(self, device, driver, config_types):
+        try:
+            session = await asyncio.wait_for(self.connector.connect(device), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise DeviceUnreachable(f"connect timed out after {self.connect_timeout}s")
+        except OSError as e:
+            raise DeviceUnreachable(str(e) or e.__class__.__name__)
+
+        try:
+            configs = {}
+            for config_type in config_types:
+                if config_type in driver.commands:
+                    configs[config_type] = await driver.fetch(session, config_type, self.read_timeout)
+            return configs
+        finally:
+            await session.close()
+
+    def _save_batch(self, batch, stats):
+        now = timezone.now()
+        configs = []
+        online_ids = []
+        offline_ids = []
+
+        for device, collected, error in batch:
+            if error is not None:
+                stats['failed'] += 1
+                stats['errors'][device['ip_address']] = _describe_error(error)
+                # Only a failed connection says anything about whether the device is up
+                if isinstance(error, DeviceUnreachable):
+                    offline_ids.append(device['id'])
+                continue
+            stats['succeeded'] += 1
+            online_ids.append(device['id'])
+            for config_type, config_data in collected.items():
+                configs.append(NetworkConfig(
+                    device_id=device['id'],
+                    config_type=config_type,
+                    config_data=config_data,
+                ))
+
+        # A stable device's pull matches its newest version and writes nothing
+        created = NetworkConfig.objects.bulk_create_versions(configs, batch_size=self.batch_size, skip_unchanged=True)
+        stats['configs'] += len(created)
+        stats['unchanged'] += len(configs) - len(created)
+        if online_ids:
+            Device.objects.filter(id__in=online_ids).update(status='online', last_scanned_at=now)
+        if offline_ids:
+            Device.objects.filter(id__in=offline_ids).update(status='offline', last_scanned_at=now)
+
+
+def _close_connection():
+    # Looked up inside the database thread, which has its own connection
+    connection.close()
+
+
+def _describe_error(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return 'command timed out'
+    return str(error) or error.__class__.__name__
@@ -0,0 +1,138 @@
+import bz2
+import io
+import lzma
+import re
+import struct
+import zipfile
+import zlib
+
+
+# Archive member listing where each device's configs live, by IP and config type
+CONFIG_INDEX_MEMBER = 'network_configs_index.json'
+
+CONFIG_MEMBER_PREFIX = 'network_configs/'
+
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+
+def config_member_name(device_ip, config_type, taken):
+    """Member name for one device's configs of one type, unique within the archive"""
+    base = f"{CONFIG_MEMBER_PREFIX}{device_ip}/{re.sub(r'[^A-Za-z0-9_.-]+', '_', config_type) or '_'}"
+    name = f"{base}.ndjson"
+    suffix = 1
+    while name in taken:
+        suffix += 1
+        name = f"{base}.{suffix}.ndjson"
+    taken.add(name)
+    return name
+
+
+def member_location(zinfo):
+    """Where a zip member's bytes sit, so it can be read back without the central directory"""
+    return {
+        'offset': zinfo.header_offset,
+        'compressed_size': zinfo.compress_size,
+        'compress_type': zinfo.compress_type,
+        'crc': zinfo.CRC,
+    }
+
+
+def data_offset(f, header_offset):
+    """Offset of a member's data, just past its local file header"""
+    f.seek(header_offset)
+    header = f.read(_LOCAL_HEADER.size)
+    if len(header) != _LOCAL_HEADER.size or header[:4] != _LOCAL_HEADER_SIGNATURE:
+        raise ValueError(f"No zip member header at offset {header_offset}")
+    fields = _LOCAL_HEADER.unpack(header)
+    return header_offset + _LOCAL_HEADER.size + fields[-2] + fields[-1]
+
+
+def read_member_at(f, location):
+    """Read and decompress one zip member given its recorded location"""
+    f.seek(data_offset(f, location['offset']))
+    data = _decompress_member(f.read(location['compressed_size']), location['compress_type'])
+    if zlib.crc32(data) != location['crc']:
+        raise ValueError(f"CRC mismatch reading zip member at offset {location['offset']}")
+    return data
+
+
+def _decompress_member(data, compress_type):
+    """Undo a zip member's compression method, for every method the archives are written with"""
+    if compress_type == zipfile.ZIP_STORED:
+        return data
+    if compress_type == zipfile.ZIP_DEFLATED:
+        decompressor = zlib.decompressobj(-15)
+        return decompressor.decompress(data) + decompressor.flush()
+    if compress_type == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Decompressor().decompress(data)
+    if compress_type == zipfile.ZIP_LZMA:
+        # Zip prefixes the raw LZMA1 stream with a version and its 5 property bytes
+        props_size, = struct.unpack('<H', data[2:4])
+        props = data[4:4 + props_size]
+        lc_lp_pb, dict_size = props[0], struct.unpack('<L', props[1:5])[0]
+        lzma_filter = {
+            'id': lzma.FILTER_LZMA1,
+            'dict_size': dict_size,
+            'lc': lc_lp_pb % 9,
+            'lp': lc_lp_pb // 9 % 5,
+            'pb': lc_lp_pb // 45,
+        }
+        return lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=[lzma_filter]).decompress(data[4 + props_size:])
+    if compress_type == getattr(zipfile, 'ZIP_ZSTANDARD', None):
+        from compression import zstd
+        return zstd.decompress(data)
+    raise NotImplementedError(f"Unsupported zip compression method {compress_type}")
+
+
+def select_entries(index, device_ips=None, config_type=None):
+    """Index entries matching a set of device IPs and/or a config type"""
+    return [
+        entry for entry in index['members']
+        if (not device_ips or entry['device_ip'] in device_ips)
+        and (not config_type or entry['config_type'] == config_type)
+    ]
+
+
+def record_matches(record, device_ips=None, config_type=None):
+    return (
+        (not device_ips or record['device_ip'] in device_ips)
+        and (not config_type or record['config_type'] == config_type)
+    )
+
+
+class FileSlice(io.RawIOBase):
+    """Read-only, seekable window onto part of a file, e.g. a zip stored inside a zip"""
+
+    def __init__(self, f, start, length):
+        self._file = f
+        self._start = start
+        self._length = length
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._length
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer):
+        size = max(0, min(len(buffer), self._length - self._pos))
+        if not size:
+            return 0
+        self._file.seek(self._start + self._pos)
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
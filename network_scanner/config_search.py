@@ -0,0 +1,237 @@
+import html
+import re
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+
+SEARCH_TABLE = 'network_scanner_configsearch'
+ENTRY_TABLE = 'network_scanner_configsearchentry'
+
+# Lines of context either side of the first matching line in a snippet
+SNIPPET_CONTEXT = 1
+
+SNIPPET_MAX_LENGTH = 300
+
+
+def build_match(query):
+    """FTS5 MATCH expression requiring every whitespace-separated term of query
+
+    Each term is searched as a phrase, so punctuation inside it (an IP address,
+    a hostname, an ACL name) matches as written; a trailing * makes it a prefix.
+    """
+    terms = []
+    for term in query.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*')
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+class ConfigSearchIndex:
+    """SQLite FTS5 index over the newest active config of each device and config type
+
+    Stored versions are deltas, so the index keeps its own copy of each
+    indexed text, keyed by NetworkConfig id. Saves and deletes keep it
+    current through signals, refreshed once their transaction commits;
+    bulk_create_versions() indexes what it inserts. Bulk updates of
+    is_active don't, so run rebuild_config_search after them.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def search(self, query, limit=20, config_type=None):
+        """Ranked matches for query, best first, each with a highlighted snippet"""
+        from .models import Device
+
+        match = build_match(query)
+        if not match:
+            return []
+        terms = _term_pattern(query)
+
+        sql = (
+            f"SELECT e.id, e.device_id, e.config_type, rank, e.config_data "
+            f"FROM {SEARCH_TABLE} JOIN {ENTRY_TABLE} e ON e.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH %s"
+        )
+        params = [match]
+        if config_type:
+            sql += " AND e.config_type = %s"
+            params.append(config_type)
+        sql += " ORDER BY rank LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        devices = Device.objects.in_bulk({row[1] for row in rows})
+        return [
+            {
+                'config_id': config_id,
+                'device': devices[device_id],
+                'config_type': config_type,
+                # rank is bm25(), lower for better matches
+                'score': -rank,
+                'snippet': make_snippet(text, terms),
+            }
+            for config_id, device_id, config_type, rank, text in rows
+            if device_id in devices
+        ]
+
+    def index_versions(self, configs):
+        """Index just inserted configs, each now the newest version of its device and config type"""
+        newest = {}
+        for config in configs:
+            newest[(config.device_id, config.config_type)] = config
+
+        entries = [
+            (config.pk, config.device_id, config.config_type, config.config_data)
+            for config in newest.values() if config.is_active
+        ]
+        self._write([group for group, config in newest.items() if config.is_active], entries)
+        # An inactive newest version leaves an older active one to find
+        self.refresh(group for group, config in newest.items() if not config.is_active)
+
+    def refresh(self, groups):
+        """Re-index the newest active version of each (device_id, config_type)"""
+        from .models import NetworkConfig
+
+        groups = set(groups)
+        if not groups:
+            return
+
+        rows = (
+            NetworkConfig.objects
+            .filter(
+                device_id__in={device_id for device_id, _ in groups},
+                config_type__in={config_type for _, config_type in groups},
+            )
+            .order_by()
+            .values('device_id', 'config_type')
+            .annotate(newest=Max('id'), newest_active=Max('id', filter=Q(is_active=True)))
+        )
+        newest = {
+            (row['device_id'], row['config_type']): (row['newest'], row['newest_active'])
+            for row in rows
+        }
+        latest = NetworkConfig.objects.latest_versions(
+            group for group in groups
+            if group in newest and newest[group][0] == newest[group][1]
+        )
+
+        entries = []
+        for group in groups:
+            newest_id, active_id = newest.get(group, (None, None))
+            if active_id is None:
+                continue
+            if group in latest:
+                text = latest[group][1]
+            else:
+                text = NetworkConfig.objects.get(pk=active_id).config_data
+            entries.append((active_id, group[0], group[1], text))
+        self._write(groups, entries)
+
+    def schedule_refresh(self, device_id, config_type):
+        """Re-index a device's config type once the current transaction commits"""
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = set()
+        pending.add((device_id, config_type))
+        # Every schedule registers a callback; the first to run takes the whole set.
+        # Groups left over from a rolled back transaction go with the next commit.
+        transaction.on_commit(self._flush_pending)
+
+    def _flush_pending(self):
+        pending, self._local.pending = getattr(self._local, 'pending', None), None
+        if pending:
+            self.refresh(pending)
+
+    def rebuild(self, rows=None):
+        """Re-index everything, returning how many configs are indexed
+
+        rows, if given, are (id, device_id, config_type, is_active, text) in
+        device, config type and id order; by default every stored version.
+        """
+        if rows is None:
+            from .models import NetworkConfig
+
+            rows = (
+                (row['id'], row['device_id'], row['config_type'], row['is_active'], text)
+                for row, text in NetworkConfig.objects.all().iter_texts('is_active')
+            )
+
+        indexed = 0
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {ENTRY_TABLE}")
+                entries = []
+                group = active = None
+                for row_id, device_id, config_type, is_active, text in rows:
+                    if (device_id, config_type) != group:
+                        if active:
+                            entries.append(active)
+                        group, active = (device_id, config_type), None
+                    if is_active:
+                        active = (row_id, device_id, config_type, text)
+                    if len(entries) >= 1000:
+                        self._insert(cursor, entries)
+                        indexed += len(entries)
+                        entries = []
+                if active:
+                    entries.append(active)
+                self._insert(cursor, entries)
+                indexed += len(entries)
+                cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        return indexed
+
+    def _write(self, groups, entries):
+        groups = list(groups)
+        if not groups:
+            return
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"DELETE FROM {ENTRY_TABLE} WHERE device_id = %s AND config_type = %s", groups
+                )
+                self._insert(cursor, entries)
+
+    def _insert(self, cursor, entries):
+        if entries:
+            cursor.executemany(
+                f"INSERT INTO {ENTRY_TABLE} (id, device_id, config_type, config_data) VALUES (%s, %s, %s, %s)",
+                entries,
+            )
+
+
+def _term_pattern(query):
+    terms = [term.rstrip('*') for term in query.split() if term.rstrip('*')]
+    return re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+
+
+def make_snippet(text, terms):
+    """HTML-escaped lines around the first match of terms, each match wrapped in <mark>
+
+    FTS5's own snippet() weighs every hit in the document, which is slow on
+    large configs full of a common term; config lines make a better window.
+    """
+    lines = text.splitlines()
+    first = next((number for number, line in enumerate(lines) if terms.search(line)), 0)
+    window = '\n'.join(lines[max(first - SNIPPET_CONTEXT, 0):first + SNIPPET_CONTEXT + 1])
+    if len(window) > SNIPPET_MAX_LENGTH:
+        window = window[:SNIPPET_MAX_LENGTH] + '…'
+
+    parts = []
+    position = 0
+    for found in terms.finditer(window):
+        parts.append(html.escape(window[position:found.start()]))
+        parts.append(f'<mark>{html.escape(found.group())}</mark>')
+        position = found.end()
+    parts.append(html.escape(window[position:]))
+    return ''.join(parts)
+
+
+config_search = ConfigSearchIndex()
@@ -0,0 +1,138 @@
+import difflib
+import hashlib
+import json
+import re
+
+from django.conf import settings
+
+
+# Lines that change between two pulls of an unchanged config
+VOLATILE_LINE_PATTERNS = [
+    r'^.*\bGenerated at\b.*$',
+    r'^! Last configuration change at .*$',
+    r'^! NVRAM config last updated at .*$',
+    r'^! No configuration change since last restart$',
+    r'^Building configuration\.\.\.$',
+    r'^Current configuration : \d+ bytes$',
+    r'^ntp clock-period \d+$',
+    r'^# Exported by .* on .*$',
+]
+
+
+def volatile_line_pattern():
+    extra = getattr(settings, 'BACKUP_SETTINGS', {}).get('CONFIG_VOLATILE_PATTERNS', [])
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in VOLATILE_LINE_PATTERNS + list(extra)))
+
+
+def normalize_config(text, volatile=None):
+    """Config text with volatile lines, trailing whitespace and line ending differences removed"""
+    if volatile is None:
+        volatile = volatile_line_pattern()
+    lines = (line.rstrip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not volatile.match(line))
+
+
+def hash_config(text, volatile=None):
+    """SHA-256 of the normalized config, equal for configs that differ only in volatile lines"""
+    return hashlib.sha256(normalize_config(text, volatile).encode('utf-8')).hexdigest()
+
+
+def keyframe_interval():
+    """Versions per chain: a full keyframe followed by at most interval - 1 deltas"""
+    return max(1, getattr(settings, 'BACKUP_SETTINGS', {}).get('CONFIG_KEYFRAME_INTERVAL', 20))
+
+
+def make_delta(base, text):
+    """Line-level delta turning base into text
+
+    The delta is a JSON list where [start, end] copies base lines start:end
+    and a string is inserted as is. Only the span between the common prefix
+    and suffix goes through difflib, which keeps large, mostly unchanged
+    configs cheap to diff.
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+
+    prefix = 0
+    limit = min(len(base_lines), len(lines))
+    while prefix < limit and base_lines[prefix] == lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and base_lines[len(base_lines) - 1 - suffix] == lines[len(lines) - 1 - suffix]):
+        suffix += 1
+
+    ops = [[0, prefix]] if prefix else []
+    matcher = difflib.SequenceMatcher(
+        None, base_lines[prefix:len(base_lines) - suffix], lines[prefix:len(lines) - suffix], autojunk=False
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([prefix + i1, prefix + i2])
+        elif j2 > j1:
+            ops.append(''.join(lines[prefix + j1:prefix + j2]))
+    if suffix:
+        ops.append([len(base_lines) - suffix, len(base_lines)])
+    return json.dumps(ops, separators=(',', ':'))
+
+
+def apply_delta(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def encode_version(previous, text, interval=None):
+    """Stored form of text given the previous version of the same config
+
+    previous is (delta_depth, text) of the latest stored version, or None.
+    Returns (stored_data, delta_depth); a keyframe is depth 0. A new chain
+    starts when the current one is full or the delta isn't worth keeping.
+    """
+    if interval is None:
+        interval = keyframe_interval()
+    if previous is None or previous[0] + 1 >= interval:
+        return text, 0
+    # Lines the base lacks all end up in the delta; if they alone make it
+    # too big, skip diffing a config that was mostly rewritten
+    base_lines = set(previous[1].splitlines(keepends=True))
+    if sum(len(line) for line in text.splitlines(keepends=True) if line not in base_lines) * 2 > len(text):
+        return text, 0
+    delta = make_delta(previous[1], text)
+    if len(delta) * 2 > len(text):
+        return text, 0
+    return delta, previous[0] + 1
+
+
+def decode_chain(chain):
+    """Text of the last version in chain, a list of (stored_data, delta_depth) from its keyframe on"""
+    if not chain or chain[0][1] != 0:
+        raise ValueError("Config delta chain does not start at a keyframe")
+    text = chain[0][0]
+    for expected_depth, (stored, depth) in enumerate(chain[1:], start=1):
+        if depth != expected_depth:
+            raise ValueError(f"Config delta chain is broken at depth {expected_depth}")
+        text = apply_delta(text, stored)
+    return text
+
+
+def resolve_record_deltas(records):
+    """Turn exported records carrying config_delta back into full config_data
+
+    A delta record applies to the record before it for the same device and
+    config type, which exports always write first.
+    """
+    latest = {}
+    for record in records:
+        key = (record['device_ip'], record['config_type'])
+        if 'config_delta' in record:
+            if key not in latest:
+                raise ValueError(f"Config delta for {key[0]} {key[1]} has no preceding version")
+            record['config_data'] = apply_delta(latest[key], record.pop('config_delta'))
+        latest[key] = record['config_data']
+        yield record
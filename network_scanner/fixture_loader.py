@@ -0,0 +1,218 @@
+import codecs
+import json
+from django.core.management.color import no_style
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import connections, transaction
+from django.db.models.constants import OnConflict
+
+
+# Fields renamed since older backups were dumped, by model label
+RENAMED_FIELDS = {
+    'network_scanner.networkconfig': {'config_data': 'stored_data'},
+}
+
+
+def iter_json_array(stream, chunk_size=1024 * 1024):
+    """Yield the elements of a top-level JSON array, reading the stream a chunk at a time"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    eof = False
+    state = 'start'  # start -> first -> (item -> separator)*
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        data = stream.read(chunk_size)
+        eof = not data
+        if isinstance(data, bytes):
+            data = text_decoder.decode(data, final=eof)
+        buffer = buffer[pos:] + data
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON fixture")
+            read_more()
+            continue
+
+        char = buffer[pos]
+        if state == 'start':
+            if char != '[':
+                raise ValueError("JSON fixture is not a list")
+            pos += 1
+            state = 'first'
+            continue
+        if char == ']' and state in ('first', 'separator'):
+            return
+        if state == 'separator':
+            if char != ',':
+                raise ValueError(f"Expected ',' in JSON fixture, found {char!r}")
+            pos += 1
+            state = 'item'
+            continue
+
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+        if end == len(buffer) and not eof:
+            # A scalar cut off at the chunk boundary could still be growing
+            read_more()
+            continue
+
+        yield obj
+        pos = end
+        state = 'separator'
+
+
+class FixtureLoader:
+    """Load a dumpdata JSON fixture with batched bulk inserts instead of per-object saves
+
+    Objects are streamed, grouped by model and inserted a batch at a time with
+    raw values (as loaddata saves them, so auto_now fields keep their dumped
+    timestamps) and an upsert on the primary key. Constraint checks are deferred
+    inside a single transaction and run once at the end, so batches can go in
+    whatever order the fixture has them; leftovers are flushed parents first.
+    Model signals are not sent.
+    """
+
+    def __init__(self, using='default', batch_size=2000, progress=None):
+        self.using = using
+        self.batch_size = batch_size
+        self.progress = progress
+        self.loaded = 0
+        self._pending = {}
+        self._deferred = []
+        self._models = set()
+
+    def load(self, stream):
+        """Load every object in the fixture stream, returning how many were loaded"""
+        connection = connections[self.using]
+
+        with transaction.atomic(using=self.using):
+            with connection.constraint_checks_disabled():
+                objects = PythonDeserializer(
+                    _rename_legacy_fields(iter_json_array(stream)), using=self.using,
+                    ignorenonexistent=True, handle_forward_references=True,
+                )
+                for obj in objects:
+                    model = type(obj.object)
+                    self._models.add(model)
+                    pending = self._pending.setdefault(model, [])
+                    pending.append(obj)
+                    if len(pending) >= self.batch_size:
+                        self._flush(model)
+
+                for model in _dependency_order(list(self._pending)):
+                    self._flush(model)
+                for obj in self._deferred:
+                    obj.save_deferred_fields(using=self.using)
+
+            connection.check_constraints(table_names=[model._meta.db_table for model in self._models])
+
+            sequence_sql = connection.ops.sequence_reset_sql(no_style(), list(self._models))
+            if sequence_sql:
+                with connection.cursor() as cursor:
+                    for line in sequence_sql:
+                        cursor.execute(line)
+
+        return self.loaded
+
+    def _flush(self, model):
+        objs = self._pending.pop(model, [])
+        if not objs:
+            return
+
+        opts = model._meta
+        if opts.parents or opts.proxy:
+            # Multi-table and proxy models span tables that bulk inserts can't
+            for obj in objs:
+                obj.save(using=self.using)
+        else:
+            self._insert(model, [obj.object for obj in objs])
+            for obj in objs:
+                # Many-to-many rows can only be written once the object exists
+                for accessor_name, object_list in obj.m2m_data.items():
+                    getattr(obj.object, accessor_name).set(object_list)
+
+        self._deferred.extend(obj for obj in objs if obj.deferred_fields)
+        self.loaded += len(objs)
+        if self.progress:
+            self.progress(self.loaded, opts.label)
+
+    def _insert(self, model, instances):
+        connection = connections[self.using]
+        opts = model._meta
+        fields = opts.local_concrete_fields
+        update_fields = [field for field in fields if not field.primary_key]
+
+        # Rows already in the database are overwritten, as loaddata would
+        if not connection.features.supports_update_conflicts or not update_fields:
+            on_conflict = OnConflict.IGNORE if connection.features.supports_ignore_conflicts else None
+            update_fields = unique_fields = None
+        else:
+            on_conflict = OnConflict.UPDATE
+            unique_fields = [opts.pk] if connection.features.supports_update_conflicts_with_target else []
+
+        # A plain INSERT with the dumped values; bulk_create would run pre_save and restamp auto_now fields
+        insert_sql = '%s %s (%s)' % (
+            connection.ops.insert_statement(on_conflict=on_conflict),
+            connection.ops.quote_name(opts.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+        )
+        conflict_sql = connection.ops.on_conflict_suffix_sql(
+            fields, on_conflict,
+            [field.column for field in update_fields or []],
+            [field.column for field in unique_fields or []],
+        )
+        batch_size = max(1, min(self.batch_size, connection.ops.bulk_batch_size(fields, instances)))
+        with connection.cursor() as cursor:
+            for start in range(0, len(instances), batch_size):
+                batch = instances[start:start + batch_size]
+                values_sql = connection.ops.bulk_insert_sql(fields, [['%s'] * len(fields)] * len(batch))
+                cursor.execute(
+                    ' '.join(filter(None, (insert_sql, values_sql, conflict_sql))),
+                    [field.get_db_prep_save(getattr(instance, field.attname), connection)
+                     for instance in batch for field in fields],
+                )
+        for instance in instances:
+            instance._state.adding = False
+            instance._state.db = self.using
+
+
+def _dependency_order(models):
+    """Order models so those referenced by foreign keys come first"""
+    remaining = list(models)
+    ordered = []
+    while remaining:
+        for model in remaining:
+            parents = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is not model
+            }
+            if not parents.intersection(remaining):
+                break
+        else:
+            # A cycle; constraint checks are deferred so any order works
+            model = remaining[0]
+        remaining.remove(model)
+        ordered.append(model)
+    return ordered
+
+
+def _rename_legacy_fields(objects):
+    for obj in objects:
+        renamed = RENAMED_FIELDS.get(str(obj.get('model', '')).lower())
+        if renamed:
+            fields = obj.get('fields', {})
+            for old_name, new_name in renamed.items():
+                if old_name in fields and new_name not in fields:
+                    fields[new_name] = fields.pop(old_name)
+        yield obj
@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 
+from .models import NetworkConfig
+
 
 class CustomLoginForm(AuthenticationForm):
     """Custom login form with enhanced styling"""
@@ -21,3 +23,20 @@ class CustomLoginForm(AuthenticationForm):
     )
 
 
+class NetworkConfigForm(forms.ModelForm):
+    """Edits a config version as full text, whatever its stored delta encoding"""
+    config_data = forms.CharField(widget=forms.Textarea(attrs={'rows': 30, 'cols': 120}), strip=False)
+
+    class Meta:
+        model = NetworkConfig
+        fields = ('device', 'config_type', 'config_data', 'version', 'is_active')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial['config_data'] = self.instance.config_data
+
+    def save(self, commit=True):
+        if 'config_data' in self.changed_data or not self.instance.pk:
+            self.instance.config_data = self.cleaned_data['config_data']
+        return super().save(commit)
@@ -0,0 +1,56 @@
+import ipaddress
+
+
+# IPv4 addresses are keyed as IPv4-mapped IPv6 (::ffff:a.b.c.d), so both families share one ordering
+_IPV4_MAPPED = 0xFFFF << 32
+
+# Lowest and highest keys of any address; '' (not an address) sorts below both
+MIN_KEY, MAX_KEY = '0' * 32, 'f' * 32
+
+
+def _key(ip):
+    value = int(ip)
+    if ip.version == 4:
+        value |= _IPV4_MAPPED
+    return f'{value:032x}'
+
+
+def ip_key(address):
+    """Fixed-width hex key of an IP address that sorts like the address itself
+
+    Returns '' for a value that isn't an IP address, so it never falls in a range.
+    """
+    try:
+        return _key(ipaddress.ip_address(str(address).strip()))
+    except ValueError:
+        return ''
+
+
+def ip_key_range(spec):
+    """(low, high) keys covered by a CIDR subnet, an 'a-b' range or a single address
+
+    Raises ValueError if spec is none of those.
+    """
+    spec = str(spec).strip()
+    if '/' in spec:
+        network = ipaddress.ip_network(spec, strict=False)
+        return _key(network.network_address), _key(network.broadcast_address)
+    if '-' in spec:
+        start, _, end = spec.partition('-')
+        low, high = _key(ipaddress.ip_address(start.strip())), _key(ipaddress.ip_address(end.strip()))
+        if low > high:
+            raise ValueError(f"IP range {spec} ends before it starts")
+        return low, high
+    key = _key(ipaddress.ip_address(spec))
+    return key, key
+
+
+def looks_like_ip_range(text):
+    """Whether text is a CIDR subnet or an 'a-b' address range rather than search text"""
+    if '/' not in text and '-' not in text:
+        return False
+    try:
+        ip_key_range(text)
+    except ValueError:
+        return False
+    return True
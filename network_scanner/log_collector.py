@@ -0,0 +1,84 @@
+import os
+import re
+from pathlib import Path
+
+
+# logs/<file key>/<inode>_<start>-<end>.log holds bytes [start, end) of one file generation
+SEGMENT_PATTERN = re.compile(r'^logs/(?P<key>[^/]+)/(?P<inode>\d+)_(?P<start>\d+)-(?P<end>\d+)\.log$')
+
+# Flat logs/<name>.log members written before segments existed
+LEGACY_PATTERN = re.compile(r'^logs/(?P<name>[^/]+)$')
+
+
+def log_key(path):
+    """Flatten a log file path into a single archive directory name"""
+    return re.sub(r'[\\/:]+', '_', str(path)).strip('_')
+
+
+def segment_name(path, inode, start, end):
+    return f"logs/{log_key(path)}/{inode}_{start}-{end}.log"
+
+
+def plan_segment(stat, previous):
+    """Return the offset to resume a log from, given its last recorded state
+
+    A different inode means the file was rotated, and a size below the recorded
+    offset means it was truncated; both start over from the beginning.
+    """
+    if not previous:
+        return 0
+    if previous.get('inode') not in (None, stat.st_ino):
+        return 0
+    if stat.st_size < previous.get('offset', 0):
+        return 0
+    return previous.get('offset', 0)
+
+
+def parse_segments(names):
+    """Group segment member names by file key, in offset order per generation"""
+    segments = {}
+    for name in names:
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            segments.setdefault(match['key'], []).append(
+                (int(match['inode']), int(match['start']), int(match['end']), name)
+            )
+            continue
+        match = LEGACY_PATTERN.match(name)
+        if match:
+            segments.setdefault(match['name'], []).append((0, 0, None, name))
+    return segments
+
+
+class LogReassembler:
+    """Rebuild log files from segments fed oldest backup first"""
+
+    def __init__(self, target_dir):
+        self.target_dir = Path(target_dir)
+        self.target_dir.mkdir(parents=True, exist_ok=True)
+        # file key -> (inode, bytes written) of the generation being rebuilt
+        self._current = {}
+
+    def add_segment(self, key, inode, start, stream):
+        target = self.target_dir / key
+        current = self._current.get(key)
+
+        if current is not None and (current[0] != inode or start == 0):
+            # A new generation: keep the previous one alongside
+            if target.exists():
+                os.replace(target, target.with_name(f"{key}.{current[0]}"))
+            current = None
+
+        written = current[1] if current else 0
+        if start != written:
+            # The backup holding the bytes before this segment is gone
+            raise ValueError(f"Log {key} is missing bytes {written}-{start}")
+        with open(target, 'ab' if current else 'wb') as dest:
+            while True:
+                data = stream.read(1024 * 1024)
+                if not data:
+                    break
+                dest.write(data)
+                written += len(data)
+
+        self._current[key] = (inode, written)
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from network_scanner.backup_service import backup_service
+from network_scanner.task_queue import task_queue
 from django.utils import timezone
 
 
@@ -47,3 +48,13 @@ class Command(BaseCommand):
                 self.stdout.write('  Next backup: Not scheduled')
         
         self.stdout.write('\n' + '=' * 80)
+        
+        queue = task_queue.stats()
+        self.stdout.write(
+            f'Task queue: {queue["depth"]} queued ({queue["ready"]} ready, {queue["running"]} running), '
+            f'lag {queue["lag_seconds"]:.0f}s'
+        )
+        if queue['failed']:
+            self.stdout.write(self.style.ERROR(
+                f'  {queue["failed"]} tasks failed for good; requeue with process_backup_tasks --retry-failed'
+            ))
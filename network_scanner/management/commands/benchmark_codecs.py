@@ -0,0 +1,101 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from network_scanner.backup_service import backup_service
+from network_scanner.compression import CODECS, parse_codec_spec, section_for_member
+from network_scanner.models import BackupHistory
+
+
+DEFAULT_CODECS = ['store', 'deflate:1', 'deflate:6', 'deflate:9', 'bzip2:9', 'lzma', 'zstd:3', 'zstd:19']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark compression codecs on a sample of recent backups, per archive section'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backups',
+            type=int,
+            default=5,
+            help='Number of recent completed backups to sample (default: 5)',
+        )
+        parser.add_argument(
+            '--config',
+            type=str,
+            help='Only sample backups of this backup configuration',
+        )
+        parser.add_argument(
+            '--max-mb',
+            type=float,
+            default=64,
+            help='Maximum sample size per section in MB (default: 64)',
+        )
+        parser.add_argument(
+            '--codecs',
+            nargs='+',
+            help='Codecs to test, e.g. store deflate:1 deflate:9 lzma zstd:3',
+        )
+
+    def handle(self, *args, **options):
+        codec_specs = options['codecs'] or [
+            spec for spec in DEFAULT_CODECS if spec.partition(':')[0] in CODECS
+        ]
+        try:
+            codecs = [(spec, *parse_codec_spec(spec)) for spec in codec_specs]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        backups = BackupHistory.objects.filter(status='completed').exclude(file_path='')
+        if options['config']:
+            backups = backups.filter(config__name=options['config'])
+        backups = [
+            backup for backup in backups.order_by('-completed_at')[:options['backups']]
+            if Path(backup.file_path).exists()
+        ]
+        if not backups:
+            raise CommandError('No completed backup files found to sample')
+
+        samples = self._collect_samples(backups, int(options['max_mb'] * 1024 * 1024))
+
+        self.stdout.write(f'\nSampled {len(backups)} backups')
+        for section, data in samples.items():
+            if not data:
+                continue
+            size_mb = len(data) / (1024 * 1024)
+            self.stdout.write(f'\n{section} ({size_mb:.2f} MB sample)')
+            self.stdout.write(f'  {"codec":<12} {"ratio":>8} {"comp MB/s":>12} {"decomp MB/s":>12} {"size MB":>10}')
+
+            for spec, codec, level in codecs:
+                started = time.perf_counter()
+                compressed = codec.compress(data, level)
+                compress_time = time.perf_counter() - started
+
+                started = time.perf_counter()
+                codec.decompress(compressed)
+                decompress_time = time.perf_counter() - started
+
+                ratio = len(data) / len(compressed) if compressed else 0
+                self.stdout.write(
+                    f'  {spec:<12} {ratio:>8.2f} {_throughput(size_mb, compress_time):>12.1f} '
+                    f'{_throughput(size_mb, decompress_time):>12.1f} {len(compressed) / (1024 * 1024):>10.2f}'
+                )
+
+    def _collect_samples(self, backups, max_bytes):
+        """Concatenate member contents per section, up to max_bytes each"""
+        samples = {}
+        for backup in backups:
+            with backup_service._open_backup(backup.file_path) as source:
+                for name in source.namelist():
+                    if name.endswith('/'):
+                        continue
+                    sample = samples.setdefault(section_for_member(name), bytearray())
+                    remaining = max_bytes - len(sample)
+                    if remaining <= 0:
+                        continue
+                    with source.open(name) as member:
+                        sample += member.read(remaining)
+        return {section: bytes(data) for section, data in samples.items()}
+
+
+def _throughput(size_mb, seconds):
+    return size_mb / seconds if seconds > 0 else float('inf')
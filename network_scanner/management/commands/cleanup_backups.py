@@ -1,6 +1,8 @@
+import time
 from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
 from django.utils import timezone
-from network_scanner.models import BackupConfig, BackupHistory, BackupArchive
+from network_scanner.models import BackupConfig, BackupArchive
 from network_scanner.backup_service import backup_service
 
 
@@ -25,6 +27,7 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        started = time.perf_counter()
         config_name = options.get('config')
         dry_run = options.get('dry_run', False)
         force_archive = options.get('force_archive', False)
@@ -49,6 +52,7 @@ class Command(BaseCommand):
 
         total_archived = 0
         total_deleted = 0
+        total_reclaimed = 0
 
         for config in configs:
             self.stdout.write(f'\nProcessing backup configuration: {config.name}')
@@ -63,93 +67,58 @@ class Command(BaseCommand):
                 cutoff_date = timezone.now() - timezone.timedelta(days=config.retention_months * 30)
             
             self.stdout.write(f'  Retention period: {config.retention_months} months')
+            if config.uses_gfs_retention:
+                tiers = ', '.join(f'{keep} {tier}' for tier, keep in config.gfs_tiers.items() if keep)
+                self.stdout.write(f'  GFS tiers: {tiers}')
             self.stdout.write(f'  Cutoff date: {cutoff_date.strftime("%Y-%m-%d %H:%M:%S")}')
             
-            # Find old backups
-            old_backups = BackupHistory.objects.filter(
-                config=config,
-                status='completed',
-                completed_at__lt=cutoff_date
-            ).order_by('completed_at')
-            
-            old_count = old_backups.count()
+            # Victims come from one windowed query; chain-protected backups are already left out
+            plan = backup_service.plan_retention(config, cutoff_date)
+            old_count = len(plan['old'])
+            excess_count = len(plan['excess'])
             self.stdout.write(f'  Found {old_count} old backups to process')
+            self.stdout.write(f'  Found {excess_count} excess recent backups to clean up')
+            if plan['protected']:
+                self.stdout.write(f'  Keeping {plan["protected"]} backups that retained incremental/differential backups build on')
             
-            if old_count == 0:
+            if old_count == 0 and excess_count == 0:
                 self.stdout.write('  No old backups to process')
                 continue
             
-            if config.archive_old_backups:
-                self.stdout.write('  Archiving old backups...')
-                
-                if not dry_run:
-                    try:
-                        backup_service._archive_old_backups(config, old_backups)
-                        total_archived += old_count
-                        self.stdout.write(
-                            self.style.SUCCESS(f'  ✓ Archived {old_count} backups')
-                        )
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'  ✗ Error archiving backups: {e}')
-                        )
-                else:
+            if dry_run:
+                if config.archive_old_backups:
                     self.stdout.write(f'  [DRY RUN] Would archive {old_count} backups')
-            else:
-                self.stdout.write('  Deleting old backups (archiving disabled)...')
-                
-                if not dry_run:
-                    try:
-                        for backup in old_backups:
-                            if backup.file_path:
-                                from pathlib import Path
-                                backup_file = Path(backup.file_path)
-                                if backup_file.exists():
-                                    backup_file.unlink()
-                            backup.delete()
-                        
-                        total_deleted += old_count
-                        self.stdout.write(
-                            self.style.SUCCESS(f'  ✓ Deleted {old_count} backups')
-                        )
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'  ✗ Error deleting backups: {e}')
-                        )
+                    doomed = plan['excess']
                 else:
-                    self.stdout.write(f'  [DRY RUN] Would delete {old_count} backups')
+                    self.stdout.write(f'  [DRY RUN] Would delete {old_count} backups (archiving disabled)')
+                    doomed = plan['old'] + plan['excess']
+                self.stdout.write(f'  [DRY RUN] Would clean up {excess_count} excess recent backups')
+                doomed_bytes = sum(row['file_size'] or 0 for row in doomed)
+                self.stdout.write(f'  [DRY RUN] Would reclaim about {doomed_bytes / (1024 * 1024):.1f} MB')
+                continue
             
-            # Also clean up recent backups based on max_backups count
-            recent_backups = BackupHistory.objects.filter(
-                config=config,
-                status='completed',
-                completed_at__gte=cutoff_date
-            ).order_by('-completed_at')
+            try:
+                stats = backup_service.apply_retention(config, plan)
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f'  ✗ Error cleaning up backups: {e}')
+                )
+                continue
             
-            recent_count = recent_backups.count()
-            if recent_count > config.max_backups:
-                excess_count = recent_count - config.max_backups
-                self.stdout.write(f'  Found {excess_count} excess recent backups to clean up')
-                
-                if not dry_run:
-                    try:
-                        for backup in recent_backups[config.max_backups:]:
-                            if backup.file_path:
-                                from pathlib import Path
-                                backup_file = Path(backup.file_path)
-                                if backup_file.exists():
-                                    backup_file.unlink()
-                            backup.delete()
-                        
-                        self.stdout.write(
-                            self.style.SUCCESS(f'  ✓ Cleaned up {excess_count} excess recent backups')
-                        )
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'  ✗ Error cleaning up excess backups: {e}')
-                        )
-                else:
-                    self.stdout.write(f'  [DRY RUN] Would clean up {excess_count} excess recent backups')
+            total_archived += stats['archived']
+            total_deleted += stats['deleted']
+            total_reclaimed += stats['bytes_reclaimed']
+            if stats['archived']:
+                self.stdout.write(
+                    self.style.SUCCESS(f'  ✓ Archived {stats["archived"]} backups')
+                )
+            if stats['deleted']:
+                self.stdout.write(
+                    self.style.SUCCESS(f'  ✓ Deleted {stats["deleted"]} backups')
+                )
+            self.stdout.write(
+                f'  Reclaimed {stats["bytes_reclaimed"] / (1024 * 1024):.1f} MB in {stats["elapsed"]:.2f}s'
+            )
 
         # Summary
         self.stdout.write('\n' + '='*50)
@@ -170,12 +139,13 @@ class Command(BaseCommand):
             
             if total_archived == 0 and total_deleted == 0:
                 self.stdout.write('No backups were processed')
+            else:
+                self.stdout.write(f'Reclaimed {total_reclaimed / (1024 * 1024):.1f} MB in {time.perf_counter() - started:.2f}s')
         
         # Show archive statistics
-        total_archives = BackupArchive.objects.count()
-        if total_archives > 0:
-            self.stdout.write(f'\nTotal archives in system: {total_archives}')
+        archive_totals = BackupArchive.objects.aggregate(count=Count('id'), size=Sum('archive_size'))
+        if archive_totals['count']:
+            self.stdout.write(f'\nTotal archives in system: {archive_totals["count"]}')
             
-            total_archive_size = sum(archive.archive_size for archive in BackupArchive.objects.all())
-            size_mb = total_archive_size / (1024 * 1024)
+            size_mb = archive_totals['size'] / (1024 * 1024)
             self.stdout.write(f'Total archive size: {size_mb:.1f} MB')
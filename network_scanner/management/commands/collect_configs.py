@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from network_scanner.config_collector import ConfigCollector, DRIVERS
+from network_scanner.ip_keys import ip_key
+from network_scanner.models import Device
+
+
+class Command(BaseCommand):
+    help = 'Pull device configurations over SSH, many devices at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            nargs='+',
+            dest='device_types',
+            choices=sorted(DRIVERS),
+            help='Only collect from these device types',
+        )
+        parser.add_argument(
+            '--ip',
+            nargs='+',
+            dest='device_ips',
+            help='Only collect from these device IP addresses',
+        )
+        parser.add_argument(
+            '--config-type',
+            nargs='+',
+            dest='config_types',
+            default=['running'],
+            help='Config types to pull, e.g. running startup (default: running)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Devices collected at once (defaults to COLLECTION_SETTINGS["CONCURRENCY"])',
+        )
+
+    def handle(self, *args, **options):
+        devices = Device.objects.all()
+        if options['device_types']:
+            devices = devices.filter(device_type__in=options['device_types'])
+        if options['device_ips']:
+            devices = devices.filter(ip_key__in={ip_key(ip) for ip in options['device_ips']} - {''})
+        if not devices.exists():
+            raise CommandError('No matching devices')
+
+        collector = ConfigCollector(concurrency=options['concurrency'])
+
+        self.stdout.write(f'Collecting {", ".join(options["config_types"])} configs from {devices.count()} devices...')
+        stats = collector.collect(devices, options['config_types'])
+
+        for ip, error in sorted(stats['errors'].items()):
+            self.stdout.write(self.style.ERROR(f'  ✗ {ip}: {error}'))
+
+        rate = stats['devices'] / stats['elapsed'] if stats['elapsed'] else 0
+        summary = (
+            f'Stored {stats["configs"]} changed configs ({stats["unchanged"]} unchanged) '
+            f'from {stats["succeeded"]} devices in {stats["elapsed"]:.1f}s '
+            f'({rate:.0f} devices/s, {stats["failed"]} failed, {stats["skipped"]} without a driver)'
+        )
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -6,6 +6,7 @@ import json
 from pathlib import Path
 from typing import Dict, Any, Iterable, Tuple
 
+from ...ip_keys import ip_key
 from ...models import Device
 
 
@@ -132,7 +133,13 @@ class Command(BaseCommand):
                 status = (item.get("status") or "offline").strip().lower()
                 description = item.get("description", "").strip()
 
-                obj = Device.objects.filter(ip_address=ip).first()
+                key = ip_key(ip)
+                if not key:
+                    skipped += 1
+                    errors.append((f"row {idx}", f"Invalid IP address {ip}"))
+                    continue
+
+                obj = Device.objects.filter(ip_key=key).first()
                 if obj:
                     if options["update"]:
                         obj.hostname = hostname or obj.hostname
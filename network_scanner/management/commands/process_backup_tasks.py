@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from network_scanner.models import BackupConfig
+from network_scanner.task_queue import task_queue
+
+
+class Command(BaseCommand):
+    help = 'Run queued post-backup tasks (pushes and retention cleanup)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of worker threads (defaults to BACKUP_SETTINGS["TASK_WORKERS"])',
+        )
+        parser.add_argument(
+            '--drain',
+            action='store_true',
+            help='Exit once no task is ready to run instead of polling for new ones',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds an idle worker waits before checking the queue again (default: 5)',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Requeue tasks that ran out of attempts before starting',
+        )
+        parser.add_argument(
+            '--config',
+            type=str,
+            help='With --retry-failed, only requeue tasks of this backup configuration',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or getattr(settings, 'BACKUP_SETTINGS', {}).get('TASK_WORKERS', 2)
+
+        if options['retry_failed']:
+            config = None
+            if options['config']:
+                try:
+                    config = BackupConfig.objects.get(name=options['config'])
+                except BackupConfig.DoesNotExist:
+                    raise CommandError(f'Backup configuration "{options["config"]}" not found')
+            requeued = task_queue.retry_failed(config)
+            self.stdout.write(f'Requeued {requeued} failed tasks')
+
+        stats = task_queue.stats()
+        self.stdout.write(
+            f'Processing backup tasks with {workers} workers '
+            f'({stats["ready"]} ready, {stats["pending"] - stats["ready"]} waiting to retry)...'
+        )
+
+        try:
+            counts = task_queue.run_workers(
+                workers=workers,
+                drain=options['drain'],
+                poll_interval=options['poll_interval'],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nStopped; running tasks will be retried once their lease expires'))
+            return
+
+        stats = task_queue.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Completed {counts["completed"]} tasks, {counts["failed"]} failed attempts '
+            f'({stats["depth"]} still queued, {stats["failed"]} failed for good)'
+        ))
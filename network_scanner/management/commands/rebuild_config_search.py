@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from network_scanner.config_search import config_search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over the newest active config of each device'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding config search index...')
+        started = time.perf_counter()
+        indexed = config_search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} configs in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from network_scanner.backup_service import backup_service
+from network_scanner.models import BackupArchive, BackupHistory
+
+
+class Command(BaseCommand):
+    help = 'Restore the network configs of selected devices and/or one config type from a backup or archive'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument(
+            '--backup',
+            type=int,
+            help='ID of the completed backup to restore from',
+        )
+        source.add_argument(
+            '--archive',
+            type=int,
+            help='ID of the backup archive to restore from',
+        )
+        parser.add_argument(
+            '--archived-backup',
+            type=int,
+            help='With --archive, ID of the archived backup to use (default: the newest)',
+        )
+        parser.add_argument(
+            '--ip',
+            nargs='+',
+            dest='device_ips',
+            help='Device IP addresses to restore',
+        )
+        parser.add_argument(
+            '--config-type',
+            type=str,
+            help='Only restore configs of this type (e.g. running, startup)',
+        )
+        parser.add_argument(
+            '--skip-identical',
+            action='store_true',
+            help='Skip configs already stored with the same device, type and content',
+        )
+
+    def handle(self, *args, **options):
+        if not options['device_ips'] and not options['config_type']:
+            raise CommandError('Give --ip, --config-type, or both')
+
+        if options['backup']:
+            try:
+                source = BackupHistory.objects.get(id=options['backup'], status='completed')
+            except BackupHistory.DoesNotExist:
+                raise CommandError(f'Completed backup {options["backup"]} not found')
+        else:
+            try:
+                source = BackupArchive.objects.select_related('config').get(id=options['archive'])
+            except BackupArchive.DoesNotExist:
+                raise CommandError(f'Backup archive {options["archive"]} not found')
+
+        try:
+            stats = backup_service.restore_selected(
+                source,
+                device_ips=options['device_ips'],
+                config_type=options['config_type'],
+                backup_id=options['archived_backup'],
+                skip_identical=options['skip_identical'],
+            )
+        except (ValueError, KeyError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Restored {stats["created"]} configs from {source} ({stats["skipped"]} identical skipped, '
+            f'{stats["unchanged"]} unchanged)'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from network_scanner.backup_service import backup_service
+from network_scanner.models import BackupHistory
+
+
+class Command(BaseCommand):
+    help = "Reassemble a backup's log files from its incremental log segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'backup_id',
+            type=int,
+            help='ID of the backup to restore logs as of',
+        )
+        parser.add_argument(
+            '--target',
+            type=str,
+            help='Directory to write the logs to (default: backups/restored_logs/<config>_<id>/)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            backup = BackupHistory.objects.select_related('config').get(
+                id=options['backup_id'], status='completed'
+            )
+        except BackupHistory.DoesNotExist:
+            raise CommandError(f'Completed backup {options["backup_id"]} not found')
+
+        try:
+            target_dir = backup_service.restore_logs(backup, options['target'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Logs for {backup} restored to {target_dir}'))
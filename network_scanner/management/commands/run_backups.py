@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from network_scanner.backup_service import backup_service
+from network_scanner.backup_service import backup_service, BackupAlreadyRunning
 from network_scanner.models import BackupConfig
 
 
@@ -17,6 +17,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Force backup even if not due'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of configs to back up in parallel (defaults to BACKUP_SETTINGS["MAX_WORKERS"])'
+        )
 
     def handle(self, *args, **options):
         if options['config']:
@@ -37,9 +42,26 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.ERROR(f'Configuration {options["config"]} not found')
                 )
+            except BackupAlreadyRunning as e:
+                self.stdout.write(self.style.WARNING(str(e)))
         else:
             self.stdout.write('Running scheduled backups...')
-            backup_service.run_scheduled_backups()
+            results = backup_service.run_scheduled_backups(max_workers=options['workers'])
+            
+            for result in results:
+                if result['status'] == 'completed':
+                    self.stdout.write(
+                        self.style.SUCCESS(f'  {result["config"]}: completed in {result["duration"]:.1f}s')
+                    )
+                elif result['status'] == 'skipped':
+                    self.stdout.write(
+                        self.style.WARNING(f'  {result["config"]}: skipped ({result["error"]})')
+                    )
+                else:
+                    self.stdout.write(
+                        self.style.ERROR(f'  {result["config"]}: failed ({result["error"]})')
+                    )
+            
             self.stdout.write(
-                self.style.SUCCESS('Scheduled backups completed')
+                self.style.SUCCESS(f'Scheduled backups completed ({len(results)} due)')
             )
@@ -0,0 +1,59 @@
+import os
+import gzip
+import json
+from pathlib import Path
+
+
+def scan_tree(root):
+    """Walk a directory with os.scandir, yielding (relative posix path, stat) per file"""
+    root = Path(root)
+    if not root.exists():
+        return
+
+    stack = [(root, '')]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, f"{prefix}{entry.name}/"))
+                elif entry.is_file(follow_symlinks=False):
+                    yield prefix + entry.name, entry.stat(follow_symlinks=False)
+
+
+def file_record(stat, sha256=None):
+    record = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'inode': stat.st_ino,
+    }
+    if sha256:
+        record['sha256'] = sha256
+    return record
+
+
+def metadata_matches(record, stat):
+    """Whether a file looks unchanged from its indexed record without reading it"""
+    return (
+        record['size'] == stat.st_size
+        and record['mtime_ns'] == stat.st_mtime_ns
+        and record['inode'] == stat.st_ino
+    )
+
+
+def load_index(path):
+    """Load a persisted media index, or None if there is none"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_index(path, index):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
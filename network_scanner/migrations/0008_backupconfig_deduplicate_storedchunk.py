@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0007_searchconfig'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredChunk',
+            fields=[
+                ('digest', models.CharField(help_text='SHA-256 of the chunk content', max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed chunk size in bytes')),
+                ('stored_size', models.PositiveIntegerField(help_text='Size of the chunk file on disk in bytes')),
+                ('refcount', models.IntegerField(default=0, help_text='Number of backup manifest references')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='backupconfig',
+            name='deduplicate',
+            field=models.BooleanField(default=False, help_text='Store backups in the deduplicating chunk store instead of standalone zip files'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0008_backupconfig_deduplicate_storedchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupconfig',
+            name='full_backup_every',
+            field=models.PositiveIntegerField(default=7, help_text='For incremental/differential backups, take a full backup after this many chained backups'),
+        ),
+        migrations.AddField(
+            model_name='backuphistory',
+            name='backup_mode',
+            field=models.CharField(choices=[('full', 'Full'), ('incremental', 'Incremental'), ('differential', 'Differential')], default='full', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='backuphistory',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Backup this incremental or differential backup builds on', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='network_scanner.backuphistory'),
+        ),
+        migrations.AlterField(
+            model_name='backupconfig',
+            name='backup_type',
+            field=models.CharField(choices=[('full', 'Full System Backup'), ('config', 'Configuration Only'), ('data', 'Data Only'), ('incremental', 'Incremental (changes since last backup)'), ('differential', 'Differential (changes since last full backup)')], default='config', max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0009_incremental_differential_backups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupconfig',
+            name='compression',
+            field=models.CharField(choices=[('store', 'Store (no compression)'), ('deflate', 'Deflate'), ('bzip2', 'BZip2'), ('lzma', 'LZMA'), ('zstd', 'Zstandard (if supported)')], default='deflate', help_text='Compression codec for backup archive members', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='backupconfig',
+            name='compression_level',
+            field=models.PositiveSmallIntegerField(blank=True, help_text="Codec level (e.g. 1-9 for deflate); blank uses BACKUP_SETTINGS['COMPRESSION_LEVEL']", null=True),
+        ),
+        migrations.AddField(
+            model_name='backupconfig',
+            name='section_compression',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-section codec overrides, e.g. {"media": "store", "database": "lzma", "logs": "deflate:9"}'),
+        ),
+    ]
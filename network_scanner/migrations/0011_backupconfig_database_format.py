@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0010_backupconfig_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupconfig',
+            name='database_format',
+            field=models.CharField(choices=[('json', 'JSON fixture (dumpdata)'), ('sqlite', 'SQLite snapshot')], default='json', help_text='How the database is exported; SQLite snapshots use the online backup API and restore page by page', max_length=10),
+        ),
+    ]
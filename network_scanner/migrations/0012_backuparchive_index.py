@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0011_backupconfig_database_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backuparchive',
+            name='index',
+            field=models.JSONField(blank=True, default=dict, help_text='Archived backup id -> member name, offset and length within the archive'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0012_backuparchive_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupconfig',
+            name='keep_daily',
+            field=models.PositiveIntegerField(default=0, help_text='GFS retention: keep the newest backup of each of the last N days'),
+        ),
+        migrations.AddField(
+            model_name='backupconfig',
+            name='keep_hourly',
+            field=models.PositiveIntegerField(default=0, help_text='GFS retention: keep the newest backup of each of the last N hours (0 disables the tier)'),
+        ),
+        migrations.AddField(
+            model_name='backupconfig',
+            name='keep_monthly',
+            field=models.PositiveIntegerField(default=0, help_text='GFS retention: keep the newest backup of each of the last N months'),
+        ),
+        migrations.AddField(
+            model_name='backupconfig',
+            name='keep_weekly',
+            field=models.PositiveIntegerField(default=0, help_text='GFS retention: keep the newest backup of each of the last N weeks'),
+        ),
+    ]
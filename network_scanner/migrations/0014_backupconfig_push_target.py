@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0013_backupconfig_gfs_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupconfig',
+            name='push_options',
+            field=models.JSONField(blank=True, default=dict, help_text='Transport options, e.g. {"max_workers": 4, "chunk_size_mb": 16, "bandwidth_limit_mbps": 100, "endpoint_url": "https://minio.local:9000", "key_filename": "/etc/backup/id_ed25519"}'),
+        ),
+        migrations.AddField(
+            model_name='backupconfig',
+            name='push_target',
+            field=models.CharField(blank=True, help_text='Where auto push sends backups: a directory (local or NFS mount), sftp://user@host/path or s3://bucket/prefix', max_length=500),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0014_backupconfig_push_target'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackupTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('push', 'Push to remote'), ('cleanup', 'Retention cleanup')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=8)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time a worker may pick the task up')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, help_text='Worker holding the task while it runs', max_length=100)),
+                ('last_error', models.TextField(blank=True)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('backup', models.ForeignKey(blank=True, help_text='Backup the task acts on, for pushes', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='network_scanner.backuphistory')),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='network_scanner.backupconfig')),
+            ],
+            options={
+                'ordering': ['run_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='backuptask_status_run_after')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations, models
+
+from network_scanner.config_versions import decode_chain, encode_version, keyframe_interval
+
+
+def encode_existing_configs(apps, schema_editor):
+    """Re-encode every device's config history as keyframes and deltas"""
+    NetworkConfig = apps.get_model('network_scanner', 'NetworkConfig')
+    interval = keyframe_interval()
+    group = previous = None
+    updates = []
+
+    rows = NetworkConfig.objects.order_by('device_id', 'config_type', 'id').values_list(
+        'id', 'device_id', 'config_type', 'stored_data'
+    )
+    for row_id, device_id, config_type, text in rows.iterator(chunk_size=2000):
+        if (device_id, config_type) != group:
+            group, previous = (device_id, config_type), None
+        stored_data, delta_depth = encode_version(previous, text, interval)
+        previous = (delta_depth, text)
+        if delta_depth:
+            updates.append(NetworkConfig(id=row_id, stored_data=stored_data, delta_depth=delta_depth))
+        if len(updates) >= 1000:
+            NetworkConfig.objects.bulk_update(updates, ['stored_data', 'delta_depth'])
+            updates = []
+    NetworkConfig.objects.bulk_update(updates, ['stored_data', 'delta_depth'])
+
+
+def decode_existing_configs(apps, schema_editor):
+    """Write every version back as full text"""
+    NetworkConfig = apps.get_model('network_scanner', 'NetworkConfig')
+    chain = []
+    updates = []
+
+    rows = NetworkConfig.objects.order_by('device_id', 'config_type', 'id').values_list(
+        'id', 'stored_data', 'delta_depth'
+    )
+    for row_id, stored_data, delta_depth in rows.iterator(chunk_size=2000):
+        if delta_depth == 0:
+            chain = []
+        chain.append((stored_data, delta_depth))
+        if delta_depth:
+            updates.append(NetworkConfig(id=row_id, stored_data=decode_chain(chain), delta_depth=0))
+        if len(updates) >= 1000:
+            NetworkConfig.objects.bulk_update(updates, ['stored_data', 'delta_depth'])
+            updates = []
+    NetworkConfig.objects.bulk_update(updates, ['stored_data', 'delta_depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0015_backuptask'),
+    ]
+
+    operations = [
+        # The column keeps its name; only the field is renamed, freeing config_data for the full-text property
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='networkconfig',
+                    old_name='config_data',
+                    new_name='stored_data',
+                ),
+                migrations.AlterField(
+                    model_name='networkconfig',
+                    name='stored_data',
+                    field=models.TextField(db_column='config_data', help_text='Full text for a keyframe, otherwise a line delta against the previous version'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='networkconfig',
+            name='delta_depth',
+            field=models.PositiveSmallIntegerField(default=0, help_text='0 for a keyframe, otherwise the number of deltas since it'),
+        ),
+        migrations.AddIndex(
+            model_name='networkconfig',
+            index=models.Index(fields=['device', 'config_type', 'id'], name='networkconfig_chain'),
+        ),
+        migrations.RunPython(encode_existing_configs, decode_existing_configs),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+from network_scanner.config_versions import apply_delta, hash_config, volatile_line_pattern
+
+
+def hash_existing_configs(apps, schema_editor):
+    """Fill content_hash from the decoded text of every version"""
+    NetworkConfig = apps.get_model('network_scanner', 'NetworkConfig')
+    volatile = volatile_line_pattern()
+    text = None
+    updates = []
+
+    rows = NetworkConfig.objects.order_by('device_id', 'config_type', 'id').values_list(
+        'id', 'stored_data', 'delta_depth'
+    )
+    for row_id, stored_data, delta_depth in rows.iterator(chunk_size=2000):
+        text = stored_data if delta_depth == 0 else apply_delta(text, stored_data)
+        updates.append(NetworkConfig(id=row_id, content_hash=hash_config(text, volatile)))
+        if len(updates) >= 1000:
+            NetworkConfig.objects.bulk_update(updates, ['content_hash'])
+            updates = []
+    NetworkConfig.objects.bulk_update(updates, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0016_networkconfig_delta_chains'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkconfig',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the config with volatile lines such as timestamps stripped', max_length=64),
+        ),
+        migrations.RunPython(hash_existing_configs, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='networkconfig',
+            index=models.Index(fields=['device', 'config_type', 'content_hash'], name='networkconfig_content_hash'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+from network_scanner.config_search import config_search
+from network_scanner.config_versions import apply_delta
+
+
+def index_existing_configs(apps, schema_editor):
+    """Index the newest active version of each device and config type"""
+    NetworkConfig = apps.get_model('network_scanner', 'NetworkConfig')
+
+    def decoded_rows():
+        text = None
+        rows = NetworkConfig.objects.order_by('device_id', 'config_type', 'id').values_list(
+            'id', 'device_id', 'config_type', 'is_active', 'stored_data', 'delta_depth'
+        )
+        for row_id, device_id, config_type, is_active, stored_data, delta_depth in rows.iterator(chunk_size=2000):
+            text = stored_data if delta_depth == 0 else apply_delta(text, stored_data)
+            yield row_id, device_id, config_type, is_active, text
+
+    config_search.rebuild(decoded_rows())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0017_networkconfig_content_hash'),
+    ]
+
+    operations = [
+        # Full text of the newest active version of each device and config type,
+        # with an external-content FTS5 index kept in step by triggers
+        migrations.RunSQL(
+            sql=[
+                """
+                CREATE TABLE network_scanner_configsearchentry (
+                    id integer NOT NULL PRIMARY KEY,
+                    device_id bigint NOT NULL,
+                    config_type varchar(50) NOT NULL,
+                    config_data text NOT NULL,
+                    UNIQUE (device_id, config_type)
+                )
+                """,
+                """
+                CREATE VIRTUAL TABLE network_scanner_configsearch USING fts5(
+                    config_data, content='network_scanner_configsearchentry', content_rowid='id'
+                )
+                """,
+                """
+                CREATE TRIGGER network_scanner_configsearchentry_ai AFTER INSERT ON network_scanner_configsearchentry BEGIN
+                    INSERT INTO network_scanner_configsearch(rowid, config_data) VALUES (new.id, new.config_data);
+                END
+                """,
+                """
+                CREATE TRIGGER network_scanner_configsearchentry_ad AFTER DELETE ON network_scanner_configsearchentry BEGIN
+                    INSERT INTO network_scanner_configsearch(network_scanner_configsearch, rowid, config_data)
+                    VALUES ('delete', old.id, old.config_data);
+                END
+                """,
+            ],
+            reverse_sql=[
+                "DROP TRIGGER network_scanner_configsearchentry_ad",
+                "DROP TRIGGER network_scanner_configsearchentry_ai",
+                "DROP TABLE network_scanner_configsearch",
+                "DROP TABLE network_scanner_configsearchentry",
+            ],
+        ),
+        migrations.RunPython(index_existing_configs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+from network_scanner.ip_keys import ip_key
+
+
+def fill_ip_keys(apps, schema_editor):
+    Device = apps.get_model('network_scanner', 'Device')
+    devices = []
+    for device_id, ip_address in Device.objects.values_list('id', 'ip_address').iterator(chunk_size=5000):
+        devices.append(Device(id=device_id, ip_key=ip_key(ip_address)))
+        if len(devices) >= 1000:
+            Device.objects.bulk_update(devices, ['ip_key'])
+            devices = []
+    Device.objects.bulk_update(devices, ['ip_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network_scanner', '0018_config_search'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='device',
+            options={'ordering': ['device_type', 'ip_key']},
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='ip_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='ip_address as 32 hex digits (IPv4 mapped into IPv6) for ordering and range lookups', max_length=32),
+        ),
+        migrations.RunPython(fill_ip_keys, migrations.RunPython.noop),
+    ]
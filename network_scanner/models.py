@@ -1,7 +1,65 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 import json
 
+from .compression import CODEC_CHOICES, SECTIONS, parse_codec_spec
+from .config_search import config_search
+from .ip_keys import MAX_KEY, MIN_KEY, ip_key, ip_key_range
+from .suggestion_index import suggestion_index
+from .config_versions import (
+    apply_delta, decode_chain, encode_version, hash_config, keyframe_interval, volatile_line_pattern,
+)
+
+
+class DeviceQuerySet(models.QuerySet):
+    """Device queries by IP range, with ip_key kept in step on bulk writes"""
+    
+    def in_subnet(self, spec):
+        """Devices inside a CIDR subnet, an 'a-b' address range or at a single address"""
+        low, high = ip_key_range(spec)
+        return self.filter(ip_key__range=(low, high))
+    
+    def in_ip_range(self, start=None, end=None):
+        """Devices from start to end inclusive; either bound may be left open"""
+        if not (start or end):
+            return self
+        # An open bound stops at the first or last address, never at devices without a key
+        low = ip_key_range(start)[0] if start else MIN_KEY
+        high = ip_key_range(end)[1] if end else MAX_KEY
+        return self.filter(ip_key__range=(low, high))
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.ip_key = ip_key(obj.ip_address)
+        return super().bulk_create(objs, *args, **kwargs)
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'ip_address' in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.ip_key = ip_key(obj.ip_address)
+            fields = [*fields, 'ip_key']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+    
+    def update(self, **kwargs):
+        if isinstance(kwargs.get('ip_address'), str):
+            kwargs['ip_key'] = ip_key(kwargs['ip_address'])
+        return super().update(**kwargs)
+    
+    def sync_ip_keys(self):
+        """Fix ip_key wherever it doesn't match ip_address, e.g. after a raw load; returns how many"""
+        stale = [
+            self.model(id=device_id, ip_key=ip_key(ip_address))
+            for device_id, ip_address, key in self.values_list('id', 'ip_address', 'ip_key').iterator(chunk_size=5000)
+            if ip_key(ip_address) != key
+        ]
+        self.model.objects.bulk_update(stale, ['ip_key'], batch_size=1000)
+        return len(stale)
+
 
 class Device(models.Model):
     DEVICE_TYPE_CHOICES = [
@@ -19,9 +77,12 @@ class Device(models.Model):
     status = models.CharField(max_length=20, default="offline")
     last_scanned_at = models.DateTimeField(null=True, blank=True)
     description = models.TextField(blank=True, help_text="Device description or notes")
+    ip_key = models.CharField(max_length=32, blank=True, editable=False, db_index=True, help_text="ip_address as 32 hex digits (IPv4 mapped into IPv6) for ordering and range lookups")
+    
+    objects = DeviceQuerySet.as_manager()
 
     class Meta:
-        ordering = ['device_type', 'ip_address']
+        ordering = ['device_type', 'ip_key']
 
     def __str__(self) -> str:
         return f"{self.get_device_type_display()} - {self.ip_address}"
@@ -29,6 +90,13 @@ class Device(models.Model):
     @property
     def device_type_display(self):
         return self.get_device_type_display()
+    
+    def save(self, *args, **kwargs):
+        self.ip_key = ip_key(self.ip_address)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'ip_address' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'ip_key'}
+        super().save(*args, **kwargs)
 
 
 
@@ -39,8 +107,13 @@ class BackupConfig(models.Model):
         ('full', 'Full System Backup'),
         ('config', 'Configuration Only'),
         ('data', 'Data Only'),
+        ('incremental', 'Incremental (changes since last backup)'),
+        ('differential', 'Differential (changes since last full backup)'),
     ]
     
+    # Backup types that build on an earlier backup instead of exporting everything
+    CHAINED_TYPES = ('incremental', 'differential')
+    
     FREQUENCY_CHOICES = [
         ('hourly', 'Hourly'),
         ('daily', 'Daily'),
@@ -49,18 +122,35 @@ class BackupConfig(models.Model):
     ]
     
     name = models.CharField(max_length=100, unique=True)
-    backup_type = models.CharField(max_length=10, choices=BACKUP_TYPES, default='config')
+    backup_type = models.CharField(max_length=20, choices=BACKUP_TYPES, default='config')
     frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='daily')
     enabled = models.BooleanField(default=True)
     auto_push_enabled = models.BooleanField(default=False, help_text="Enable automatic push of backups to remote location")
+    push_target = models.CharField(max_length=500, blank=True, help_text="Where auto push sends backups: a directory (local or NFS mount), sftp://user@host/path or s3://bucket/prefix")
+    push_options = models.JSONField(default=dict, blank=True, help_text='Transport options, e.g. {"max_workers": 4, "chunk_size_mb": 16, "bandwidth_limit_mbps": 100, "endpoint_url": "https://minio.local:9000", "key_filename": "/etc/backup/id_ed25519"}')
     max_backups = models.PositiveIntegerField(default=30, help_text="Maximum number of backups to keep")
     retention_months = models.PositiveIntegerField(default=6, help_text="Number of months to keep individual backups before archiving")
+    keep_hourly = models.PositiveIntegerField(default=0, help_text="GFS retention: keep the newest backup of each of the last N hours (0 disables the tier)")
+    keep_daily = models.PositiveIntegerField(default=0, help_text="GFS retention: keep the newest backup of each of the last N days")
+    keep_weekly = models.PositiveIntegerField(default=0, help_text="GFS retention: keep the newest backup of each of the last N weeks")
+    keep_monthly = models.PositiveIntegerField(default=0, help_text="GFS retention: keep the newest backup of each of the last N months")
     archive_old_backups = models.BooleanField(default=True, help_text="Archive old backups instead of deleting them")
+    full_backup_every = models.PositiveIntegerField(default=7, help_text="For incremental/differential backups, take a full backup after this many chained backups")
     backup_path = models.CharField(max_length=500, default='backups/')
     archive_path = models.CharField(max_length=500, default='backups/archives/', help_text="Path for archived backups")
     include_database = models.BooleanField(default=True)
+    database_format = models.CharField(
+        max_length=10,
+        choices=[('json', 'JSON fixture (dumpdata)'), ('sqlite', 'SQLite snapshot')],
+        default='json',
+        help_text="How the database is exported; SQLite snapshots use the online backup API and restore page by page"
+    )
     include_media = models.BooleanField(default=False)
     include_logs = models.BooleanField(default=True)
+    compression = models.CharField(max_length=20, choices=CODEC_CHOICES, default='deflate', help_text="Compression codec for backup archive members")
+    compression_level = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Codec level (e.g. 1-9 for deflate); blank uses BACKUP_SETTINGS['COMPRESSION_LEVEL']")
+    section_compression = models.JSONField(default=dict, blank=True, help_text='Per-section codec overrides, e.g. {"media": "store", "database": "lzma", "logs": "deflate:9"}')
+    deduplicate = models.BooleanField(default=False, help_text="Store backups in the deduplicating chunk store instead of standalone zip files")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_backup_at = models.DateTimeField(null=True, blank=True)
@@ -69,11 +159,42 @@ class BackupConfig(models.Model):
     def __str__(self):
         return f"{self.name} ({self.frequency})"
     
+    def clean(self):
+        for section, spec in (self.section_compression or {}).items():
+            if section not in SECTIONS:
+                raise ValidationError({'section_compression': f"Unknown section '{section}'"})
+            try:
+                parse_codec_spec(spec)
+            except ValueError as e:
+                raise ValidationError({'section_compression': str(e)})
+    
     def save(self, *args, **kwargs):
         if not self.next_backup_at and self.enabled:
             self.schedule_next_backup()
         super().save(*args, **kwargs)
     
+    @property
+    def gfs_tiers(self):
+        return {
+            'hourly': self.keep_hourly,
+            'daily': self.keep_daily,
+            'weekly': self.keep_weekly,
+            'monthly': self.keep_monthly,
+        }
+    
+    @property
+    def uses_gfs_retention(self):
+        """Whether any GFS tier is set, replacing max_backups as the retention rule"""
+        return any(self.gfs_tiers.values())
+    
+    @property
+    def includes_network_configs(self):
+        return self.backup_type != 'data'
+    
+    @property
+    def includes_media_files(self):
+        return self.include_media and self.backup_type != 'config'
+    
     def schedule_next_backup(self):
         """Calculate next backup time based on frequency"""
         now = timezone.now()
@@ -97,8 +218,19 @@ class BackupHistory(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    MODE_CHOICES = [
+        ('full', 'Full'),
+        ('incremental', 'Incremental'),
+        ('differential', 'Differential'),
+    ]
+    
     config = models.ForeignKey(BackupConfig, on_delete=models.CASCADE, related_name='backups')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    backup_mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='full')
+    parent = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children',
+        help_text="Backup this incremental or differential backup builds on"
+    )
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     file_path = models.CharField(max_length=500, blank=True)
@@ -115,6 +247,14 @@ class BackupHistory(models.Model):
             return self.completed_at - self.started_at
         return None
     
+    def get_chain(self):
+        """Return the backups to replay for a restore, oldest (the full backup) first"""
+        chain = [self]
+        while chain[-1].parent_id:
+            chain.append(chain[-1].parent)
+        chain.reverse()
+        return chain
+    
     def mark_completed(self, file_path=None, file_size=None, backup_data=None):
         self.status = 'completed'
         self.completed_at = timezone.now()
@@ -142,6 +282,7 @@ class BackupArchive(models.Model):
     backup_count = models.PositiveIntegerField(help_text="Number of backups in this archive")
     date_range_start = models.DateTimeField(help_text="Start date of backups in archive")
     date_range_end = models.DateTimeField(help_text="End date of backups in archive")
+    index = models.JSONField(default=dict, blank=True, help_text="Archived backup id -> member name, offset and length within the archive")
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -158,18 +299,337 @@ class BackupArchive(models.Model):
         return f"{size:.1f} PB"
 
 
+class BackupTask(models.Model):
+    """Post-backup job (push, retention cleanup) waiting for a background worker"""
+    KIND_CHOICES = [
+        ('push', 'Push to remote'),
+        ('cleanup', 'Retention cleanup'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    config = models.ForeignKey(BackupConfig, on_delete=models.CASCADE, related_name='tasks')
+    backup = models.ForeignKey(
+        BackupHistory, on_delete=models.CASCADE, null=True, blank=True, related_name='tasks',
+        help_text="Backup the task acts on, for pushes"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=8)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Earliest time a worker may pick the task up")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True, help_text="Worker holding the task while it runs")
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='backuptask_status_run_after'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.config.name} ({self.status})"
+
+
+class StoredChunk(models.Model):
+    """Reference-counted chunk in the deduplicating backup store"""
+    digest = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of the chunk content")
+    size = models.PositiveIntegerField(help_text="Uncompressed chunk size in bytes")
+    stored_size = models.PositiveIntegerField(help_text="Size of the chunk file on disk in bytes")
+    refcount = models.IntegerField(default=0, help_text="Number of backup manifest references")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Chunk {self.digest[:12]} ({self.refcount} refs)"
+
+
+class NetworkConfigQuerySet(models.QuerySet):
+    """Reads and writes NetworkConfig rows as delta chains
+    
+    Each device and config type has its versions stored as chains: a full
+    keyframe followed by line deltas, each against the version stored just
+    before it. Rows are only ever appended to the end of a chain, so a chain
+    is a run of consecutive rows of its device and config type.
+    """
+    
+    def chain_text(self, device_id, config_type, delta_depth, upto_id):
+        """Full text of the version with id upto_id at delta_depth, from one query of its chain"""
+        rows = list(
+            self.model.objects
+            .filter(device_id=device_id, config_type=config_type, id__lte=upto_id)
+            .order_by('-id')
+            .values_list('stored_data', 'delta_depth')[:delta_depth + 1]
+        )
+        rows.reverse()
+        return decode_chain(rows)
+    
+    def latest_versions(self, groups):
+        """(delta_depth, text, content_hash) of the newest version in this queryset of each (device_id, config_type)"""
+        groups = set(groups)
+        if not groups:
+            return {}
+        
+        interval = keyframe_interval()
+        recent = {}
+        rows = (
+            self
+            .filter(
+                device_id__in={device_id for device_id, _ in groups},
+                config_type__in={config_type for _, config_type in groups},
+            )
+            .annotate(recency=Window(
+                RowNumber(), partition_by=[F('device_id'), F('config_type')], order_by=F('id').desc()
+            ))
+            .filter(recency__lte=interval)
+            .order_by('device_id', 'config_type', '-id')
+            .values_list('id', 'device_id', 'config_type', 'stored_data', 'delta_depth', 'content_hash')
+        )
+        for row_id, device_id, config_type, stored_data, delta_depth, hash_ in rows:
+            if (device_id, config_type) in groups:
+                recent.setdefault((device_id, config_type), []).append((row_id, stored_data, delta_depth, hash_))
+        
+        latest = {}
+        for group, newest_first in recent.items():
+            row_id, _, delta_depth, hash_ = newest_first[0]
+            if delta_depth < len(newest_first):
+                chain = [(stored_data, depth) for _, stored_data, depth, _ in newest_first[delta_depth::-1]]
+                latest[group] = (delta_depth, decode_chain(chain), hash_)
+            else:
+                # Chains written before CONFIG_KEYFRAME_INTERVAL was lowered
+                latest[group] = (delta_depth, self.chain_text(*group, delta_depth, row_id), hash_)
+        return latest
+    
+    def encode_versions(self, configs, latest=None, skip_unchanged=False):
+        """Set stored_data, delta_depth and content_hash of unsaved configs from their config_data
+        
+        Each config is encoded against the newest stored version of its device
+        and config type, or against the config before it in the list. latest
+        caches those newest versions and can be shared across calls, e.g.
+        between the batches of one restore. With skip_unchanged, configs whose
+        content hash matches that newest version are left out. Returns the
+        configs to store.
+        """
+        if latest is None:
+            latest = {}
+        missing = {(config.device_id, config.config_type) for config in configs} - latest.keys()
+        latest.update(self.latest_versions(missing))
+        
+        interval = keyframe_interval()
+        volatile = volatile_line_pattern()
+        encoded = []
+        for config in configs:
+            group = (config.device_id, config.config_type)
+            text = config.config_data
+            config.content_hash = hash_config(text, volatile)
+            previous = latest.get(group)
+            if skip_unchanged and previous is not None and previous[2] == config.content_hash:
+                continue
+            config.stored_data, config.delta_depth = encode_version(previous, text, interval)
+            config._text_changed = False
+            latest[group] = (config.delta_depth, text, config.content_hash)
+            encoded.append(config)
+        return encoded
+    
+    def bulk_create_versions(self, configs, batch_size=None, latest=None, skip_unchanged=False):
+        """Delta-encode unsaved configs and insert them in order, returning the inserted ones
+        
+        With skip_unchanged, a config that normalizes to the same content as
+        the newest version of its device and config type isn't stored again.
+        """
+        with transaction.atomic():
+            configs = self.encode_versions(configs, latest, skip_unchanged)
+            created = self.bulk_create(configs, batch_size=batch_size)
+            config_search.index_versions(created)
+            suggestion_index.configs_added(config.device_id for config in created)
+            return created
+    
+    def changed_devices(self, since, config_type=None):
+        """Ids of devices whose newest config differs from their newest one as of since
+        
+        Compares content hashes only, so nothing is decoded. Devices whose
+        first config was stored after since count as changed; versions that
+        only touched volatile lines don't.
+        """
+        def newest_ids(queryset):
+            rows = queryset.order_by().values('device_id', 'config_type').annotate(newest=Max('id'))
+            return {(row['device_id'], row['config_type']): row['newest'] for row in rows}
+        
+        # Only a group with a version stored after since can have changed
+        recent = self.filter(backup_timestamp__gt=since)
+        if config_type is not None:
+            recent = recent.filter(config_type=config_type)
+        current = newest_ids(recent)
+        if not current:
+            return []
+        before = newest_ids(self.model.objects.filter(
+            device_id__in={device_id for device_id, _ in current},
+            config_type__in={group_type for _, group_type in current},
+            backup_timestamp__lte=since,
+        ))
+        hashes = dict(
+            self.model.objects
+            .filter(id__in=[*current.values(), *before.values()])
+            .values_list('id', 'content_hash')
+        )
+        return sorted({
+            group[0] for group, row_id in current.items()
+            if hashes[row_id] != hashes.get(before.get(group))
+        })
+    
+    def iter_texts(self, *fields):
+        """Yield (row, text) for every row, with each delta chain decoded once
+        
+        row is a dict of fields (id, device_id, config_type, stored_data and
+        delta_depth are always included). Rows come in device, config type and
+        id order. The queryset may only be filtered by device, config type and
+        id bounds, so the rows it holds of each chain are consecutive; the text
+        before the first row of each group is read from the database.
+        """
+        fields = ('id', 'device_id', 'config_type', 'stored_data', 'delta_depth') + fields
+        group = previous = None
+        for row in self.order_by('device_id', 'config_type', 'id').values(*fields).iterator(chunk_size=2000):
+            row_group = (row['device_id'], row['config_type'])
+            if row['delta_depth'] == 0:
+                text = row['stored_data']
+            elif row_group == group:
+                text = apply_delta(previous, row['stored_data'])
+            else:
+                text = self.chain_text(*row_group, row['delta_depth'], row['id'])
+            group, previous = row_group, text
+            yield row, text
+    
+    def delete(self):
+        """Delete versions, re-encoding the later versions of their chains"""
+        with transaction.atomic():
+            doomed = {}
+            for row_id, device_id, config_type in self.values_list('id', 'device_id', 'config_type'):
+                doomed.setdefault((device_id, config_type), set()).add(row_id)
+            
+            # Texts of the versions that build on a doomed one, read before anything goes
+            survivors = []
+            for (device_id, config_type), ids in doomed.items():
+                tail = self.model.objects.filter(
+                    device_id=device_id, config_type=config_type, id__gte=min(ids)
+                ).iter_texts()
+                for row, text in tail:
+                    if row['id'] > max(ids) and row['delta_depth'] == 0:
+                        break
+                    if row['id'] not in ids:
+                        survivors.append((device_id, config_type, row['id'], text))
+            
+            result = super().delete()
+            
+            latest = {}
+            updates = []
+            for device_id, config_type, row_id, text in survivors:
+                group = (device_id, config_type)
+                if group not in latest:
+                    previous = self.model.objects.filter(device_id=device_id, config_type=config_type, id__lt=row_id)
+                    latest.update(previous.latest_versions([group]))
+                stored_data, delta_depth = encode_version(latest.get(group), text)
+                latest[group] = (delta_depth, text)
+                updates.append(self.model(id=row_id, stored_data=stored_data, delta_depth=delta_depth))
+            self.model.objects.bulk_update(updates, ['stored_data', 'delta_depth'], batch_size=500)
+        return result
+    
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class NetworkConfig(models.Model):
-    """Store network device configurations"""
+    """Store network device configurations
+    
+    Versions are delta encoded (see NetworkConfigQuerySet); config_data
+    always reads and writes the full text.
+    """
     device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='configs')
     config_type = models.CharField(max_length=50, default='running')
-    config_data = models.TextField()
+    stored_data = models.TextField(db_column='config_data', help_text="Full text for a keyframe, otherwise a line delta against the previous version")
+    delta_depth = models.PositiveSmallIntegerField(default=0, help_text="0 for a keyframe, otherwise the number of deltas since it")
+    content_hash = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 of the config with volatile lines such as timestamps stripped")
     backup_timestamp = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     version = models.CharField(max_length=20, default='1.0')
     
+    objects = NetworkConfigQuerySet.as_manager()
+    
+    _config_text = None
+    _text_changed = False
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['device', 'config_type', 'id'], name='networkconfig_chain'),
+            models.Index(fields=['device', 'config_type', 'content_hash'], name='networkconfig_content_hash'),
+        ]
+    
     def __str__(self):
         return f"{self.device.ip_address} - {self.config_type} ({self.backup_timestamp})"
     
+    @property
+    def config_data(self):
+        if self._config_text is None:
+            if self.delta_depth == 0:
+                self._config_text = self.stored_data
+            else:
+                self._config_text = NetworkConfig.objects.chain_text(
+                    self.device_id, self.config_type, self.delta_depth, self.pk
+                )
+        return self._config_text
+    
+    @config_data.setter
+    def config_data(self, text):
+        self._config_text = text
+        self._text_changed = True
+    
+    def save(self, *args, **kwargs):
+        if not self._text_changed:
+            return super().save(*args, **kwargs)
+        
+        with transaction.atomic():
+            if self.pk is None:
+                NetworkConfig.objects.encode_versions([self])
+                return super().save(*args, **kwargs)
+            
+            # Editing a stored version: the versions built on it are re-encoded too
+            text = self._config_text
+            following = NetworkConfig.objects.filter(
+                device_id=self.device_id, config_type=self.config_type, id__gt=self.pk
+            ).iter_texts()
+            tail = []
+            for row, row_text in following:
+                if row['delta_depth'] == 0:
+                    break
+                tail.append((row['id'], row_text))
+            
+            group = (self.device_id, self.config_type)
+            previous = NetworkConfig.objects.filter(
+                device_id=self.device_id, config_type=self.config_type, id__lt=self.pk
+            ).latest_versions([group]).get(group)
+            self.stored_data, self.delta_depth = encode_version(previous, text)
+            self.content_hash = hash_config(text)
+            self._text_changed = False
+            super().save(*args, **kwargs)
+            
+            previous = (self.delta_depth, text)
+            updates = []
+            for row_id, row_text in tail:
+                stored_data, delta_depth = encode_version(previous, row_text)
+                previous = (delta_depth, row_text)
+                updates.append(NetworkConfig(id=row_id, stored_data=stored_data, delta_depth=delta_depth))
+            NetworkConfig.objects.bulk_update(updates, ['stored_data', 'delta_depth'])
+    
+    def delete(self, using=None, keep_parents=False):
+        return NetworkConfig.objects.using(using).filter(pk=self.pk).delete()
+    
     def to_dict(self):
         return {
             'device_ip': self.device.ip_address,
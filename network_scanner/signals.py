@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .config_search import config_search
+from .models import Device, NetworkConfig, SearchConfig
+from .suggestion_index import suggestion_index
+
+
+@receiver(post_save, sender=NetworkConfig)
+def refresh_config_search_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        config_search.schedule_refresh(instance.device_id, instance.config_type)
+
+
+@receiver(post_delete, sender=NetworkConfig)
+def refresh_config_search_on_delete(sender, instance, **kwargs):
+    config_search.schedule_refresh(instance.device_id, instance.config_type)
+
+
+@receiver(post_save, sender=NetworkConfig)
+def count_config_for_suggestions(sender, instance, created=False, **kwargs):
+    if created:
+        suggestion_index.configs_added([instance.device_id])
+
+
+@receiver(post_delete, sender=NetworkConfig)
+def uncount_config_for_suggestions(sender, instance, **kwargs):
+    suggestion_index.configs_added([instance.device_id], step=-1)
+
+
+@receiver(post_save, sender=Device)
+def rekey_device_for_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        suggestion_index.device_saved(instance)
+
+
+@receiver(post_delete, sender=Device)
+def drop_device_from_suggestions(sender, instance, **kwargs):
+    suggestion_index.device_deleted(instance.pk)
+
+
+@receiver(post_save, sender=SearchConfig)
+@receiver(post_delete, sender=SearchConfig)
+def invalidate_search_config(sender, **kwargs):
+    suggestion_index.invalidate_search_config()
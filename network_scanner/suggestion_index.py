@@ -0,0 +1,254 @@
+import bisect
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+
+SUGGESTION_FIELDS = ('ip_address', 'hostname', 'description')
+
+# Hostnames are also matched from the start of each part, e.g. "sw01" in "dc1-sw01.example"
+_HOSTNAME_SEPARATORS = re.compile(r'[-._]')
+_IP_SEPARATORS = re.compile(r'[.:]')
+_WORD = re.compile(r'\w+')
+
+
+def _suffixes(value, separators):
+    """value and every tail of it that starts just after a separator"""
+    keys = {value}
+    for found in separators.finditer(value):
+        if found.end() < len(value):
+            keys.add(value[found.end():])
+    return keys
+
+
+def _device_keys(device):
+    """(field, key) pairs a device is found by"""
+    keys = [('ip_address', key) for key in _suffixes(device['ip'].lower(), _IP_SEPARATORS)]
+    if device['hostname']:
+        keys.extend(('hostname', key) for key in _suffixes(device['hostname'].lower(), _HOSTNAME_SEPARATORS))
+    if device['description']:
+        keys.extend(('description', word) for word in set(_WORD.findall(device['description'].lower())))
+    return keys
+
+
+def _device_entry(ip_address, hostname, device_type_display, status, description):
+    """What a suggestion shows of a device, less its config count"""
+    return {
+        'ip': ip_address,
+        'hostname': hostname or '',
+        'device_type': device_type_display,
+        'status': status,
+        'description': description or '',
+    }
+
+
+class _Snapshot:
+    """One build of the index: a sorted list of (key, device_id) per field
+
+    Keys and ids share tuples so that a reader racing an in-place update
+    can't pair a key with the wrong device.
+    """
+
+    def __init__(self, devices, counts, keys, ip_keys):
+        self.devices = devices
+        self.counts = counts
+        self.ip_keys = ip_keys
+        self.keys = keys
+        for pairs in keys.values():
+            pairs.sort()
+        self.built_at = time.monotonic()
+        # Set by invalidate(): still served, but replaced as soon as possible
+        self.stale = False
+
+
+class SuggestionIndex:
+    """Per-process prefix index over device IPs, hostnames and description words
+
+    Suggestions are answered from sorted key arrays with bisect, and config
+    counts come precomputed, so a keystroke never touches the database. The
+    index is built on first use. Device signals in this process re-key that
+    device in place, config signals and bulk inserts adjust the counts, and
+    SEARCH_SETTINGS['SUGGESTION_INDEX_MAX_AGE'] bounds how long changes made
+    by other processes take to show. Once a snapshot is that old, or has been
+    invalidated, a background thread rebuilds it while requests keep being
+    answered from the old one; changes made during the rebuild are replayed
+    onto the new snapshot before it is swapped in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._search_config = None
+        # Changes seen while a background rebuild runs, or None when none is running
+        self._replay = None
+
+    def suggest(self, query, fields, limit, key_range=None):
+        """Up to limit devices with a key in one of fields starting with query, case-insensitively
+
+        key_range, a (low, high) pair of ip_keys, leaves out devices outside it.
+        """
+        snapshot = self._current()
+        query = query.lower()
+        found = []
+        seen = set()
+        for field in fields:
+            pairs = snapshot.keys[field]
+            position = bisect.bisect_left(pairs, (query,))
+            while position < len(pairs) and len(found) < limit and pairs[position][0].startswith(query):
+                device_id = pairs[position][1]
+                in_range = not key_range or key_range[0] <= snapshot.ip_keys[device_id] <= key_range[1]
+                if in_range and device_id not in seen:
+                    seen.add(device_id)
+                    found.append(device_id)
+                position += 1
+        return [
+            dict(snapshot.devices[device_id], config_count=snapshot.counts.get(device_id, 0))
+            for device_id in found
+        ]
+
+    def describe(self, devices):
+        """Suggestions for devices already picked from the database, with precomputed config counts"""
+        counts = self._current().counts
+        return [
+            dict(
+                _device_entry(device.ip_address, device.hostname, device.get_device_type_display(),
+                              device.status, device.description),
+                config_count=counts.get(device.pk, 0),
+            )
+            for device in devices
+        ]
+
+    def search_config(self):
+        """The active SearchConfig, read once until it changes"""
+        from .models import SearchConfig
+
+        config = self._search_config
+        if config is None:
+            config = self._search_config = SearchConfig.get_active_config()
+        return config
+
+    def invalidate(self):
+        """Have the index rebuilt in the background, e.g. after a bulk insert"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            snapshot.stale = True
+
+    def invalidate_search_config(self):
+        self._search_config = None
+
+    def device_saved(self, device):
+        """Re-key one device in place, cheaper than rebuilding for a single change"""
+        entry = _device_entry(device.ip_address, device.hostname, device.get_device_type_display(),
+                              device.status, device.description)
+        self._apply(self._save_device, device.pk, entry, device.ip_key)
+
+    def device_deleted(self, device_id):
+        self._apply(self._delete_device, device_id)
+
+    def configs_added(self, device_ids, step=1):
+        """Adjust config counts for configs stored (or, with step=-1, deleted) for device_ids"""
+        self._apply(self._count_configs, list(device_ids), step)
+
+    def _apply(self, change, *args):
+        """Apply a change to the current snapshot, and to the one being rebuilt if any"""
+        with self._lock:
+            if self._snapshot is not None:
+                change(self._snapshot, *args)
+            if self._replay is not None:
+                self._replay.append((change, args))
+
+    def _save_device(self, snapshot, device_id, entry, ip_key):
+        self._remove_device(snapshot, device_id)
+        for field, key in _device_keys(entry):
+            bisect.insort(snapshot.keys[field], (key, device_id))
+        snapshot.devices[device_id] = entry
+        snapshot.ip_keys[device_id] = ip_key
+
+    def _delete_device(self, snapshot, device_id):
+        self._remove_device(snapshot, device_id)
+        snapshot.counts.pop(device_id, None)
+
+    def _remove_device(self, snapshot, device_id):
+        entry = snapshot.devices.pop(device_id, None)
+        if entry is None:
+            return
+        snapshot.ip_keys.pop(device_id, None)
+        for field, key in _device_keys(entry):
+            pairs = snapshot.keys[field]
+            position = bisect.bisect_left(pairs, (key, device_id))
+            if position < len(pairs) and pairs[position] == (key, device_id):
+                del pairs[position]
+
+    def _count_configs(self, snapshot, device_ids, step):
+        for device_id in device_ids:
+            snapshot.counts[device_id] = snapshot.counts.get(device_id, 0) + step
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Nothing to serve yet, so the first request waits for the build
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build()
+                return self._snapshot
+
+        max_age = getattr(settings, 'SEARCH_SETTINGS', {}).get('SUGGESTION_INDEX_MAX_AGE', 60)
+        if snapshot.stale or time.monotonic() - snapshot.built_at >= max_age:
+            self._rebuild_in_background()
+        return snapshot
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._replay is not None:
+                return
+            self._replay = []
+        threading.Thread(target=self._rebuild, name='suggestion-index', daemon=True).start()
+
+    def _rebuild(self):
+        snapshot = None
+        try:
+            snapshot = self._build()
+        except Exception as e:
+            print(f"Error rebuilding search suggestion index: {e}")
+        finally:
+            with self._lock:
+                if snapshot is not None:
+                    for change, args in self._replay:
+                        change(snapshot, *args)
+                    self._snapshot = snapshot
+                self._replay = None
+            # The rebuild ran on this thread's own connection
+            connection.close()
+
+    def _build(self):
+        from .models import Device, NetworkConfig
+
+        started = time.perf_counter()
+        display = dict(Device.DEVICE_TYPE_CHOICES)
+        devices = {}
+        ip_keys = {}
+        keys = {field: [] for field in SUGGESTION_FIELDS}
+
+        rows = Device.objects.order_by('id').values_list(
+            'id', 'ip_address', 'hostname', 'device_type', 'status', 'description', 'ip_key'
+        )
+        for device_id, ip_address, hostname, device_type, status, description, ip_key in rows.iterator(chunk_size=5000):
+            entry = _device_entry(ip_address, hostname, display.get(device_type, device_type), status, description)
+            devices[device_id] = entry
+            ip_keys[device_id] = ip_key
+            for field, key in _device_keys(entry):
+                keys[field].append((key, device_id))
+
+        counts = dict(
+            NetworkConfig.objects.order_by().values_list('device_id').annotate(count=Count('id'))
+        )
+        snapshot = _Snapshot(devices, counts, keys, ip_keys)
+        print(f"Built search suggestion index of {len(devices)} devices in {time.perf_counter() - started:.2f}s")
+        return snapshot
+
+
+suggestion_index = SuggestionIndex()
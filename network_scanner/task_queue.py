@@ -0,0 +1,220 @@
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import BackupTask
+
+
+class BackupTaskQueue:
+    """Database-backed queue of post-backup jobs, drained by background workers
+
+    Workers claim a task with a conditional UPDATE, so any number of threads
+    and processes can share the table. Only one task per backup config runs at
+    a time, which keeps a retention cleanup from racing a push of the same
+    config. Failed tasks are retried with exponential backoff until they run
+    out of attempts. A running task renews its lease from a heartbeat thread;
+    one left 'running' by a crashed worker is picked up again once its lease
+    expires, and a worker that lost its task that way has its result discarded.
+    """
+
+    def __init__(self):
+        backup_settings = getattr(settings, 'BACKUP_SETTINGS', {})
+        self.max_attempts = backup_settings.get('TASK_MAX_ATTEMPTS', 8)
+        self.retry_base = backup_settings.get('TASK_RETRY_BASE', 30)
+        self.retry_max = backup_settings.get('TASK_RETRY_MAX', 3600)
+        self.lease_seconds = backup_settings.get('TASK_LEASE_SECONDS', 3600)
+        self.history_days = backup_settings.get('TASK_HISTORY_DAYS', 7)
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def enqueue(self, kind, config, backup=None):
+        """Queue a task to run as soon as a worker is free"""
+        if kind == 'cleanup':
+            # One pending cleanup covers every backup taken before it runs
+            pending = BackupTask.objects.filter(config=config, kind='cleanup', status='pending').first()
+            if pending:
+                return pending
+        return BackupTask.objects.create(
+            config=config,
+            backup=backup,
+            kind=kind,
+            max_attempts=self.max_attempts,
+        )
+
+    def claim(self, worker):
+        """Take the next runnable task for worker, or return None"""
+        now = timezone.now()
+        lease_start = now - timedelta(seconds=self.lease_seconds)
+        busy_configs = BackupTask.objects.filter(
+            status='running', started_at__gte=lease_start
+        ).values('config_id')
+
+        candidates = list(
+            BackupTask.objects
+            .filter(Q(status='pending', run_after__lte=now) | Q(status='running', started_at__lt=lease_start))
+            .exclude(config_id__in=busy_configs)
+            .order_by('run_after', 'id')
+            .values_list('id', 'status', 'attempts')[:10]
+        )
+        for task_id, status, attempts in candidates:
+            # Matching status and attempts again means nobody else claimed it in between
+            claimed = (
+                BackupTask.objects
+                .filter(id=task_id, status=status, attempts=attempts)
+                .exclude(config_id__in=busy_configs)
+                .update(status='running', started_at=now, worker=worker, attempts=attempts + 1)
+            )
+            if claimed:
+                return BackupTask.objects.select_related('config', 'backup').get(id=task_id)
+        return None
+
+    def run_task(self, task):
+        """Run one claimed task, recording its result or scheduling a retry"""
+        from .backup_service import backup_service
+
+        started = time.perf_counter()
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(task, stop_heartbeat), name=f'backup-task-heartbeat-{task.id}', daemon=True
+        )
+        heartbeat.start()
+        try:
+            if task.kind == 'push':
+                if not task.config.push_target:
+                    result = {'skipped': 'no push target'}
+                else:
+                    result = backup_service.push_backup(task.backup)
+            elif task.kind == 'cleanup':
+                result = backup_service._cleanup_old_backups(task.config)
+            else:
+                raise ValueError(f"Unknown task kind: {task.kind}")
+        except Exception as e:
+            self._retry_or_fail(task, e)
+            return False
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+        completed = BackupTask.objects.filter(id=task.id, worker=task.worker, status='running').update(
+            status='completed',
+            completed_at=timezone.now(),
+            result=result,
+            last_error='',
+        )
+        if not completed:
+            print(f"Task {task.id} ({task.kind} for {task.config.name}) finished after another worker "
+                  f"took it over; result discarded")
+            return False
+        print(f"Task {task.id} ({task.kind} for {task.config.name}) completed in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def _heartbeat(self, task, stop_event):
+        """Renew a running task's lease every third of TASK_LEASE_SECONDS until stop_event is set"""
+        try:
+            while not stop_event.wait(self.lease_seconds / 3):
+                renewed = BackupTask.objects.filter(id=task.id, worker=task.worker, status='running').update(
+                    started_at=timezone.now()
+                )
+                if not renewed:
+                    print(f"Task {task.id} ({task.kind} for {task.config.name}) lost its lease")
+                    return
+        finally:
+            connection.close()
+
+    def _retry_or_fail(self, task, error):
+        if task.attempts >= task.max_attempts:
+            BackupTask.objects.filter(id=task.id, worker=task.worker, status='running').update(
+                status='failed', completed_at=timezone.now(), last_error=str(error)
+            )
+            print(f"Task {task.id} ({task.kind} for {task.config.name}) failed after {task.attempts} attempts: {error}")
+            return
+
+        # Jitter keeps pushes that failed together from retrying in lockstep
+        delay = min(self.retry_max, self.retry_base * 2 ** (task.attempts - 1)) * random.uniform(0.8, 1.2)
+        BackupTask.objects.filter(id=task.id, worker=task.worker, status='running').update(
+            status='pending',
+            run_after=timezone.now() + timedelta(seconds=delay),
+            worker='',
+            last_error=str(error),
+        )
+        print(f"Task {task.id} ({task.kind} for {task.config.name}) attempt {task.attempts} failed, "
+              f"retrying in {delay:.0f}s: {error}")
+
+    def run_workers(self, workers=1, drain=False, poll_interval=5, stop_event=None):
+        """Process tasks on worker threads until stop_event is set
+
+        With drain, workers return as soon as nothing is runnable instead of
+        polling; tasks waiting on a retry delay stay queued. Returns how many
+        tasks completed and how many failed an attempt.
+        """
+        stop_event = stop_event or threading.Event()
+        counts = {'completed': 0, 'failed': 0}
+        counts_lock = threading.Lock()
+        self.purge_finished()
+
+        def work(number):
+            worker = f"{self.worker_prefix}:{threading.get_ident()}:{number}"
+            try:
+                while not stop_event.is_set():
+                    task = self.claim(worker)
+                    if task is None:
+                        if drain:
+                            break
+                        stop_event.wait(poll_interval)
+                        continue
+                    outcome = 'completed' if self.run_task(task) else 'failed'
+                    with counts_lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work, args=(number,), name=f'backup-task-{number}', daemon=True)
+            for number in range(max(1, workers))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts
+
+    def retry_failed(self, config=None):
+        """Put failed tasks back in the queue with a fresh set of attempts"""
+        tasks = BackupTask.objects.filter(status='failed')
+        if config is not None:
+            tasks = tasks.filter(config=config)
+        return tasks.update(status='pending', attempts=0, run_after=timezone.now(), completed_at=None, worker='')
+
+    def purge_finished(self):
+        """Drop completed tasks older than TASK_HISTORY_DAYS; failed ones stay for inspection"""
+        cutoff = timezone.now() - timedelta(days=self.history_days)
+        deleted, _ = BackupTask.objects.filter(status='completed', completed_at__lt=cutoff).delete()
+        return deleted
+
+    def stats(self):
+        """Queue depth and lag, in one aggregate query"""
+        now = timezone.now()
+        ready = Q(status='pending', run_after__lte=now)
+        stats = BackupTask.objects.exclude(status='completed').aggregate(
+            pending=Count('id', filter=Q(status='pending')),
+            ready=Count('id', filter=ready),
+            running=Count('id', filter=Q(status='running')),
+            failed=Count('id', filter=Q(status='failed')),
+            oldest_ready=Min('run_after', filter=ready),
+        )
+        oldest_ready = stats.pop('oldest_ready')
+        stats['depth'] = stats['pending'] + stats['running']
+        # How long the oldest runnable task has been waiting for a worker
+        stats['lag_seconds'] = (now - oldest_ready).total_seconds() if oldest_ready else 0.0
+        return stats
+
+
+# Global task queue instance
+task_queue = BackupTaskQueue()
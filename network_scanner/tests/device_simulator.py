@@ -0,0 +1,75 @@
+import asyncio
+import random
+import zlib
+
+
+class SimulatedSession:
+    """Answers driver commands with a generated config, after a simulated delay"""
+
+    def __init__(self, simulator, device):
+        self._simulator = simulator
+        self._device = device
+
+    async def run(self, command):
+        await asyncio.sleep(self._simulator.delay())
+        if self._simulator.roll(self._device, 'hang'):
+            # Longer than any sensible read timeout
+            await asyncio.sleep(3600)
+        return 0, self._simulator.render(self._device, command)
+
+    async def close(self):
+        self._simulator.open_sessions -= 1
+        self._simulator.open_by_type[self._device['device_type']] -= 1
+
+
+class DeviceSimulator:
+    """Stand-in for SSHConnector that fakes devices without touching the network
+
+    Devices are picked to fail or hang deterministically from their IP address
+    and the configured rates, so a run can be repeated. peak_sessions and
+    peak_by_type show how many devices were being talked to at once.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.5, failure_rate=0.0, hang_rate=0.0, config_lines=200, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.config_lines = config_lines
+        self.seed = seed
+        self.open_sessions = 0
+        self.peak_sessions = 0
+        self.open_by_type = {}
+        self.peak_by_type = {}
+        self._random = random.Random(seed)
+
+    def delay(self):
+        return self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+
+    def roll(self, device, event):
+        rate = self.failure_rate if event == 'fail' else self.hang_rate
+        if not rate:
+            return False
+        key = zlib.crc32(f"{self.seed}:{event}:{device['ip_address']}".encode('utf-8'))
+        return key / 0xFFFFFFFF < rate
+
+    def render(self, device, command):
+        lines = [
+            f"! {command} on {device['hostname'] or device['ip_address']} ({device['device_type']})",
+            f"hostname {device['hostname'] or 'device-' + device['ip_address'].replace('.', '-')}",
+        ]
+        for number in range(self.config_lines):
+            lines.append(f"interface Ethernet{number // 48}/{number % 48}")
+            lines.append(f" description simulated port {number}")
+        return '\n'.join(lines) + '\n'
+
+    async def connect(self, device):
+        await asyncio.sleep(self.delay())
+        if self.roll(device, 'fail'):
+            raise ConnectionRefusedError(f"Simulated connection refused by {device['ip_address']}")
+        device_type = device['device_type']
+        self.open_sessions += 1
+        self.peak_sessions = max(self.peak_sessions, self.open_sessions)
+        self.open_by_type[device_type] = self.open_by_type.get(device_type, 0) + 1
+        self.peak_by_type[device_type] = max(self.peak_by_type.get(device_type, 0), self.open_by_type[device_type])
+        return SimulatedSession(self, device)
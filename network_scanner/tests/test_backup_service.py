@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from network_scanner.backup_service import BackupService
+from network_scanner.models import BackupConfig, BackupHistory, StoredChunk
+
+
+class BackupServiceTestCase(TransactionTestCase):
+    """Runs a BackupService whose backups, chunk store and media live in a temp directory"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        overrides = override_settings(
+            BASE_DIR=self.tmp,
+            MEDIA_ROOT=self.tmp / 'media',
+            BACKUP_SETTINGS=dict(settings.BACKUP_SETTINGS, CHUNK_STORE_PATH=self.tmp / 'store'),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        quiet = mock.patch('builtins.print')
+        quiet.start()
+        self.addCleanup(quiet.stop)
+        self.service = BackupService()
+
+    def make_config(self, **fields):
+        fields.setdefault('backup_type', 'full')
+        fields.setdefault('include_logs', False)
+        return BackupConfig.objects.create(name=fields.pop('name', 'nightly'), **fields)
+
+
+class RestoreClaimTests(BackupServiceTestCase):
+    def test_restored_dump_keeps_finished_outcomes(self):
+        config = self.make_config()
+        first = self.service.run_backup(config)
+        self.service.run_backup(config)
+
+        # first's dump was taken while first itself was running
+        self.service.restore_backup(first)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'completed')
+        self.assertFalse(BackupHistory.objects.filter(status='running').exists())
+        self.assertEqual(self.service.run_backup(config).status, 'completed')
+
+    def test_restored_running_rows_without_an_outcome_fail(self):
+        config = self.make_config(database_format='json')
+        backup = self.service.run_backup(config)
+        BackupHistory.objects.filter(id=backup.id).delete()
+
+        self.service.restore_backup_file(backup.file_path)
+
+        restored = BackupHistory.objects.get(id=backup.id)
+        self.assertEqual(restored.status, 'failed')
+        self.assertEqual(restored.error_message, 'Interrupted by a database restore')
+        self.assertEqual(self.service.run_backup(config).status, 'completed')
+
+
+class RestoreChunkRefcountTests(BackupServiceTestCase):
+    def test_restore_recounts_chunks_shared_with_newer_backups(self):
+        config = self.make_config(deduplicate=True)
+        self.service.run_backup(config)
+        second = self.service.run_backup(config)
+        third = self.service.run_backup(config)
+
+        # second's dump holds refcounts from before third referenced the same chunks
+        self.service.restore_backup(second)
+        # Retention dropping the newer backup must leave the restored one intact
+        self.service.chunk_store.release_manifest(third.file_path)
+
+        with self.service._open_backup(second.file_path) as archive:
+            for name in archive.namelist():
+                archive.read(name)
+
+
+class JsonRestoreTests(BackupServiceTestCase):
+    def test_restore_overwrites_rows_and_keeps_dumped_timestamps(self):
+        config = self.make_config(database_format='json', compression_level=3)
+        created_at = (timezone.now() - timedelta(days=30)).replace(microsecond=0)
+        BackupConfig.objects.filter(id=config.id).update(created_at=created_at)
+        backup = self.service.run_backup(config)
+        BackupConfig.objects.filter(id=config.id).update(compression_level=9, created_at=timezone.now())
+
+        self.service.restore_backup_file(backup.file_path)
+
+        restored = BackupConfig.objects.get(id=config.id)
+        self.assertEqual((restored.compression_level, restored.created_at), (3, created_at))
+
+
+class FailedBackupCleanupTests(BackupServiceTestCase):
+    def fail_after_publishing(self, config):
+        with mock.patch.object(BackupHistory, 'mark_completed', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                self.service.run_backup(config)
+
+    def test_published_archive_is_removed(self):
+        config = self.make_config()
+
+        self.fail_after_publishing(config)
+
+        self.assertEqual(list(self.service.base_backup_dir.iterdir()), [])
+        self.assertEqual(BackupHistory.objects.get().status, 'failed')
+
+    def test_published_manifest_gives_back_its_chunks(self):
+        config = self.make_config(deduplicate=True)
+        kept = self.service.run_backup(config)
+        refcounts = dict(StoredChunk.objects.values_list('digest', 'refcount'))
+
+        self.fail_after_publishing(config)
+
+        self.assertEqual([path.name for path in self.service.base_backup_dir.iterdir()], [Path(kept.file_path).name])
+        self.assertEqual(dict(StoredChunk.objects.values_list('digest', 'refcount')), refcounts)
@@ -0,0 +1,143 @@
+import time
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from network_scanner.config_collector import ConfigCollector
+from network_scanner.tests.device_simulator import DeviceSimulator
+from network_scanner.models import Device, NetworkConfig
+
+
+def make_devices(device_type, count, first_octet=10, status='offline'):
+    return Device.objects.bulk_create([
+        Device(
+            ip_address=f'{first_octet}.0.{number // 250}.{number % 250 + 1}',
+            hostname=f'{device_type}-{number}',
+            device_type=device_type,
+            status=status,
+        )
+        for number in range(count)
+    ])
+
+
+def make_collector(simulator, **options):
+    options.setdefault('concurrency', 50)
+    options.setdefault('connect_timeout', 5)
+    options.setdefault('read_timeout', 5)
+    options.setdefault('batch_size', 500)
+    return ConfigCollector(connector=simulator, **options)
+
+
+class ConfigCollectorTests(TransactionTestCase):
+    """ConfigCollector driven against DeviceSimulator instead of real SSH sessions"""
+
+    def collect(self, collector, devices=None):
+        with mock.patch('builtins.print'):
+            return collector.collect(devices)
+
+    def test_collects_every_device_in_batches(self):
+        make_devices('switch', 15)
+        make_devices('router', 10, first_octet=11)
+        collector = make_collector(DeviceSimulator(latency=0.01, config_lines=5), batch_size=10)
+        batch_sizes = []
+        save_batch = collector._save_batch
+
+        def record_batch(batch, stats):
+            batch_sizes.append(len(batch))
+            return save_batch(batch, stats)
+
+        with mock.patch.object(collector, '_save_batch', side_effect=record_batch):
+            stats = self.collect(collector)
+
+        self.assertEqual((stats['devices'], stats['succeeded'], stats['failed']), (25, 25, 0))
+        self.assertEqual(stats['configs'], 25)
+        self.assertEqual(sum(batch_sizes), 25)
+        self.assertGreater(len(batch_sizes), 1)
+        self.assertLessEqual(max(batch_sizes), 10)
+        self.assertEqual(NetworkConfig.objects.filter(config_type='running').count(), 25)
+        self.assertFalse(Device.objects.exclude(status='online').exists())
+        self.assertFalse(Device.objects.filter(last_scanned_at=None).exists())
+
+    def test_unchanged_configs_are_not_stored_again(self):
+        make_devices('switch', 5)
+        simulator = DeviceSimulator(latency=0.01, config_lines=5)
+        self.collect(make_collector(simulator))
+
+        stats = self.collect(make_collector(simulator))
+
+        self.assertEqual((stats['configs'], stats['unchanged']), (0, 5))
+        self.assertEqual(NetworkConfig.objects.count(), 5)
+
+    def test_concurrency_caps_per_type_and_overall(self):
+        make_devices('firewall', 20)
+        make_devices('switch', 20, first_octet=11)
+        make_devices('infoblox', 20, first_octet=12)
+        simulator = DeviceSimulator(latency=0.02, jitter=0, config_lines=5)
+        collector = make_collector(simulator, concurrency=8, type_concurrency={'firewall': 3, 'infoblox': 2})
+
+        stats = self.collect(collector)
+
+        self.assertEqual(stats['succeeded'], 60)
+        self.assertEqual(simulator.peak_by_type['firewall'], 3)
+        self.assertEqual(simulator.peak_by_type['infoblox'], 2)
+        self.assertLessEqual(simulator.peak_by_type['switch'], 8)
+        self.assertLessEqual(simulator.peak_sessions, 8)
+        self.assertEqual(simulator.open_sessions, 0)
+
+    def test_failing_devices_are_marked_offline(self):
+        devices = make_devices('router', 40, status='online')
+        simulator = DeviceSimulator(latency=0.01, failure_rate=0.3, config_lines=5, seed=7)
+        refusing = {
+            device.ip_address for device in devices
+            if simulator.roll({'ip_address': device.ip_address}, 'fail')
+        }
+        self.assertTrue(0 < len(refusing) < 40)
+
+        stats = self.collect(make_collector(simulator))
+
+        self.assertEqual(stats['failed'], len(refusing))
+        self.assertEqual(stats['succeeded'], 40 - len(refusing))
+        self.assertEqual(set(stats['errors']), refusing)
+        self.assertTrue(all('refused' in error for error in stats['errors'].values()))
+        self.assertEqual(set(Device.objects.filter(status='offline').values_list('ip_address', flat=True)), refusing)
+        self.assertEqual(NetworkConfig.objects.count(), 40 - len(refusing))
+
+    def test_hanging_commands_time_out_without_holding_up_the_rest(self):
+        devices = make_devices('switch', 20, status='unknown')
+        simulator = DeviceSimulator(latency=0.01, hang_rate=0.25, config_lines=5, seed=3)
+        hanging = {
+            device.ip_address for device in devices
+            if simulator.roll({'ip_address': device.ip_address}, 'hang')
+        }
+        self.assertTrue(hanging)
+
+        started = time.monotonic()
+        stats = self.collect(make_collector(simulator, read_timeout=0.2))
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(stats['failed'], len(hanging))
+        self.assertEqual(stats['errors'], {ip_address: 'command timed out' for ip_address in hanging})
+        # A command timing out says nothing about whether the device is up
+        self.assertEqual(set(Device.objects.filter(status='unknown').values_list('ip_address', flat=True)), hanging)
+        self.assertEqual(simulator.open_sessions, 0)
+
+    def test_slow_connections_time_out(self):
+        make_devices('f5', 4, status='online')
+        simulator = DeviceSimulator(latency=1, jitter=0)
+
+        started = time.monotonic()
+        stats = self.collect(make_collector(simulator, connect_timeout=0.1))
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(stats['failed'], 4)
+        self.assertTrue(all(error == 'connect timed out after 0.1s' for error in stats['errors'].values()))
+        self.assertFalse(Device.objects.exclude(status='offline').exists())
+
+    def test_devices_without_a_driver_are_skipped(self):
+        make_devices('other', 3)
+        make_devices('router', 2, first_octet=11)
+
+        stats = self.collect(make_collector(DeviceSimulator(latency=0.01, config_lines=5)))
+
+        self.assertEqual((stats['skipped'], stats['succeeded']), (3, 2))
+        self.assertEqual(Device.objects.filter(device_type='other', status='offline').count(), 3)
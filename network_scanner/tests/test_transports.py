@@ -0,0 +1,317 @@
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from network_scanner.transports import LocalTransport, S3Transport, SFTPTransport, get_transport
+
+
+MB = 1024 * 1024
+
+
+class ChunkFailure(Exception):
+    pass
+
+
+def fail_chunk(transport, failing_index):
+    """Patch transport so that uploading chunk failing_index raises"""
+    send_chunk = transport.send_chunk
+
+    def send(upload, index, offset, data):
+        if index == failing_index:
+            raise ChunkFailure(f"chunk {index}")
+        return send_chunk(upload, index, offset, data)
+
+    return mock.patch.object(transport, 'send_chunk', side_effect=send)
+
+
+class FakeSFTPFile:
+    def __init__(self, path, mode):
+        self._file = open(path, {'w': 'wb', 'r+': 'r+b'}[mode])
+
+    def set_pipelined(self, pipelined):
+        pass
+
+    def seek(self, offset):
+        self._file.seek(offset)
+
+    def write(self, data):
+        self._file.write(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+
+class FakeSFTP:
+    """paramiko SFTPClient stand-in working on a local directory"""
+
+    def __init__(self, root):
+        self.root = root
+        self.closed = False
+
+    def _local(self, path):
+        return self.root / path.lstrip('/')
+
+    def stat(self, path):
+        return os.stat(self._local(path))
+
+    def mkdir(self, path):
+        os.mkdir(self._local(path))
+
+    def open(self, path, mode):
+        return FakeSFTPFile(self._local(path), mode)
+
+    def posix_rename(self, source, target):
+        os.replace(self._local(source), self._local(target))
+
+    def rename(self, source, target):
+        os.rename(self._local(source), self._local(target))
+
+    def remove(self, path):
+        os.remove(self._local(path))
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSSHClient:
+    def __init__(self, root):
+        self.root = root
+        self.channels = []
+        self.closed = False
+
+    def open_sftp(self):
+        channel = FakeSFTP(self.root)
+        self.channels.append(channel)
+        return channel
+
+    def close(self):
+        self.closed = True
+
+
+class NoSuchUpload(Exception):
+    pass
+
+
+class FakeS3:
+    """boto3 S3 client stand-in keeping objects and multipart uploads in a local directory"""
+
+    class exceptions:
+        NoSuchUpload = NoSuchUpload
+
+    def __init__(self, root):
+        self.root = root
+        self.uploads = {}
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = (Bucket, Key)
+        (self.root / 'parts' / upload_id).mkdir(parents=True)
+        return {'UploadId': upload_id}
+
+    def list_parts(self, Bucket, Key, UploadId):
+        if self.uploads.get(UploadId) != (Bucket, Key):
+            raise NoSuchUpload(UploadId)
+        return {'Parts': sorted(int(path.name) for path in (self.root / 'parts' / UploadId).iterdir())}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.list_parts(Bucket, Key, UploadId)
+        (self.root / 'parts' / UploadId / str(PartNumber)).write_bytes(Body)
+        return {'ETag': f'"{PartNumber}-{len(Body)}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.list_parts(Bucket, Key, UploadId)
+        parts = MultipartUpload['Parts']
+        if [part['PartNumber'] for part in parts] != list(range(1, len(parts) + 1)):
+            raise ValueError("Parts must be consecutive from 1")
+        target = self.root / Bucket / Key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, 'wb') as f:
+            for part in parts:
+                data = (self.root / 'parts' / UploadId / str(part['PartNumber'])).read_bytes()
+                if part['ETag'] != f'"{part["PartNumber"]}-{len(data)}"':
+                    raise ValueError(f"ETag mismatch for part {part['PartNumber']}")
+                f.write(data)
+        del self.uploads[UploadId]
+
+
+class TransportTestCase(SimpleTestCase):
+    file_size = 5 * MB + 12345
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.source = self.tmp / 'backup.zip'
+        self.source.write_bytes(os.urandom(self.file_size))
+        self.state_dir = self.tmp / 'state'
+        self.remote = self.tmp / 'remote'
+        self.remote.mkdir()
+
+    def assertResumedAfter(self, result, sent_before_failure):
+        # Chunks already handed to a worker when one fails still finish
+        self.assertGreaterEqual(result['resumed_bytes'], sent_before_failure)
+        self.assertLess(result['resumed_bytes'], self.file_size)
+
+    def assertStateCleared(self):
+        self.assertEqual(list(self.state_dir.glob('*.json')), [])
+
+
+class LocalTransportTests(TransportTestCase):
+    def transport(self):
+        return LocalTransport(str(self.remote), {'chunk_size_mb': 1, 'max_workers': 4}, self.state_dir)
+
+    def test_push_copies_file(self):
+        result = self.transport().push(self.source, 'nested/backup.zip')
+
+        self.assertEqual((self.remote / 'nested' / 'backup.zip').read_bytes(), self.source.read_bytes())
+        self.assertFalse((self.remote / 'nested' / 'backup.zip.part').exists())
+        self.assertEqual(result['chunks'], 6)
+        self.assertEqual(result['resumed_bytes'], 0)
+        self.assertStateCleared()
+
+    def test_failed_chunk_closes_file_and_push_resumes(self):
+        transport = LocalTransport(str(self.remote), {'chunk_size_mb': 1, 'max_workers': 1}, self.state_dir)
+        opened = []
+        begin = transport.begin
+
+        def record_begin(*args):
+            upload = begin(*args)
+            opened.append(upload['file'])
+            return upload
+
+        with mock.patch.object(transport, 'begin', side_effect=record_begin), fail_chunk(transport, 3):
+            with self.assertRaises(ChunkFailure):
+                transport.push(self.source, 'backup.zip')
+        self.assertTrue(opened[0].closed)
+        self.assertTrue((self.remote / 'backup.zip.part').exists())
+
+        result = self.transport().push(self.source, 'backup.zip')
+        self.assertResumedAfter(result, 3 * MB)
+        self.assertEqual((self.remote / 'backup.zip').read_bytes(), self.source.read_bytes())
+        self.assertStateCleared()
+
+    def test_bare_paths_are_local(self):
+        self.assertIsInstance(get_transport(str(self.remote)), LocalTransport)
+        self.assertIsInstance(get_transport('C:/backups'), LocalTransport)
+
+
+class SFTPTransportTests(TransportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clients = []
+
+    def connect(self):
+        client = FakeSSHClient(self.remote)
+        self.clients.append(client)
+        return client
+
+    def transport(self, max_workers=4):
+        transport = get_transport(
+            'sftp://backup@nas.example/srv/backups', {'chunk_size_mb': 1, 'max_workers': max_workers}, self.state_dir
+        )
+        self.assertIsInstance(transport, SFTPTransport)
+        return transport
+
+    def assertClosed(self, client):
+        self.assertTrue(client.closed)
+        self.assertTrue(all(channel.closed for channel in client.channels))
+
+    def test_push_uploads_file(self):
+        transport = self.transport()
+        with mock.patch.object(transport, '_connect', side_effect=self.connect):
+            result = transport.push(self.source, 'backup.zip')
+
+        target = self.remote / 'srv' / 'backups' / 'backup.zip'
+        self.assertEqual(target.read_bytes(), self.source.read_bytes())
+        self.assertFalse(target.with_name('backup.zip.part').exists())
+        self.assertEqual(result['target'], 'sftp://backup@nas.example/srv/backups/backup.zip')
+        self.assertClosed(self.clients[0])
+        self.assertStateCleared()
+
+    def test_failed_chunk_closes_connection_and_push_resumes(self):
+        transport = self.transport(max_workers=1)
+        with mock.patch.object(transport, '_connect', side_effect=self.connect), fail_chunk(transport, 2):
+            with self.assertRaises(ChunkFailure):
+                transport.push(self.source, 'backup.zip')
+        self.assertClosed(self.clients[0])
+
+        transport = self.transport()
+        with mock.patch.object(transport, '_connect', side_effect=self.connect):
+            result = transport.push(self.source, 'backup.zip')
+        self.assertResumedAfter(result, 2 * MB)
+        self.assertEqual((self.remote / 'srv' / 'backups' / 'backup.zip').read_bytes(), self.source.read_bytes())
+        self.assertClosed(self.clients[1])
+
+    def test_missing_part_file_restarts_upload(self):
+        transport = self.transport(max_workers=1)
+        with mock.patch.object(transport, '_connect', side_effect=self.connect), fail_chunk(transport, 2):
+            with self.assertRaises(ChunkFailure):
+                transport.push(self.source, 'backup.zip')
+        (self.remote / 'srv' / 'backups' / 'backup.zip.part').unlink()
+
+        transport = self.transport()
+        with mock.patch.object(transport, '_connect', side_effect=self.connect):
+            result = transport.push(self.source, 'backup.zip')
+        self.assertEqual(result['resumed_bytes'], 0)
+        self.assertEqual((self.remote / 'srv' / 'backups' / 'backup.zip').read_bytes(), self.source.read_bytes())
+
+
+class S3TransportTests(TransportTestCase):
+    file_size = 11 * MB + 4321
+
+    def setUp(self):
+        super().setUp()
+        self.s3 = FakeS3(self.remote)
+
+    def transport(self, max_workers=4):
+        transport = get_transport('s3://bucket/nightly/', {'max_workers': max_workers}, self.state_dir)
+        self.assertIsInstance(transport, S3Transport)
+        return transport
+
+    def push(self, transport, remote_name='backup.zip'):
+        with mock.patch.object(transport, '_client', return_value=self.s3):
+            return transport.push(self.source, remote_name)
+
+    def test_parts_are_at_least_the_s3_minimum(self):
+        transport = get_transport('s3://bucket', {'chunk_size_mb': 1}, self.state_dir)
+        self.assertEqual(transport.chunk_size, 5 * MB)
+
+    def test_push_uploads_multipart(self):
+        result = self.push(self.transport())
+
+        self.assertEqual((self.remote / 'bucket' / 'nightly' / 'backup.zip').read_bytes(), self.source.read_bytes())
+        self.assertEqual(result['chunks'], 2)
+        self.assertEqual(result['target'], 's3://bucket/nightly/backup.zip')
+        self.assertEqual(self.s3.uploads, {})
+        self.assertStateCleared()
+
+    def test_failed_part_resumes_same_upload(self):
+        transport = self.transport(max_workers=1)
+        with fail_chunk(transport, 1), self.assertRaises(ChunkFailure):
+            self.push(transport)
+        upload_ids = list(self.s3.uploads)
+
+        transport = self.transport()
+        result = self.push(transport)
+        self.assertEqual(len(upload_ids), 1)
+        self.assertEqual(result['resumed_bytes'], transport.chunk_size)
+        self.assertEqual((self.remote / 'bucket' / 'nightly' / 'backup.zip').read_bytes(), self.source.read_bytes())
+        self.assertEqual(self.s3.uploads, {})
+
+    def test_expired_upload_starts_over(self):
+        transport = self.transport(max_workers=1)
+        with fail_chunk(transport, 1), self.assertRaises(ChunkFailure):
+            self.push(transport)
+        # The server aborted the upload in the meantime
+        self.s3.uploads.clear()
+
+        result = self.push(self.transport())
+        self.assertEqual(result['resumed_bytes'], 0)
+        self.assertEqual((self.remote / 'bucket' / 'nightly' / 'backup.zip').read_bytes(), self.source.read_bytes())
@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# S3 rejects multipart parts under 5 MB (other than the last one)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MAX_PARTS = 10000
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every upload worker of one push"""
+
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def throttle(self, nbytes):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + nbytes / self.rate
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Transport:
+    """Uploads a file in fixed-size chunks on a thread pool, resuming where a previous push stopped
+
+    Subclasses provide begin/send_chunk/complete, and close to release what
+    begin opened whether or not the upload finished. Progress is kept in a small
+    JSON state file, keyed by target, remote name and file identity, which is
+    removed once the upload completes.
+    """
+
+    scheme = None
+
+    def __init__(self, location, options=None, state_dir=None):
+        options = options or {}
+        self.location = location
+        self.options = options
+        self.chunk_size = int(options.get('chunk_size_mb', DEFAULT_CHUNK_SIZE / (1024 * 1024)) * 1024 * 1024)
+        self.max_workers = max(1, int(options.get('max_workers', 4)))
+        limit = options.get('bandwidth_limit_mbps')
+        self.limiter = BandwidthLimiter(float(limit) * 1024 * 1024 / 8 if limit else 0)
+        self.state_dir = Path(state_dir) if state_dir else None
+
+    def push(self, path, remote_name):
+        """Upload path as remote_name, returning what was sent"""
+        path = Path(path)
+        stat = path.stat()
+        chunk_count = max(1, -(-stat.st_size // self.chunk_size))
+        state_path = self._state_path(remote_name, stat)
+        state = self._load_state(state_path)
+        started = time.perf_counter()
+
+        upload = self.begin(remote_name, stat.st_size, state)
+        try:
+            done = state.setdefault('chunks', {})
+            pending = [index for index in range(chunk_count) if str(index) not in done]
+            resumed_bytes = (chunk_count - len(pending)) * self.chunk_size if done else 0
+            state_lock = threading.Lock()
+
+            def send(index):
+                offset = index * self.chunk_size
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read(self.chunk_size)
+                self.limiter.throttle(len(data))
+                receipt = self.send_chunk(upload, index, offset, data)
+                with state_lock:
+                    done[str(index)] = receipt if receipt is not None else True
+                    self._save_state(state_path, state)
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending) or 1), thread_name_prefix='push') as executor:
+                # list() re-raises the first failed chunk; finished chunks stay recorded
+                list(executor.map(send, pending))
+
+            self.complete(upload, remote_name, {int(index): receipt for index, receipt in done.items()})
+        finally:
+            self.close(upload)
+
+        if state_path and state_path.exists():
+            state_path.unlink()
+
+        return {
+            'target': self.describe(remote_name),
+            'bytes': stat.st_size,
+            'resumed_bytes': min(resumed_bytes, stat.st_size),
+            'chunks': chunk_count,
+            'seconds': time.perf_counter() - started,
+        }
+
+    def begin(self, remote_name, size, state):
+        """Prepare the remote side, reusing anything recorded in state; returns an upload handle"""
+        raise NotImplementedError
+
+    def send_chunk(self, upload, index, offset, data):
+        """Upload one chunk; the return value is kept in the resume state"""
+        raise NotImplementedError
+
+    def complete(self, upload, remote_name, receipts):
+        raise NotImplementedError
+
+    def close(self, upload):
+        """Release whatever begin opened; runs after complete, or after a failed chunk"""
+
+    def describe(self, remote_name):
+        return f"{self.location.rstrip('/')}/{remote_name}"
+
+    def _state_path(self, remote_name, stat):
+        if self.state_dir is None:
+            return None
+        key = f"{self.scheme}|{self.location}|{remote_name}|{stat.st_size}|{stat.st_mtime_ns}|{self.chunk_size}"
+        return self.state_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.json"
+
+    def _load_state(self, state_path):
+        if state_path and state_path.exists():
+            with open(state_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self, state_path, state):
+        if state_path is None:
+            return
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = state_path.with_name(state_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+
+class LocalTransport(Transport):
+    """Copies into a local or NFS-mounted directory, writing chunks in place
+
+    Workers share one handle and take turns to seek and write, which works on
+    Windows too (os.pwrite doesn't exist there); reading the source and
+    throttling still overlap.
+    """
+
+    scheme = 'file'
+
+    def begin(self, remote_name, size, state):
+        target = Path(self.location) / remote_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        part_path = target.with_name(target.name + '.part')
+
+        if not part_path.exists():
+            state.pop('chunks', None)
+            part_path.touch()
+        f = open(part_path, 'r+b')
+        try:
+            f.truncate(size)
+        except OSError:
+            f.close()
+            raise
+        return {'file': f, 'lock': threading.Lock(), 'part_path': part_path, 'target': target}
+
+    def send_chunk(self, upload, index, offset, data):
+        with upload['lock']:
+            f = upload['file']
+            f.seek(offset)
+            f.write(data)
+        return None
+
+    def complete(self, upload, remote_name, receipts):
+        f = upload['file']
+        f.flush()
+        os.fsync(f.fileno())
+        # Windows won't replace a file that is still open
+        f.close()
+        os.replace(upload['part_path'], upload['target'])
+
+    def close(self, upload):
+        upload['file'].close()
+
+
+class SFTPTransport(Transport):
+    """Uploads over SFTP, one channel per worker writing its chunks at their offsets"""
+
+    scheme = 'sftp'
+
+    def __init__(self, location, options=None, state_dir=None):
+        super().__init__(location, options, state_dir)
+        parsed = urlparse(location)
+        self.host = parsed.hostname
+        self.port = parsed.port or 22
+        self.username = unquote(parsed.username) if parsed.username else self.options.get('username')
+        self.password = unquote(parsed.password) if parsed.password else self.options.get('password')
+        self.remote_dir = unquote(parsed.path) or '.'
+        self._local = threading.local()
+
+    def _connect(self):
+        try:
+            import paramiko
+        except ImportError:
+            raise RuntimeError("SFTP push targets need the paramiko package (pip install paramiko)")
+
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        if self.options.get('known_hosts'):
+            client.load_host_keys(self.options['known_hosts'])
+        if self.options.get('auto_add_host_key'):
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            key_filename=self.options.get('key_filename'),
+            timeout=self.options.get('timeout', 30),
+        )
+        return client
+
+    def _sftp(self, upload):
+        # SFTP clients aren't shared between threads; each opens its own channel
+        sftp = getattr(self._local, 'sftp', None)
+        if sftp is None:
+            sftp = upload['client'].open_sftp()
+            self._local.sftp = sftp
+            upload['channels'].append(sftp)
+        return sftp
+
+    def begin(self, remote_name, size, state):
+        client = self._connect()
+        upload = {
+            'client': client,
+            'channels': [],
+            'target': posixpath.join(self.remote_dir, remote_name),
+        }
+        upload['part_path'] = upload['target'] + '.part'
+
+        try:
+            sftp = self._sftp(upload)
+            self._makedirs(sftp, posixpath.dirname(upload['target']))
+            try:
+                sftp.stat(upload['part_path'])
+            except FileNotFoundError:
+                state.pop('chunks', None)
+                with sftp.open(upload['part_path'], 'w'):
+                    pass
+        except Exception:
+            self.close(upload)
+            raise
+        return upload
+
+    def send_chunk(self, upload, index, offset, data):
+        sftp = self._sftp(upload)
+        with sftp.open(upload['part_path'], 'r+') as f:
+            f.set_pipelined(True)
+            f.seek(offset)
+            f.write(data)
+        return None
+
+    def complete(self, upload, remote_name, receipts):
+        sftp = self._sftp(upload)
+        try:
+            sftp.posix_rename(upload['part_path'], upload['target'])
+        except IOError:
+            # Servers without the posix-rename extension won't replace an existing file
+            try:
+                sftp.remove(upload['target'])
+            except FileNotFoundError:
+                pass
+            sftp.rename(upload['part_path'], upload['target'])
+
+    def close(self, upload):
+        for channel in upload['channels']:
+            channel.close()
+        upload['client'].close()
+        self._local = threading.local()
+
+    def _makedirs(self, sftp, remote_dir):
+        if remote_dir in ('', '/', '.'):
+            return
+        try:
+            sftp.stat(remote_dir)
+        except FileNotFoundError:
+            self._makedirs(sftp, posixpath.dirname(remote_dir))
+            sftp.mkdir(remote_dir)
+
+
+class S3Transport(Transport):
+    """Uploads to S3 or an S3-compatible store as a resumable multipart upload"""
+
+    scheme = 's3'
+
+    def __init__(self, location, options=None, state_dir=None):
+        super().__init__(location, options, state_dir)
+        self.chunk_size = max(self.chunk_size, S3_MIN_PART_SIZE)
+        parsed = urlparse(location)
+        self.bucket = parsed.netloc
+        self.prefix = parsed.path.strip('/')
+
+    def _client(self):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("S3 push targets need the boto3 package (pip install boto3)")
+
+        # Credentials left out here come from boto3's usual environment/profile chain
+        return boto3.client(
+            's3',
+            endpoint_url=self.options.get('endpoint_url'),
+            region_name=self.options.get('region'),
+            aws_access_key_id=self.options.get('access_key'),
+            aws_secret_access_key=self.options.get('secret_key'),
+        )
+
+    def _key(self, remote_name):
+        return f"{self.prefix}/{remote_name}" if self.prefix else remote_name
+
+    def begin(self, remote_name, size, state):
+        if size > self.chunk_size * S3_MAX_PARTS:
+            raise ValueError(f"{remote_name} needs more than {S3_MAX_PARTS} parts; raise chunk_size_mb")
+        client = self._client()
+        key = self._key(remote_name)
+
+        upload_id = state.get('upload_id')
+        if upload_id:
+            try:
+                client.list_parts(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            except client.exceptions.NoSuchUpload:
+                # Aborted or expired on the server side: start over
+                upload_id = None
+                state.pop('chunks', None)
+        if not upload_id:
+            upload_id = client.create_multipart_upload(Bucket=self.bucket, Key=key)['UploadId']
+            state['upload_id'] = upload_id
+            state.pop('chunks', None)
+
+        return {'client': client, 'key': key, 'upload_id': upload_id}
+
+    def send_chunk(self, upload, index, offset, data):
+        response = upload['client'].upload_part(
+            Bucket=self.bucket,
+            Key=upload['key'],
+            UploadId=upload['upload_id'],
+            PartNumber=index + 1,
+            Body=data,
+        )
+        return response['ETag']
+
+    def complete(self, upload, remote_name, receipts):
+        upload['client'].complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=upload['key'],
+            UploadId=upload['upload_id'],
+            MultipartUpload={
+                'Parts': [
+                    {'ETag': etag, 'PartNumber': index + 1}
+                    for index, etag in sorted(receipts.items())
+                ]
+            },
+        )
+
+    def describe(self, remote_name):
+        return f"s3://{self.bucket}/{self._key(remote_name)}"
+
+
+TRANSPORTS = {
+    'file': LocalTransport,
+    'sftp': SFTPTransport,
+    's3': S3Transport,
+}
+
+
+def get_transport(target, options=None, state_dir=None):
+    """Build the transport for a push target: a directory, file://, sftp:// or s3:// URL"""
+    parsed = urlparse(target)
+    scheme = parsed.scheme.lower()
+
+    # Bare paths (including Windows drive letters) are local directories
+    if scheme in ('', 'file') or len(scheme) == 1:
+        location = unquote(parsed.path) if scheme == 'file' else target
+        return LocalTransport(location, options, state_dir)
+    if scheme not in TRANSPORTS:
+        raise ValueError(f"Unsupported push target: {target}")
+    return TRANSPORTS[scheme](target, options, state_dir)
@@ -21,6 +21,7 @@ urlpatterns = [
     
     # Search API URLs
     path("search/suggestions/", views.search_suggestions_api, name="search_suggestions_api"),
+    path("search/configs/", views.config_search_api, name="config_search_api"),
     
     # Network configuration URLs
     path("configs/", views.network_configs, name="network_configs"),
@@ -3,13 +3,20 @@ from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, FileResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 import json
+import tempfile
 
 from .models import Device, BackupConfig, BackupHistory, BackupArchive, NetworkConfig, SearchConfig
 from .backup_service import backup_service
+from .task_queue import task_queue
+from .config_collector import ConfigCollector
+from .config_search import config_search
+from .suggestion_index import suggestion_index
+from .ip_keys import MAX_KEY, MIN_KEY, ip_key, ip_key_range, looks_like_ip_range
+from .chunk_store import is_manifest
 from .forms import CustomLoginForm
 
 
@@ -122,10 +129,15 @@ def backup_download(request, backup_id):
         return redirect('network_scanner:backup_dashboard')
     
     try:
-        with open(backup.file_path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{backup.config.name}_{backup.started_at.strftime("%Y%m%d_%H%M%S")}.zip"'
-            return response
+        if is_manifest(backup.file_path):
+            # Deduplicated backups are rebuilt into a zip on the fly
+            f = tempfile.TemporaryFile()
+            backup_service.export_backup_archive(backup.file_path, f)
+            f.seek(0)
+        else:
+            f = open(backup.file_path, 'rb')
+        filename = f'{backup.config.name}_{backup.started_at.strftime("%Y%m%d_%H%M%S")}.zip'
+        return FileResponse(f, as_attachment=True, filename=filename, content_type='application/zip')
     except FileNotFoundError:
         messages.error(request, 'Backup file not found')
         return redirect('network_scanner:backup_dashboard')
@@ -185,17 +197,16 @@ def backup_device_config(request, device_id):
     """Backup device configuration"""
     device = get_object_or_404(Device, id=device_id)
     
-    # Letak ip address kat sini
-    config_data = f"# Configuration backup for {device.ip_address}\n# Generated at {timezone.now()}\n# This is a placeholder - implement actual config retrieval"
-    
-    NetworkConfig.objects.create(
-        device=device,
-        config_type='running',
-        config_data=config_data,
-        version='1.0'
-    )
+    stats = ConfigCollector().collect([device])
     
-    messages.success(request, f'Configuration backed up for {device.ip_address}')
+    if stats['configs']:
+        messages.success(request, f'Configuration backed up for {device.ip_address}')
+    elif stats['unchanged']:
+        messages.info(request, f'Configuration of {device.ip_address} is unchanged since the last backup')
+    elif stats['errors']:
+        messages.error(request, f'Error backing up {device.ip_address}: {stats["errors"][device.ip_address]}')
+    else:
+        messages.error(request, f'No collection driver for {device.get_device_type_display()} devices')
     return redirect('network_scanner:device_config_detail', device_id=device_id)
 
 
@@ -210,8 +221,13 @@ def update_device_id(request, device_id):
         messages.error(request, 'IP address cannot be empty')
         return redirect('network_scanner:network_configs')
     
+    new_ip_key = ip_key(new_ip)
+    if not new_ip_key:
+        messages.error(request, f'{new_ip} is not a valid IP address')
+        return redirect('network_scanner:network_configs')
+    
     # Check if the new IP already exists
-    if Device.objects.filter(ip_address=new_ip).exclude(id=device_id).exists():
+    if Device.objects.filter(ip_key=new_ip_key).exclude(id=device_id).exists():
         messages.error(request, f'Device with IP address {new_ip} already exists')
         return redirect('network_scanner:network_configs')
     
@@ -248,7 +264,28 @@ def backup_status_api(request):
             'is_due': item['is_due'],
         })
     
-    return JsonResponse({'backups': data})
+    return JsonResponse({'backups': data, 'task_queue': task_queue.stats()})
+
+
+def _requested_ip_range(request):
+    """(low, high) ip_keys from the subnet, ip_from and ip_to parameters, or None if none are given
+    
+    Raises ValueError for a parameter that isn't a valid subnet or address.
+    """
+    subnet = request.GET.get('subnet', '').strip()
+    ip_from = request.GET.get('ip_from', '').strip()
+    ip_to = request.GET.get('ip_to', '').strip()
+    if not (subnet or ip_from or ip_to):
+        return None
+    
+    low, high = MIN_KEY, MAX_KEY
+    if subnet:
+        low, high = ip_key_range(subnet)
+    if ip_from:
+        low = max(low, ip_key_range(ip_from)[0])
+    if ip_to:
+        high = min(high, ip_key_range(ip_to)[1])
+    return low, high
 
 
 @login_required
@@ -256,51 +293,75 @@ def search_suggestions_api(request):
     """API endpoint for search suggestions"""
     query = request.GET.get('q', '').strip()
     
-    if len(query) < 2:
+    try:
+        key_range = _requested_ip_range(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    if len(query) < 2 and key_range is None:
         return JsonResponse({'suggestions': []})
     
     # Get search configuration
-    search_config = SearchConfig.get_active_config()
+    search_config = suggestion_index.search_config()
     
     if not search_config.enable_suggestions:
         return JsonResponse({'suggestions': []})
     
-    # Build search query based on configuration
-    from django.db.models import Q
+    # Fields to match, in the order their matches are listed
+    fields = []
+    if search_config.enable_ip_search:
+        fields.append('ip_address')
+    if search_config.enable_hostname_search:
+        fields.append('hostname')
+    if 'description' in search_config.search_fields:
+        fields.append('description')
     
-    search_conditions = Q()
+    if search_config.enable_ip_search and looks_like_ip_range(query):
+        # A subnet or address range typed into the box lists the devices inside it
+        low, high = ip_key_range(query)
+        key_range = (max(low, key_range[0]), min(high, key_range[1])) if key_range else (low, high)
+        query = ''
     
-    if search_config.enable_ip_search:
-        search_conditions |= Q(ip_address__icontains=query)
+    if len(query) < 2:
+        # Only a range to go on: an index range scan, in address order
+        devices = Device.objects.filter(ip_key__range=key_range).order_by('ip_key')[:search_config.max_suggestions]
+        suggestions = suggestion_index.describe(devices)
+    else:
+        suggestions = suggestion_index.suggest(query, fields, search_config.max_suggestions, key_range)
     
-    if search_config.enable_hostname_search:
-        search_conditions |= Q(hostname__icontains=query)
+    return JsonResponse({'suggestions': suggestions})
+
+
+@login_required
+def config_search_api(request):
+    """API endpoint for full-text search inside the newest config of each device"""
+    query = request.GET.get('q', '').strip()
     
-    # Search in additional fields if configured
-    for field in search_config.search_fields:
-        if field == 'ip_address' and search_config.enable_ip_search:
-            continue  # Already included
-        elif field == 'hostname' and search_config.enable_hostname_search:
-            continue  # Already included
-        elif field == 'description':
-            search_conditions |= Q(description__icontains=query)
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 200)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
     
-    # Get matching devices
-    devices = Device.objects.filter(search_conditions).prefetch_related('configs')[:search_config.max_suggestions]
+    matches = config_search.search(query, limit=limit, config_type=request.GET.get('config_type') or None)
     
-    suggestions = []
-    for device in devices:
-        config_count = device.configs.count()
-        suggestions.append({
+    results = []
+    for match in matches:
+        device = match['device']
+        results.append({
+            'device_id': device.id,
             'ip': device.ip_address,
             'hostname': device.hostname or '',
             'device_type': device.get_device_type_display(),
-            'status': device.status,
-            'config_count': config_count,
-            'description': device.description or ''
+            'config_id': match['config_id'],
+            'config_type': match['config_type'],
+            'score': match['score'],
+            'snippet': match['snippet'],
         })
     
-    return JsonResponse({'suggestions': suggestions})
+    return JsonResponse({'results': results})
 
 
 @login_required
@@ -315,6 +376,15 @@ def device_type_backups(request, device_type):
     # Get devices of the specified type
     devices = Device.objects.filter(device_type=device_type).prefetch_related('configs')
     
+    # Optional subnet or address range, e.g. ?subnet=10.20.0.0/16 or ?ip_from=10.0.0.1&ip_to=10.0.0.99
+    try:
+        key_range = _requested_ip_range(request)
+    except ValueError as e:
+        messages.error(request, f'Invalid IP filter: {e}')
+        key_range = None
+    if key_range:
+        devices = devices.filter(ip_key__range=key_range)
+    
     # Get all network configs for these devices
     device_ids = devices.values_list('id', flat=True)
     network_configs = NetworkConfig.objects.filter(device_id__in=device_ids).order_by('-backup_timestamp')
@@ -337,6 +407,9 @@ def device_type_backups(request, device_type):
         'online_devices': online_devices,
         'total_configs': total_configs,
         'recent_configs': recent_configs,
+        'subnet': request.GET.get('subnet', ''),
+        'ip_from': request.GET.get('ip_from', ''),
+        'ip_to': request.GET.get('ip_to', ''),
     }
     
     return render(request, 'network_scanner/device_type_backups.html', context)